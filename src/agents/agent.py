@@ -21,6 +21,9 @@ class Agent(object):
         """
         self.env = env
         self.render_mode = render_mode
+        # the number of environments if the env is a vector of environments
+        # (e.g. a SubprocVecEnv) that steps a batch of actions at a time
+        self.num_envs = getattr(env, 'num_envs', None)
 
     def __repr__(self) -> str:
         """Return a debugging string of this agent."""
@@ -51,7 +54,8 @@ class Agent(object):
         Return the next state based on the given action.
 
         Args:
-            action: the action to perform for some frames
+            action: the action to perform for some frames (or a vector of
+                actions for a vector of environments)
 
         Returns:
             a tuple of:
@@ -61,7 +65,7 @@ class Agent(object):
 
         """
         # perform the action and observe the next state, reward, and done flag
-        state, reward, done, _ = self.env.step(action=action)
+        state, reward, done, _ = self.env.step(action)
         # render the state if a render_mode exists
         if self.render_mode is not None:
             self.env.render(mode=self.render_mode)
@@ -0,0 +1,440 @@
+"""A Deep Q agent that acts in multiple processes and learns in one (Ape-X)."""
+import multiprocessing
+from multiprocessing import resource_tracker
+import queue
+import signal
+import time
+from typing import Callable
+import gym
+import numpy as np
+from tqdm import tqdm
+from keras import backend as K
+from src.models import build_deep_q_model
+from src.models import build_dueling_deep_q_model
+from src.models import QFunction
+from src.base import InferenceClient
+from src.base import InferenceServer
+from src.base import SharedPrioritizedReplayQueue
+from src.base import SharedWeights
+from .deep_q_agent import DeepQAgent
+
+
+def _act(
+    env_id: str,
+    replay_queue: SharedPrioritizedReplayQueue,
+    weights: SharedWeights,
+    stream: int,
+    exploration_rate: float,
+    discount_factor: float,
+    dueling_network: bool,
+    sync_frequency: int,
+    frames: multiprocessing.Array,
+    scores: multiprocessing.Queue,
+    stop: multiprocessing.Event,
+    client: InferenceClient=None,
+) -> None:
+    """
+    Act in an environment and push the experiences to a shared replay queue.
+
+    Notes:
+        the actor computes the initial priority of each experience from the
+        Q values of its own copy of the network (or of the network of the
+        learner through an inference server). the Q values of the next
+        state are the ones it predicts its next action from, so the priority
+        costs no forward passes over acting
+
+    Args:
+        env_id: the ID of the environment to build with `setup_env`
+        replay_queue: the shared replay queue to push experiences to
+        weights: the shared weights to load the network of the actor from
+        stream: the index of the actor (and of its ring in the queue)
+        exploration_rate: the fixed exploration rate, ε, of the actor
+        discount_factor: discount factor, γ, for discounting future reward
+        dueling_network: whether to use the dueling architecture
+        sync_frequency: the number of frames between checks for new weights
+        frames: the shared counters of frames played by each actor
+        scores: the queue to put the score of each finished episode on
+        stop: the event that stops the actor
+        client: an optional client of an inference server to predict Q
+            values with instead of building a copy of the network
+
+    Returns:
+        None
+
+    """
+    # the learner handles interrupts and stops the actors
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # this is long to import, so only import it in the actor processes
+    from src.setup_env import setup_env
+    env = setup_env(env_id)
+    if client is None:
+        if dueling_network:
+            build_model = build_dueling_deep_q_model
+        else:
+            build_model = build_deep_q_model
+        model = build_model(
+            image_size=env.observation_space.shape[:2],
+            num_frames=env.observation_space.shape[-1],
+            num_actions=env.action_space.n,
+        )
+        predict = QFunction(model).single
+    else:
+        # the server overwrites the output on the next request
+        predict = lambda state: client(state).copy()
+    version = 0
+    step = 0
+    score = 0
+    state = np.asarray(env.reset())
+    Q = predict(state)
+    while not stop.is_set():
+        # load the weights the learner published since the last check
+        if client is None and step % sync_frequency == 0:
+            published = weights.read(version)
+            if published is not None:
+                version, values = published
+                model.set_weights(values)
+                Q = predict(state)
+        # select an action epsilon greedily
+        if np.random.random() < exploration_rate:
+            action = env.action_space.sample()
+        else:
+            action = np.argmax(Q)
+        next_state, reward, done, _ = env.step(action)
+        next_state = np.asarray(next_state)
+        # the TD-error of the experience is its initial priority
+        if done:
+            Q_next = None
+            td_error = reward - Q[action]
+        else:
+            Q_next = predict(next_state)
+            td_error = reward + discount_factor * np.max(Q_next) - Q[action]
+        replay_queue.push(state, action, reward, done, next_state,
+            stream=stream,
+            priority=td_error,
+        )
+        frames[stream] += 1
+        step += 1
+        score += reward
+        if done:
+            scores.put(score)
+            score = 0
+            next_state = np.asarray(env.reset())
+            Q_next = predict(next_state)
+        state, Q = next_state, Q_next
+
+    # don't wait on the learner to get the last scores to exit
+    scores.cancel_join_thread()
+    env.close()
+    replay_queue.close()
+    weights.close()
+    if client is not None:
+        client.close()
+
+
+class ApexAgent(DeepQAgent):
+    """A Deep Q agent that acts in multiple processes and learns in one."""
+
+    def __init__(self,
+        env: gym.Env,
+        env_id: str,
+        num_actors: int=4,
+        base_exploration_rate: float=0.4,
+        exploration_alpha: float=7.0,
+        publish_frequency: int=100,
+        sync_frequency: int=400,
+        inference_server: bool=False,
+        max_batch_size: int=None,
+        max_wait_us: int=1000,
+        replay_memory_size: int=750000,
+        **kwargs,
+    ) -> None:
+        """
+        Initialize a new Ape-X Agent.
+
+        Notes:
+            `train` launches `num_actors` processes that each build their
+            own environment with `setup_env(env_id)` and their own copy of
+            the Q network, and push experiences with the priorities they
+            calculate to their own ring of a `SharedPrioritizedReplayQueue`.
+            the learner (the process of the agent) samples from the queue,
+            trains the network, and publishes its weights to the actors.
+            actor i of K explores with the fixed rate
+            `base_exploration_rate**(1 + exploration_alpha * i / (K - 1))`
+
+        Args:
+            env: the environment to build the networks from (the learner
+                doesn't act in it)
+            env_id: the ID of the environment for the actors to build
+            num_actors: the number of actor processes
+            base_exploration_rate: the exploration rate of the first actor
+            exploration_alpha: the exponent spreading the exploration rates
+                of the actors
+            publish_frequency: the number of updates of the network between
+                publishing its weights to the actors
+            sync_frequency: the number of frames between the actors checking
+                for new weights
+            inference_server: whether the actors request their Q values
+                from an inference server that batches the requests of all
+                the actors through the network of the learner, instead of
+                each building their own copy of the network
+            max_batch_size: the max number of requests the inference server
+                batches. if None, the server batches a request of every actor
+            max_wait_us: the max number of microseconds the inference server
+                waits for more requests after the first of a batch
+            replay_memory_size: the number of previous experiences to store
+                in the experience replay queue
+            kwargs: the keyword arguments of `DeepQAgent`. the actors use
+                their own fixed `exploration_rate`s and the learner updates
+                the network as fast as it can, so `target_update_freq` is
+                divided by `update_frequency` into a number of updates
+
+        Returns:
+            None
+
+        """
+        # the actors keep pushing while the learner gathers samples, so 1%
+        # of each ring past its head isn't sampled
+        replay_queue = SharedPrioritizedReplayQueue(replay_memory_size,
+            frame_shape=env.observation_space.shape[:2],
+            history_length=env.observation_space.shape[-1],
+            streams=num_actors,
+            max_lead=replay_memory_size // num_actors // 100,
+        )
+        super().__init__(env,
+            replay_memory_size=replay_memory_size,
+            replay_queue=replay_queue,
+            **kwargs,
+        )
+        # the queue is prioritized (but not a `PrioritizedReplayQueue`)
+        self.prioritized_experience_replay = True
+        self.env_id = env_id
+        self.num_actors = num_actors
+        self.publish_frequency = publish_frequency
+        self.sync_frequency = sync_frequency
+        self.inference_server = inference_server
+        self.max_batch_size = max_batch_size
+        self.max_wait_us = max_wait_us
+        # the statistics of the inference server during the last training
+        self.inference_stats = None
+        exponents = 1 + exploration_alpha * np.arange(num_actors) / max(num_actors - 1, 1)
+        self.exploration_rates = base_exploration_rate**exponents
+        self.replay_start_size = 50000
+        # the aggregate frames per second of the actors and the updates per
+        # second of the learner during the last training
+        self.frames_per_second = 0.0
+        self.updates_per_second = 0.0
+
+    def __repr__(self) -> str:
+        """Return a debugging string of this agent."""
+        # add the arguments of the actors to the arguments of the base agent
+        base = super().__repr__().rstrip()[:-1].rstrip()
+        return '{},\n    env_id={},\n    num_actors={},\n    ' \
+            'exploration_rates={},\n    publish_frequency={},\n    ' \
+            'sync_frequency={},\n    inference_server={},\n    ' \
+            'max_batch_size={},\n    max_wait_us={}\n)\n'.format(
+                base,
+                repr(self.env_id),
+                self.num_actors,
+                np.round(self.exploration_rates, 4).tolist(),
+                self.publish_frequency,
+                self.sync_frequency,
+                self.inference_server,
+                self.max_batch_size,
+                self.max_wait_us,
+            )
+
+    def _serve(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Return the Q values of a batch of states for the inference server.
+
+        Args:
+            frames: the batch of stacks of frames to predict Q values from
+
+        Returns:
+            the Q values of each action for each stack of frames
+
+        """
+        # the server runs in a thread of its own
+        with self._graph.as_default():
+            return self.q_function(frames)
+
+    def observe(self, replay_start_size: int=50000) -> None:
+        """
+        Set the number of experiences the actors fill the queue with.
+
+        Notes:
+            the actors act from the start of `train`, and the learner only
+            starts learning once they filled the queue with this many
+            experiences
+
+        Args:
+            replay_start_size: the number of experiences to start learning at
+
+        Returns:
+            None
+
+        """
+        self.replay_start_size = replay_start_size
+
+    def train(self,
+        frames_to_play: int=50000000,
+        batch_size: int=32,
+        callback: Callable=None,
+    ) -> None:
+        """
+        Train the network with actors acting in parallel processes.
+
+        Args:
+            frames_to_play: the number of frames for the actors to play
+            batch_size: the size of the replay history batches
+            callback: an optional callback to get updates about the score,
+                      loss, discount factor, and exploration rate every
+                      episode (called as `callback(agent, score, loss,
+                      timings=...)` with the statistics of the timed phases)
+
+        Returns:
+            None
+
+        """
+        # the actors build TensorFlow graphs, which can't be forked, and
+        # share the resource tracker of the shared memory with the learner
+        resource_tracker.ensure_running()
+        context = multiprocessing.get_context('spawn')
+        weights = SharedWeights([w.shape for w in self.model.get_weights()])
+        weights.publish(self.model.get_weights())
+        frames = context.Array('q', self.num_actors, lock=False)
+        scores = context.Queue()
+        stop = context.Event()
+        # serve the Q values of the network of the learner to the actors
+        server = None
+        clients = [None] * self.num_actors
+        if self.inference_server:
+            self._graph = K.get_session().graph
+            server = InferenceServer(self._serve,
+                input_shape=self.env.observation_space.shape,
+                output_shape=(self.env.action_space.n, ),
+                num_clients=self.num_actors,
+                max_batch_size=self.max_batch_size,
+                max_wait_us=self.max_wait_us,
+            )
+            server.start()
+            clients = server.clients
+        actors = [
+            context.Process(target=_act, daemon=True, args=(
+                self.env_id,
+                self.queue,
+                weights,
+                stream,
+                self.exploration_rates[stream],
+                self.discount_factor,
+                self.dueling_network,
+                self.sync_frequency,
+                frames,
+                scores,
+                stop,
+                clients[stream],
+            ))
+            for stream in range(self.num_actors)
+        ]
+        # the actors start new episodes in the rings of the episodes the
+        # actors of the last call stopped in
+        for stream in range(self.num_actors):
+            self.queue.cut(stream)
+        for actor in actors:
+            actor.start()
+
+        progress = tqdm(total=frames_to_play, unit='frame')
+        progress.set_postfix(score='?', loss='?')
+        last_score = last_loss = '?'
+        # the updates between target syncs (the frequency is in frames)
+        target_update_freq = max(self.target_update_freq // self.update_frequency, 1)
+        updates = 0
+        loss = 0
+        played = 0
+        start = time.perf_counter()
+        learn_start = None
+        try:
+            while played < frames_to_play:
+                # raise the error that stopped the inference server (its
+                # clients raise an EOFError and the actors exit)
+                if server is not None and server.error is not None:
+                    server.stop()
+                # an actor that died (e.g. failing to build its environment)
+                # would never push the frames left to play
+                for stream, actor in enumerate(actors):
+                    if actor.exitcode is not None and not stop.is_set():
+                        msg = 'actor {} exited with code {}'
+                        raise RuntimeError(msg.format(stream, actor.exitcode))
+                played = sum(frames)
+                if self.queue.top < max(self.replay_start_size, batch_size):
+                    time.sleep(0.01)
+                else:
+                    # start sampling once the actors filled the queue
+                    if learn_start is None:
+                        learn_start = time.perf_counter()
+                        sample = self._start_sampling(batch_size)
+                    with self.timer('sample'):
+                        batch = sample()
+                    with self.timer('replay'):
+                        loss += self._replay(*batch)
+                    updates += 1
+                    if updates % target_update_freq == 0:
+                        with self.timer('target_sync'):
+                            self.target_model.set_weights(self.model.get_weights())
+                            self._refresh_priorities()
+                    if updates % self.publish_frequency == 0:
+                        with self.timer('publish'):
+                            weights.publish(self.model.get_weights())
+                # report the episodes the actors finished
+                finished = False
+                while True:
+                    try:
+                        score = scores.get_nowait()
+                    except queue.Empty:
+                        break
+                    finished = True
+                    if callable(callback):
+                        callback(self, score, loss, timings=self.timer.stats())
+                    last_score, last_loss = score, loss
+                    loss = 0
+                if finished or played - progress.n >= 1000:
+                    elapsed = time.perf_counter() - start
+                    self.frames_per_second = played / elapsed
+                    if learn_start is not None:
+                        elapsed = time.perf_counter() - learn_start
+                        self.updates_per_second = updates / elapsed
+                    progress.set_postfix(
+                        score=last_score,
+                        loss=last_loss,
+                        fps='{:.0f}'.format(self.frames_per_second),
+                        ups='{:.1f}'.format(self.updates_per_second),
+                        **self.timer.postfix()
+                    )
+                    progress.update(played - progress.n)
+        finally:
+            stop.set()
+            for actor in actors:
+                actor.join()
+            progress.close()
+            self._stop_sampling()
+            weights.close()
+            weights.unlink()
+            if server is not None:
+                self.inference_stats = server.stats()
+                server.close()
+        print('actors: {:.1f} frames/s, learner: {:.1f} updates/s'.format(
+            self.frames_per_second,
+            self.updates_per_second,
+        ))
+        if self.inference_stats is not None:
+            print('inference: batch sizes {}, mean {:.2f}, queueing '
+                'p50/p99 {:.3f}/{:.3f}ms'.format(
+                    self.inference_stats['batch_sizes'],
+                    self.inference_stats['mean_batch_size'],
+                    self.inference_stats['queue']['p50'],
+                    self.inference_stats['queue']['p99'],
+                ))
+
+
+# explicitly define the outward facing API of this module
+__all__ = [ApexAgent.__name__]
@@ -1,16 +1,25 @@
 """An implementation of Deep Q-Learning."""
+import threading
+import time
 from typing import Callable
 import gym
 import numpy as np
 from tqdm import tqdm
+from keras import backend as K
 from keras.optimizers import Optimizer
 from keras.optimizers import Adam
 from src.models import build_deep_q_model
 from src.models import build_dueling_deep_q_model
+from src.models import QFunction
+from src.models import TrainStep
 from src.models.losses import huber_loss
 from src.base import AnnealingVariable
+from src.base import FrameReplayQueue
+from src.base import PhaseTimer
+from src.base import Prefetcher
 from src.base import ReplayQueue
 from src.base import PrioritizedReplayQueue
+from src.base import ReplayRatio
 from .agent import Agent
 
 
@@ -21,13 +30,21 @@ _REPR_TEMPLATE = """
     render_mode={}
     replay_memory_size={},
     prioritized_experience_replay={},
+    frame_indexed_replay={},
     discount_factor={},
     update_frequency={},
     optimizer={},
     exploration_rate={},
     loss={},
     target_update_freq={},
-    dueling_network={}
+    dueling_network={},
+    prefetch_depth={},
+    prefetch_staleness={},
+    env_groups={},
+    learner_thread={},
+    max_learner_lag={},
+    weight_swap_frequency={},
+    double_q={}
 )
 """.lstrip()
 
@@ -40,6 +57,7 @@ class DeepQAgent(Agent):
         render_mode: str=None,
         replay_memory_size: int=750000,
         prioritized_experience_replay: bool=False,
+        frame_indexed_replay: bool=True,
         discount_factor: float=0.99,
         update_frequency: int=4,
         optimizer: Optimizer=Adam(lr=2e-5),
@@ -47,6 +65,14 @@ class DeepQAgent(Agent):
         loss: Callable=huber_loss,
         target_update_freq: int=10000,
         dueling_network: bool=False,
+        replay_queue: object=None,
+        prefetch_depth: int=0,
+        prefetch_staleness: int=None,
+        env_groups: int=1,
+        learner_thread: bool=False,
+        max_learner_lag: int=1000,
+        weight_swap_frequency: int=100,
+        double_q: bool=False,
     ) -> None:
         """
         Initialize a new Deep Q Agent.
@@ -61,6 +87,9 @@ class DeepQAgent(Agent):
             prioritized_experience_replay: whether to use prioritized
                 experience replay. If False, will use the standard replay
                 queue with uniform random sampling
+            frame_indexed_replay: whether the uniform replay queue should
+                store each frame of the stacked states once and rebuild the
+                stacks when sampling (uses a fraction of the memory)
             discount_factor: discount factor, γ, for discounting future reward
             update_frequency: the number of actions between updates to the
                 deep Q network from replay memory
@@ -70,6 +99,31 @@ class DeepQAgent(Agent):
             loss: the loss method to use at the end of the CNN
             target_update_freq: frequency to update the target network (steps)
             dueling_network: whether to use the dueling architecture
+            replay_queue: an optional replay queue to use in place of the
+                one built from `replay_memory_size`,
+                `prioritized_experience_replay`, and `frame_indexed_replay`
+                (e.g. a MemmapReplayQueue for memories larger than RAM)
+            prefetch_depth: the number of minibatches to sample ahead of
+                training in a background thread. if 0, minibatches are
+                sampled synchronously when training
+            prefetch_staleness: the max number of frames pushed to the replay
+                queue since a prefetched minibatch was sampled for it to still
+                be trained on. if None, minibatches are never discarded
+            env_groups: the number of groups to split a vector of
+                environments into when training. with more than one group,
+                the environments of a group step in their worker processes
+                while the agent remembers, learns, and predicts the actions
+                of the other groups
+            learner_thread: whether to train the network in a thread of its
+                own while the agent acts with a copy of the network
+            max_learner_lag: the max number of frames the agent can play
+                ahead of the learner thread's schedule of updates (one every
+                `update_frequency` frames)
+            weight_swap_frequency: the number of updates of the learner
+                thread between copying its weights to the acting network
+            double_q: whether the targets evaluate the actions the online
+                network selects in the next states with the target network
+                (Double DQN) instead of the max of the target network
 
         Returns:
             None
@@ -79,10 +133,70 @@ class DeepQAgent(Agent):
         super().__init__(env, render_mode)
         # setup the replay queue
         self.prioritized_experience_replay = prioritized_experience_replay
-        if prioritized_experience_replay:
-            self.queue = PrioritizedReplayQueue(replay_memory_size)
+        self.frame_indexed_replay = frame_indexed_replay
+        if replay_queue is not None:
+            self.queue = replay_queue
+            # the queue determines how to push and sample experiences
+            is_prioritized = isinstance(replay_queue, PrioritizedReplayQueue)
+            self.prioritized_experience_replay = is_prioritized
+        elif prioritized_experience_replay:
+            if self.num_envs is not None:
+                msg = 'prioritized experience replay needs a single env'
+                raise ValueError(msg)
+            self.queue = PrioritizedReplayQueue(replay_memory_size,
+                frame_shape=env.observation_space.shape[:2],
+                history_length=env.observation_space.shape[-1],
+            )
+        elif frame_indexed_replay and self.num_envs and replay_memory_size:
+            # the experiences of each environment of a vector are pushed in
+            # order to a ring of their own
+            self.queue = FrameReplayQueue(replay_memory_size,
+                frame_shape=env.observation_space.shape[:2],
+                history_length=env.observation_space.shape[-1],
+                streams=self.num_envs,
+            )
+        elif frame_indexed_replay:
+            self.queue = FrameReplayQueue(replay_memory_size,
+                frame_shape=env.observation_space.shape[:2],
+                history_length=env.observation_space.shape[-1],
+            )
         else:
             self.queue = ReplayQueue(replay_memory_size)
+        # setup the lock guarding the replay queue and the prefetcher that
+        # samples minibatches from it in the background while training
+        self.queue_lock = threading.Lock()
+        self.prefetch_depth = prefetch_depth
+        self.prefetch_staleness = prefetch_staleness
+        self.prefetcher = None
+        if prefetch_depth > 0:
+            self.prefetcher = Prefetcher(self.queue,
+                depth=prefetch_depth,
+                max_staleness=prefetch_staleness,
+                lock=self.queue_lock,
+            )
+        # the buffers to evaluate the experiences with stale priorities in
+        self._stale_batch = None
+        # the state the environment was left in by the last call to observe
+        # or train (in the middle of episodes) to continue playing from
+        self._state = None
+        # setup the groups of the vector of environments to pipeline
+        if env_groups > 1 and (self.num_envs or 0) < env_groups:
+            msg = 'env_groups needs a vector of at least {} environments'
+            raise ValueError(msg.format(env_groups))
+        self.env_groups = env_groups
+        # setup the thread that learns while the agent acts
+        if learner_thread and (self.num_envs is not None or env_groups > 1):
+            raise ValueError('learner_thread needs a single environment')
+        self.learner_thread = learner_thread
+        self.max_learner_lag = max_learner_lag
+        self.weight_swap_frequency = weight_swap_frequency
+        self.replay_ratio = None
+        # the seconds spent in pipelined training and waiting for the groups
+        self.pipeline_time = 0.0
+        self.env_wait_time = 0.0
+        # the timers of the phases of observing and training (replace with a
+        # tracing timer to export a trace of the phases)
+        self.timer = PhaseTimer()
         # setup the Q learning algorithm variables
         self.discount_factor = discount_factor
         self.update_frequency = update_frequency
@@ -91,12 +205,7 @@ class DeepQAgent(Agent):
         self.loss = loss
         self.target_update_freq = target_update_freq
         self.dueling_network = dueling_network
-        # build an output mask that lets all action values pass through
-        mask_shape = (1, env.action_space.n)
-        self.mask = np.ones(mask_shape, dtype=np.float32)
-        # use an identity of size action space, to index rows from it using
-        # an action vector to produce a one-hot vector masks for training error
-        self.action_onehot = np.eye(env.action_space.n, dtype=np.float32)
+        self.double_q = double_q
         # setup the model for predicting Q values
         if dueling_network:
             build_model = build_dueling_deep_q_model
@@ -107,16 +216,35 @@ class DeepQAgent(Agent):
             image_size=env.observation_space.shape[:2],
             num_frames=env.observation_space.shape[-1],
             num_actions=env.action_space.n,
-            loss=loss,
-            optimizer=optimizer
         )
         # build the target model for estimating target values
         self.target_model = build_model(
             image_size=env.observation_space.shape[:2],
             num_frames=env.observation_space.shape[-1],
             num_actions=env.action_space.n,
+        )
+        # build the copy of the model the agent acts with while the learner
+        # thread trains the model
+        self.acting_model = None
+        if learner_thread:
+            self.acting_model = build_model(
+                image_size=env.observation_space.shape[:2],
+                num_frames=env.observation_space.shape[-1],
+                num_actions=env.action_space.n,
+            )
+        # build the functions of the Q values of the models for inference
+        # (which skip the overhead of `Model.predict`)
+        self.q_function = QFunction(self.model)
+        self.acting_q_function = None
+        if learner_thread:
+            self.acting_q_function = QFunction(self.acting_model)
+        # build the fused step that computes the targets with the target
+        # model and updates the model in a single call
+        self.train_step = TrainStep(self.model, self.target_model,
+            discount_factor=discount_factor,
             loss=loss,
-            optimizer=optimizer
+            optimizer=optimizer,
+            double_q=double_q,
         )
 
     def __repr__(self) -> str:
@@ -127,50 +255,147 @@ class DeepQAgent(Agent):
             repr(self.render_mode),
             self.queue.size,
             self.prioritized_experience_replay,
+            self.frame_indexed_replay,
             self.discount_factor,
             self.update_frequency,
             self.optimizer,
             self.exploration_rate,
             self.loss.__name__,
             self.target_update_freq,
-            self.dueling_network
+            self.dueling_network,
+            self.prefetch_depth,
+            self.prefetch_staleness,
+            self.env_groups,
+            self.learner_thread,
+            self.max_learner_lag,
+            self.weight_swap_frequency,
+            self.double_q,
         )
 
+    @property
+    def prefetch_wait_rate(self) -> float:
+        """Return the fraction of minibatches training waited to prefetch."""
+        if self.prefetcher is None:
+            return 0.0
+        return self.prefetcher.wait_rate
+
+    @property
+    def pipeline_overlap(self) -> float:
+        """Return the fraction of pipelined training spent not waiting."""
+        if self.pipeline_time == 0:
+            return 0.0
+        return 1 - self.env_wait_time / self.pipeline_time
+
+    def _initial_state(self) -> np.ndarray:
+        """
+        Reset the environment and return the initial state.
+
+        Notes:
+            the episodes of the last experiences in the replay queue end at
+            the reset, so the experiences of the new episodes aren't
+            stitched onto them (see `FrameReplayQueue.cut`)
+
+        Returns:
+            the initial state of the game
+
+        """
+        cut = getattr(self.queue, 'cut', None)
+        if cut is not None:
+            with self.queue_lock:
+                for stream in range(getattr(self.queue, 'streams', 1)):
+                    cut(stream)
+
+        return super()._initial_state()
+
+    def _continue_state(self) -> np.ndarray:
+        """
+        Return the state to continue playing from.
+
+        Notes:
+            the experiences of each episode are pushed in order, so the
+            episodes the last call to observe or train stopped in continue
+            from the state it left the environment in instead of resetting
+            the environment in the middle of them
+
+        Returns:
+            the state the environment was left in, or the initial state of a
+            new episode if there is none. the states of a vector are copied
+            out of the vector, which overwrites them each step
+
+        """
+        state, self._state = self._state, None
+        if state is None:
+            state = self._initial_state()
+            if self.num_envs is not None:
+                state = state.copy()
+
+        return state
+
     def _td_error(self,
         s: np.ndarray,
         a: np.ndarray,
         r: np.ndarray,
         d: np.ndarray,
         s2: np.ndarray
-    ) -> float:
+    ) -> np.ndarray:
         """
-        Calculate the TD-error for a single experience.
+        Calculate the TD-errors for a batch of experiences.
 
         Args:
-            s: the current state
-            a: the action to get from current state `s` to next state `s2`
-            r: the reward resulting from taking action `a` in state `s`
-            d: the flag denoting whether the episode ended after action `a`
-            s2: the next state from taking action `a` in state `s`
+            s: a batch of current states
+            a: a batch of actions from each state in s
+            r: a batch of reward from each action in a
+            d: a batch of terminal flags after each action in a
+            s2: a batch of next states from each state-action pair in s, a
 
         Returns:
-            the TD-error as a result of the experience
+            a vector of the TD-errors as a result of the experiences
 
         """
-        if d:
-            # terminal states have a Q value of zero by definition
-            Q_t = 0.0
-        else:
-            # predict Q values for the next state and take the max value.
-            Q_t = self.target_model.predict([s2[None, :, :, :], self.mask])
-
-        # calculate the predicted Q value from the current state and action
-        Q = self.model.predict([s[None, :, :, :], self.mask])
         # calculate the TD error based on the reward, discounted future
-        # reward, and the predicted future reward
-        td_error = abs(r + self.discount_factor * np.max(Q_t) - np.max(Q))
+        # reward, and the predicted future reward in the graph of the step
+        return self.train_step.td_error(s, a, r, d, s2)
+
+    def _refresh_priorities(self, batch_size: int=1024) -> None:
+        """
+        Calculate the priorities of experiences pushed without one.
 
-        return td_error
+        Args:
+            batch_size: the number of experiences to evaluate per batch
+
+        Returns:
+            None
+
+        """
+        # experiences are pushed with the max priority and evaluated later
+        # in large batches, which is much faster than evaluating each push
+        with self.queue_lock:
+            stale = self.queue.stale_indexes()
+        if not len(stale):
+            return
+        # allocate the buffers of the batches once (the last batch is
+        # gathered into slices of them)
+        if self._stale_batch is None or len(self._stale_batch[1]) != batch_size:
+            shape = (batch_size, *self.queue.frame_shape, self.queue.history_length)
+            self._stale_batch = (
+                np.empty(shape, dtype=np.uint8),
+                np.empty(batch_size, dtype=self.queue.a.dtype),
+                np.empty(batch_size, dtype=self.queue.r.dtype),
+                np.empty(batch_size, dtype=self.queue.d.dtype),
+                np.empty(shape, dtype=np.uint8),
+            )
+        for start in range(0, len(stale), batch_size):
+            indexes = stale[start:start + batch_size]
+            batch = tuple(array[:len(indexes)] for array in self._stale_batch)
+            # only gather the batch while holding the lock and evaluate it
+            # while the agent keeps pushing. the priorities of experiences
+            # overwritten by the pushes in the meantime aren't updated
+            with self.queue_lock:
+                pushes = np.copy(self.queue.pushes)
+                self.queue.take(indexes, out=batch)
+            td_error = self._td_error(*batch)
+            with self.queue_lock:
+                self.queue.update_priorities(indexes, td_error, pushes=pushes)
 
     def _remember(self,
         s: np.ndarray,
@@ -178,6 +403,7 @@ class DeepQAgent(Agent):
         r: int,
         d: bool,
         s2: np.ndarray,
+        stream: int=None,
     ) -> None:
         """
         Push an experience onto the replay queue.
@@ -188,24 +414,67 @@ class DeepQAgent(Agent):
             r: the reward resulting from taking action `a` in state `s`
             d: the flag denoting whether the episode ended after action `a`
             s2: the next state from taking action `a` in state `s`
+            stream: the index of the environment of the experience in a
+                vector of environments
 
         Returns:
             None
 
         """
-        if self.prioritized_experience_replay:
-            # calculate the priority of the experience based on the TD error
-            priority = self._td_error(s, a, r, d, s2)
-            self.queue.push(s, a, r, d, s2, priority=priority)
+        experience = [s, a, r, d, s2]
+        # queues of frames keep the experiences of each environment apart
+        if stream is not None and getattr(self.queue, 'streams', 1) > 1:
+            experience.append(stream)
+        # prioritized experiences get the max priority until their priority
+        # is calculated (when they're sampled or the priorities refresh)
+        if self.prefetcher is None:
+            # the learner thread samples from the queue while pushing
+            with self.queue_lock:
+                self.queue.push(*experience)
         else:
-            self.queue.push(s, a, r, d, s2)
+            self.prefetcher.push(*experience)
+
+    def _remember_batch(self,
+        s: np.ndarray,
+        a: np.ndarray,
+        r: np.ndarray,
+        d: np.ndarray,
+        s2: np.ndarray,
+        streams: range=None,
+    ) -> None:
+        """
+        Push the experiences of a vector of environments onto the queue.
+
+        Args:
+            s: the current state of each environment
+            a: the action of each environment
+            r: the reward of each environment
+            d: the done flag of each environment
+            s2: the next state of each environment
+            streams: the indexes of the environments in the vector. if None,
+                the experiences are of the environments 0, 1, ...
+
+        Returns:
+            None
+
+        """
+        if streams is None:
+            streams = range(len(s))
+        for index, stream in enumerate(streams):
+            self._remember(s[index], a[index], r[index], d[index],
+                s2[index],
+                stream=stream
+            )
 
     def _replay(self,
         s: np.ndarray,
         a: np.ndarray,
         r: np.ndarray,
         d: np.ndarray,
-        s2: np.ndarray
+        s2: np.ndarray,
+        w: np.ndarray=None,
+        indexes: np.ndarray=None,
+        pushes: np.ndarray=None,
     ) -> float:
         """
         Train the network on a mini-batch of replay data.
@@ -216,27 +485,30 @@ class DeepQAgent(Agent):
             r: a batch of reward from each action in a
             d: a batch of terminal flags after each action in a
             s2: a batch of next states from each state-action pair in s, a
+            w: an optional batch of importance-sampling weights for the loss
+               of each sample (from prioritized experience replay)
+            indexes: an optional batch of indexes of the samples in the
+               prioritized replay queue to update the priorities of
+            pushes: the pushes of the prioritized replay queue when the
+               batch was sampled (to leave the priorities of the samples
+               overwritten since)
 
         Returns:
             the loss as a result of the training
 
         """
-        # initialize target y values
-        y = np.zeros((len(s), self.env.action_space.n), dtype=np.float32)
+        # compute the targets from the target model and update the model in
+        # a single call. weight the loss of each sample by its
+        # importance-sampling weight
+        loss, td_error = self.train_step(s, a, r, d, s2, w)
+        if indexes is not None:
+            # update the priorities of the samples with the TD-errors of the
+            # selected actions from the estimates of the Q values before the
+            # update
+            with self.queue_lock:
+                self.queue.update_priorities(indexes, td_error, pushes=pushes)
 
-        # predict Q values for the next state of each memory in the batch and
-        # take the max value. don't mask any outputs, i.e. use ones
-        mask = np.repeat(self.mask, len(s), axis=0)
-        Q = np.max(self.target_model.predict_on_batch([s2, mask]), axis=1)
-        # terminal states have a Q value of zero by definition
-        Q[d] = 0
-        # set the y value for each sample to the reward of the selected
-        # action plus the discounted Q value
-        y[range(y.shape[0]), a] = r + self.discount_factor * Q
-
-        # train the model on the batch and return the loss. use the mask that
-        # disables training for actions that aren't the selected actions.
-        return self.model.train_on_batch([s, self.action_onehot[a]], y)
+        return loss
 
     def observe(self, replay_start_size: int=50000) -> None:
         """
@@ -250,12 +522,14 @@ class DeepQAgent(Agent):
             None
 
         """
+        if self.num_envs is not None:
+            return self._observe_vectorized(replay_start_size)
         progress = tqdm(total=replay_start_size, unit='frame')
         # loop indefinitely, the loop breaks when the number of
         # frames passed is greater than replay_start_size
         while replay_start_size > 0:
-            # reset the game and get the initial state
-            state = self._initial_state()
+            # continue the episode the last call stopped in or reset
+            state = self._continue_state()
             # the done flag indicating that an episode has ended
             done = False
             # loop until done
@@ -263,9 +537,11 @@ class DeepQAgent(Agent):
                 # sample a random action to perform
                 action = self.env.action_space.sample()
                 # perform action and observe the reward and next state
-                next_state, reward, done = self._next_state(action)
+                with self.timer('next_state'):
+                    next_state, reward, done = self._next_state(action)
                 # push the memory onto the replay queue
-                self._remember(state, action, reward, done, next_state)
+                with self.timer('remember'):
+                    self._remember(state, action, reward, done, next_state)
                 # set the state to the new state
                 state = next_state
                 # decrement the observation counter
@@ -274,6 +550,39 @@ class DeepQAgent(Agent):
                 progress.update(1)
 
         progress.close()
+        # calculate the priorities of the observations in large batches
+        if self.prioritized_experience_replay:
+            self._refresh_priorities()
+
+    def _observe_vectorized(self, replay_start_size: int) -> None:
+        """
+        Observe random moves in a vector of environments.
+
+        Args:
+            replay_start_size: the number of random observations to make
+
+        Returns:
+            None
+
+        """
+        progress = tqdm(total=replay_start_size, unit='frame')
+        state = self._continue_state()
+        while replay_start_size > 0:
+            # sample a random action for each environment
+            action = np.random.randint(self.env.action_space.n,
+                size=self.num_envs
+            )
+            with self.timer('next_state'):
+                next_state, reward, done = self._next_state(action)
+            with self.timer('remember'):
+                self._remember_batch(state, action, reward, done, next_state)
+            np.copyto(state, next_state)
+            replay_start_size -= self.num_envs
+            progress.update(self.num_envs)
+
+        progress.close()
+        # train continues the episodes from here
+        self._state = state
 
     def predict(self, frames: np.ndarray, exploration_rate: float) -> int:
         """
@@ -290,13 +599,110 @@ class DeepQAgent(Agent):
         if np.random.random() < exploration_rate:
             # select a random action and return it
             return self.env.action_space.sample()
-        # reshape the frames to pass through the loss network
-        frames = frames[np.newaxis, :, :, :]
-        # predict the values of each action
-        actions = self.model.predict([frames, self.mask])
+        # predict the values of each action (through the preallocated batch
+        # of the function, bypassing the overhead of `Model.predict`)
+        actions = self.q_function.single(frames)
         # return the action with the highest estimated future reward
         return np.argmax(actions)
 
+    def predict_batch(self,
+        frames: np.ndarray,
+        exploration_rate: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Predict an action for each of a batch of frame stacks.
+
+        Args:
+            frames: the batch of stacks of frames to predict Q values from
+            exploration_rate: the exploration rate for epsilon greedy
+                selection, either a vector with a rate for each stack or a
+                single rate for all of them
+
+        Returns:
+            a vector of the predicted optimal action for each stack of frames
+
+        """
+        # decide which actions are random for all the stacks at once
+        exploration_rate = np.broadcast_to(exploration_rate, len(frames))
+        actions = np.random.randint(self.env.action_space.n, size=len(frames))
+        greedy = np.flatnonzero(np.random.random(len(frames)) >= exploration_rate)
+        if len(greedy):
+            # predict the values of the actions of only the greedy stacks in
+            # a single forward pass
+            values = self.q_function(frames[greedy])
+            actions[greedy] = np.argmax(values, axis=1)
+
+        return actions
+
+    def _start_sampling(self, batch_size: int) -> Callable:
+        """
+        Return a callable that samples minibatches to train on.
+
+        Args:
+            batch_size: the size of the minibatches
+
+        Returns:
+            a callable that returns the next minibatch
+
+        """
+        # sample minibatches in the background or synchronously. the
+        # batches of prioritized queues end with the pushes to the queue
+        # when they were sampled, so the priorities of the experiences
+        # overwritten before training on them aren't updated
+        if self.prefetcher is None:
+            def sample():
+                # the agent pushes to the queue while the learner thread
+                # samples from it
+                with self.queue_lock:
+                    if not self.prioritized_experience_replay:
+                        return self.queue.sample(size=batch_size)
+                    pushes = np.copy(self.queue.pushes)
+                    return (*self.queue.sample(size=batch_size), pushes)
+            return sample
+        self.prefetcher.batch_size = batch_size
+        self.prefetcher.start()
+        if not self.prioritized_experience_replay:
+            return self.prefetcher.sample
+        def sample():
+            batch = self.prefetcher.sample()
+            return (*batch, self.prefetcher.batch_pushes)
+        return sample
+
+    def _stop_sampling(self) -> None:
+        """Stop sampling minibatches in the background (if prefetching)."""
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+
+    def _learn(self, frames_to_play: int, sample: Callable) -> float:
+        """
+        Update the networks if they're scheduled to update after a frame.
+
+        Args:
+            frames_to_play: the number of frames left to play
+            sample: a callable that returns the next minibatch
+
+        Returns:
+            the loss of training on a minibatch, or 0 if not trained
+
+        """
+        loss = 0
+        # update Q from replay
+        if frames_to_play % self.update_frequency == 0:
+            with self.timer('sample'):
+                batch = sample()
+            with self.timer('replay'):
+                loss = self._replay(*batch)
+        # update Target Q from online Q
+        if frames_to_play % self.target_update_freq == 0:
+            with self.timer('target_sync'):
+                self.target_model.set_weights(self.model.get_weights())
+                # calculate the priorities of experiences that haven't
+                # been sampled since the last update in large batches
+                if self.prioritized_experience_replay:
+                    self._refresh_priorities()
+
+        return loss
+
     def train(self,
         frames_to_play: int=50000000,
         batch_size: int=32,
@@ -310,54 +716,386 @@ class DeepQAgent(Agent):
             batch_size: the size of the replay history batches
             callback: an optional callback to get updates about the score,
                       loss, discount factor, and exploration rate every
-                      episode
+                      episode (called as `callback(agent, score, loss,
+                      timings=...)` with the statistics of the timed phases)
 
         Returns:
             None
 
         """
+        if self.learner_thread:
+            return self._train_threaded(frames_to_play, batch_size, callback)
+        if self.env_groups > 1:
+            return self._train_pipelined(frames_to_play, batch_size, callback)
+        if self.num_envs is not None:
+            return self._train_vectorized(frames_to_play, batch_size, callback)
         # the progress bar for the operation
         progress = tqdm(total=frames_to_play, unit='frame')
         progress.set_postfix(score='?', loss='?')
+        sample = self._start_sampling(batch_size)
+        try:
+            while frames_to_play > 0:
+                done = False
+                score = 0
+                loss = 0
+                frames = 0
+                # continue the episode the last call stopped in or reset
+                state = self._continue_state()
 
-        while frames_to_play > 0:
-            done = False
-            score = 0
+                while not done:
+                    # predict the best action based on the current state
+                    with self.timer('predict'):
+                        action = self.predict(state, self.exploration_rate.value)
+                    # step the exploration rate forward
+                    self.exploration_rate.step()
+                    # fire the action and observe the next state, reward, and flag
+                    with self.timer('next_state'):
+                        next_state, reward, done = self._next_state(action)
+                    score += reward
+                    # push the memory onto the replay queue
+                    with self.timer('remember'):
+                        self._remember(state, action, reward, done, next_state)
+                    # set the state to the new state
+                    state = next_state
+                    # decrement the observation counter
+                    frames_to_play -= 1
+                    frames += 1
+                    # update the networks from replay
+                    loss += self._learn(frames_to_play, sample)
+
+                # pass the score and timings to the callback at the end of the
+                # episode
+                if callable(callback):
+                    callback(self, score, loss, timings=self.timer.stats())
+                # update the progress bar
+                progress.set_postfix(score=score, loss=loss, **self.timer.postfix())
+                progress.update(frames)
+        finally:
+            progress.close()
+            self._stop_sampling()
+
+    def _train_vectorized(self,
+        frames_to_play: int,
+        batch_size: int,
+        callback: Callable,
+    ) -> None:
+        """
+        Train the network by playing a vector of environments.
+
+        Args:
+            frames_to_play: the number of frames to play the games for
+            batch_size: the size of the replay history batches
+            callback: an optional callback to get updates about the score
+                and loss every episode
+
+        Returns:
+            None
+
+        """
+        # the progress bar for the operation
+        progress = tqdm(total=frames_to_play, unit='frame')
+        progress.set_postfix(score='?', loss='?')
+        sample = self._start_sampling(batch_size)
+        try:
+            # the scores of the current episode of each environment and the loss
+            # since the last episode ended in any environment
+            scores = np.zeros(self.num_envs)
             loss = 0
-            frames = 0
-            # reset the game and get the initial state
-            state = self._initial_state()
+            state = self._continue_state()
+            while frames_to_play > 0:
+                # predict the best actions for all environments in one batch
+                with self.timer('predict'):
+                    action = self.predict_batch(state, self.exploration_rate.value)
+                # step the exploration rate forward once per frame
+                for _ in range(self.num_envs):
+                    self.exploration_rate.step()
+                with self.timer('next_state'):
+                    next_state, reward, done = self._next_state(action)
+                scores += reward
+                with self.timer('remember'):
+                    self._remember_batch(state, action, reward, done, next_state)
+                np.copyto(state, next_state)
+                # update the networks on the schedule of a single environment
+                for _ in range(self.num_envs):
+                    frames_to_play -= 1
+                    loss += self._learn(frames_to_play, sample)
+                # pass the scores of the ended episodes to the callback
+                for index in np.flatnonzero(done):
+                    if callable(callback):
+                        callback(self, scores[index], loss,
+                            timings=self.timer.stats()
+                        )
+                    progress.set_postfix(score=scores[index], loss=loss,
+                        **self.timer.postfix()
+                    )
+                    scores[index] = 0
+                    loss = 0
+                progress.update(self.num_envs)
+            # the next call continues the episodes from here
+            self._state = state
+        finally:
+            progress.close()
+            self._stop_sampling()
 
-            while not done:
-                # predict the best action based on the current state
-                action = self.predict(state, self.exploration_rate.value)
-                # step the exploration rate forward
-                self.exploration_rate.step()
-                # fire the action and observe the next state, reward, and flag
-                next_state, reward, done = self._next_state(action)
-                score += reward
-                # push the memory onto the replay queue
-                self._remember(state, action, reward, done, next_state)
-                # set the state to the new state
-                state = next_state
-                # decrement the observation counter
-                frames_to_play -= 1
-                frames += 1
-                # update Q from replay
-                if frames_to_play % self.update_frequency == 0:
-                    loss += self._replay(*self.queue.sample(size=batch_size))
-                # update Target Q from online Q
-                if frames_to_play % self.target_update_freq == 0:
-                    self.target_model.set_weights(self.model.get_weights())
-
-            # pass the score to the callback at the end of the episode
-            if callable(callback):
-                callback(self, score, loss)
-            # update the progress bar
-            progress.set_postfix(score=score, loss=loss)
-            progress.update(frames)
+    def _train_pipelined(self,
+        frames_to_play: int,
+        batch_size: int,
+        callback: Callable,
+    ) -> None:
+        """
+        Train the network by playing groups of a vector of environments.
 
-        progress.close()
+        Notes:
+            the groups step in turns. after waiting for a group, the agent
+            remembers its experiences, learns, predicts its next actions, and
+            starts it stepping again before waiting for the next group, so
+            the emulators of the other groups step while the agent works
+
+        Args:
+            frames_to_play: the number of frames to play the games for
+            batch_size: the size of the replay history batches
+            callback: an optional callback to get updates about the score
+                and loss every episode
+
+        Returns:
+            None
+
+        """
+        # the progress bar for the operation
+        progress = tqdm(total=frames_to_play, unit='frame')
+        progress.set_postfix(score='?', loss='?', overlap='?')
+        sample = self._start_sampling(batch_size)
+        try:
+            # split the vector into contiguous groups of environments
+            bounds = np.linspace(0, self.num_envs, self.env_groups + 1).astype(int)
+            groups = [slice(*bound) for bound in zip(bounds[:-1], bounds[1:])]
+            scores = np.zeros(self.num_envs)
+            loss = 0
+            state = self._continue_state()
+            actions = np.zeros(self.num_envs, dtype=int)
+            start = time.perf_counter()
+            # start all the groups stepping
+            for group in groups:
+                actions[group] = self.predict_batch(state[group],
+                    self.exploration_rate.value
+                )
+                self.env.step_async(actions[group], group)
+            while frames_to_play > 0:
+                for group in groups:
+                    wait = time.perf_counter()
+                    next_state, reward, done, _ = self.env.step_wait(group)
+                    waited = time.perf_counter()
+                    self.env_wait_time += waited - wait
+                    self.timer.record('next_state', wait, waited)
+                    scores[group] += reward
+                    with self.timer('remember'):
+                        self._remember_batch(state[group], actions[group], reward,
+                            done,
+                            next_state,
+                            streams=range(self.num_envs)[group]
+                        )
+                    np.copyto(state[group], next_state)
+                    # update the networks on the schedule of a single environment
+                    for _ in range(len(reward)):
+                        self.exploration_rate.step()
+                        frames_to_play -= 1
+                        loss += self._learn(frames_to_play, sample)
+                    # predict the next actions of the group and start it stepping
+                    with self.timer('predict'):
+                        actions[group] = self.predict_batch(state[group],
+                            self.exploration_rate.value
+                        )
+                    self.env.step_async(actions[group], group)
+                    # pass the scores of the ended episodes to the callback
+                    for index in np.flatnonzero(done) + group.start:
+                        if callable(callback):
+                            callback(self, scores[index], loss,
+                                timings=self.timer.stats()
+                            )
+                        progress.set_postfix(score=scores[index], loss=loss,
+                            overlap='{:.0%}'.format(self.pipeline_overlap),
+                            **self.timer.postfix()
+                        )
+                        scores[index] = 0
+                        loss = 0
+                    progress.update(len(reward))
+                    self.pipeline_time = time.perf_counter() - start
+
+            # wait for the last steps of the groups and remember them, so the
+            # next call continues the episodes from their next states
+            for group in groups:
+                next_state, reward, done, _ = self.env.step_wait(group)
+                self._remember_batch(state[group], actions[group], reward,
+                    done,
+                    next_state,
+                    streams=range(self.num_envs)[group]
+                )
+                np.copyto(state[group], next_state)
+            self._state = state
+        finally:
+            progress.close()
+            self._stop_sampling()
+
+    def _run_learner(self,
+        updates_to_make: int,
+        sample: Callable,
+        graph: object,
+    ) -> None:
+        """
+        Update the networks on the schedule of the replay ratio.
+
+        Notes:
+            this is the target of the learner thread of `_train_threaded`
+
+        Args:
+            updates_to_make: the number of updates to make
+            sample: a callable that returns the next minibatch
+            graph: the graph of the networks to run the updates in
+
+        Returns:
+            None
+
+        """
+        ratio = self.replay_ratio
+        # the updates between target syncs (the frequency is in frames)
+        target_update_freq = max(self.target_update_freq // self.update_frequency, 1)
+        try:
+            with graph.as_default():
+                while ratio.updates < updates_to_make and ratio.wait_to_update():
+                    with self.timer('sample'):
+                        batch = sample()
+                    with self.timer('replay'):
+                        loss = self._replay(*batch)
+                    updates = ratio.updates + 1
+                    # update Target Q from online Q
+                    if updates % target_update_freq == 0:
+                        with self.timer('target_sync'):
+                            self.target_model.set_weights(self.model.get_weights())
+                            if self.prioritized_experience_replay:
+                                self._refresh_priorities()
+                    # publish the weights for the agent to act with. the
+                    # agent swaps them in when the version changes
+                    if updates % self.weight_swap_frequency == 0:
+                        with self.timer('weight_swap'):
+                            self._acting_weights = (updates, self.model.get_weights())
+                    ratio.updated(loss)
+        except BaseException as error:
+            # raise the error in the thread of the agent
+            self._learner_error = error
+        finally:
+            # stop the agent after the last update (or the error)
+            ratio.stop()
+
+    def _train_threaded(self,
+        frames_to_play: int,
+        batch_size: int,
+        callback: Callable,
+    ) -> None:
+        """
+        Train the network in a learner thread while acting in this thread.
+
+        Notes:
+            the learner thread trains `model` while the agent acts with
+            `acting_model`, which loads the weights of `model` every
+            `weight_swap_frequency` updates. TensorFlow releases the GIL
+            while training and emulators (like nes_py) release it while
+            emulating, so the threads overlap. the learner makes an update
+            for every `update_frequency` frames played like `train` and the
+            agent waits when the learner falls `max_learner_lag` frames
+            behind, so the replay ratio is the same as the serial loop
+
+        Args:
+            frames_to_play: the number of frames to play the game for
+            batch_size: the size of the replay history batches
+            callback: an optional callback to get updates about the score
+                and loss every episode
+
+        Returns:
+            None
+
+        """
+        # the progress bar for the operation
+        progress = tqdm(total=frames_to_play, unit='frame')
+        progress.set_postfix(score='?', loss='?')
+        sample = self._start_sampling(batch_size)
+        self.replay_ratio = ReplayRatio(self.update_frequency, self.max_learner_lag)
+        ratio = self.replay_ratio
+        # the version and weights for the agent to act with
+        self._acting_weights = (0, self.model.get_weights())
+        acting_version = None
+        self._learner_error = None
+        # create the phases of the learner before the agent reads the timer
+        for phase in ('sample', 'replay', 'target_sync', 'weight_swap'):
+            self.timer(phase)
+        updates_to_make = frames_to_play // self.update_frequency
+        learner = threading.Thread(target=self._run_learner,
+            args=(updates_to_make, sample, K.get_session().graph),
+            daemon=True,
+        )
+        learner.start()
+        try:
+            while frames_to_play > 0 and not ratio.stopped:
+                done = False
+                score = 0
+                frames = 0
+                # continue the episode the last call stopped in or reset
+                state = self._continue_state()
+
+                while not done and frames_to_play > 0 and not ratio.stopped:
+                    # load the weights the learner published since the last
+                    # swap (reading the attribute is atomic)
+                    version, weights = self._acting_weights
+                    if version != acting_version:
+                        self.acting_model.set_weights(weights)
+                        acting_version = version
+                    # predict the best action with the acting network
+                    with self.timer('predict'):
+                        if np.random.random() < self.exploration_rate.value:
+                            action = self.env.action_space.sample()
+                        else:
+                            values = self.acting_q_function.single(state)
+                            action = np.argmax(values)
+                    # step the exploration rate forward
+                    self.exploration_rate.step()
+                    # fire the action and observe the next state, reward, and flag
+                    with self.timer('next_state'):
+                        next_state, reward, done = self._next_state(action)
+                    score += reward
+                    # push the memory onto the replay queue
+                    with self.timer('remember'):
+                        self._remember(state, action, reward, done, next_state)
+                    state = next_state
+                    frames_to_play -= 1
+                    frames += 1
+                    # let the learner update (and wait if it's behind)
+                    ratio.played()
+
+                progress.update(frames)
+                # training ended in the middle of the episode, the next call
+                # continues it from here
+                if not done:
+                    self._state = np.copy(state)
+                    break
+                loss = ratio.take_loss()
+                # pass the score and timings to the callback at the end of the
+                # episode
+                if callable(callback):
+                    callback(self, score, loss, timings=self.timer.stats())
+                # update the progress bar
+                progress.set_postfix(score=score, loss=loss, lag=ratio.lag,
+                    **self.timer.postfix()
+                )
+            # wait for the learner to make the updates of the last frames
+            learner.join()
+        finally:
+            ratio.stop()
+            learner.join()
+            progress.close()
+            self._stop_sampling()
+        if self._learner_error is not None:
+            raise self._learner_error
+        # act with the latest weights after training
+        self.acting_model.set_weights(self.model.get_weights())
 
     def play(self, games: int=100, exploration_rate: float=0.05) -> np.ndarray:
         """
@@ -371,6 +1109,15 @@ class DeepQAgent(Agent):
             an array of scores, one for each game
 
         """
+        if self.num_envs is not None:
+            return self._play_vectorized(games, exploration_rate)
+        # finish the episode training stopped in without scoring it, rather
+        # than resetting the environment in the middle of it
+        state, self._state = self._state, None
+        done = state is None
+        while not done:
+            action = self.predict(state, exploration_rate)
+            state, _, done = self._next_state(action)
         # the progress bar for the operation
         progress = tqdm(range(games), unit='game')
         progress.set_postfix(score='?')
@@ -402,6 +1149,47 @@ class DeepQAgent(Agent):
 
         return scores
 
+    def _play_vectorized(self,
+        games: int,
+        exploration_rate: float,
+    ) -> np.ndarray:
+        """
+        Run the agent in a vector of environments without training.
+
+        Args:
+            games: the number of games to play
+            exploration_rate: the epsilon for epsilon greedy exploration
+
+        Returns:
+            an array of scores, one for each game in the order they ended
+
+        """
+        # the progress bar for the operation
+        progress = tqdm(total=games, unit='game')
+        progress.set_postfix(score='?')
+        # the scores of finished games and the current game of each env
+        scores = []
+        current = np.zeros(self.num_envs)
+        # continue the episodes training stopped in without scoring them,
+        # rather than resetting the environments in the middle of them
+        scored = np.full(self.num_envs, self._state is None)
+        state = self._continue_state()
+        while len(scores) < games:
+            action = self.predict_batch(state, exploration_rate)
+            state, reward, done = self._next_state(action)
+            current += reward
+            for index in np.flatnonzero(done):
+                if scored[index]:
+                    scores.append(current[index])
+                    progress.set_postfix(score=scores[-1])
+                    progress.update(1)
+                scored[index] = True
+                current[index] = 0
+
+        progress.close()
+
+        return np.array(scores[:games])
+
 
 # explicitly define the outward facing API of this module
 __all__ = [DeepQAgent.__name__]
@@ -0,0 +1,107 @@
+"""Unit tests for the DeepQAgent class."""
+import tempfile
+import numpy as np
+from unittest import TestCase
+from src.setup_env import setup_env
+from ..deep_q_agent import DeepQAgent
+
+
+def build_agent(num_envs: int=2, **kwargs) -> DeepQAgent:
+    """Return an agent of a vector of synthetic NES environments."""
+    env = setup_env('SyntheticNES-v0', num_envs=num_envs)
+    return DeepQAgent(env, replay_memory_size=1000, target_update_freq=16, **kwargs)
+
+
+class DeepQAgent_observe(TestCase):
+    def test_vectorized(self):
+        agent = build_agent()
+        try:
+            agent.observe(replay_start_size=32)
+            self.assertEqual(32, agent.queue.top)
+        finally:
+            agent.env.close()
+
+
+class DeepQAgent_train(TestCase):
+    def test_vectorized(self):
+        agent = build_agent()
+        try:
+            agent.observe(replay_start_size=32)
+            agent.train(frames_to_play=32, batch_size=8)
+            self.assertEqual(64, agent.queue.top)
+        finally:
+            agent.env.close()
+
+    def test_pipelined(self):
+        agent = build_agent(env_groups=2)
+        # record the states pushed by each environment of the vector
+        pushed = {0: [], 1: []}
+        remember = agent._remember
+        def record(s, a, r, d, s2, stream=None):
+            pushed[stream].append((np.copy(s), np.copy(s2)))
+            remember(s, a, r, d, s2, stream=stream)
+        agent._remember = record
+        try:
+            agent.observe(replay_start_size=32)
+            agent.train(frames_to_play=32, batch_size=8)
+            # train continues the episodes of observe and remembers the last
+            # step of each group
+            self.assertEqual([33, 33], list(agent.queue.tops))
+            # the stacks rebuilt from the frames are the stacks pushed
+            for stream, states in pushed.items():
+                start = stream * agent.queue.stream_size
+                indexes = np.arange(start, start + len(states))
+                s, _, _, _, s2 = agent.queue.take(indexes)
+                self.assertTrue(np.array_equal([x[0] for x in states], s))
+                self.assertTrue(np.array_equal([x[1] for x in states], s2))
+            # and so are the sampled stacks
+            stacks = {x[0].tobytes() for states in pushed.values() for x in states}
+            s, _, _, _, _ = agent.queue.sample(16)
+            for stack in s:
+                self.assertIn(stack.tobytes(), stacks)
+        finally:
+            agent.env.close()
+
+    def test_threaded(self):
+        agent = build_agent(num_envs=None, learner_thread=True)
+        try:
+            agent.observe(replay_start_size=32)
+            # training stops in the middle of an episode and the next call
+            # continues it (the queue rejects pushes that don't)
+            agent.train(frames_to_play=16, batch_size=8)
+            self.assertIsNotNone(agent._state)
+            last = (agent.queue.index - 1) % agent.queue.size
+            agent.train(frames_to_play=16, batch_size=8)
+            self.assertEqual((last + 17) % agent.queue.size, agent.queue.index)
+            self.assertFalse(agent.queue.d[last])
+        finally:
+            agent.env.close()
+
+    def test_monitored(self):
+        with tempfile.TemporaryDirectory() as monitor_dir:
+            env = setup_env('SyntheticNES-v0', monitor_dir, num_envs=2)
+            agent = DeepQAgent(env, replay_memory_size=1000, target_update_freq=16)
+            try:
+                # the monitor raises if an episode resets before it's done
+                agent.observe(replay_start_size=32)
+                agent.train(frames_to_play=32, batch_size=8)
+                self.assertEqual([32, 32], list(agent.queue.tops))
+            finally:
+                agent.env.close()
+
+
+class DeepQAgent__refresh_priorities(TestCase):
+    def test(self):
+        agent = build_agent(num_envs=None, prioritized_experience_replay=True)
+        try:
+            agent.observe(replay_start_size=40)
+            self.assertEqual(0, len(agent.queue.stale_indexes()))
+            # the last batch is gathered into slices of the same buffers
+            s = np.zeros(agent.env.observation_space.shape, dtype=np.uint8)
+            for _ in range(40):
+                agent.queue.push(s, 0, 0, False, s)
+            agent._refresh_priorities(batch_size=16)
+            self.assertEqual(0, len(agent.queue.stale_indexes()))
+            self.assertEqual(16, len(agent._stale_batch[0]))
+        finally:
+            agent.env.close()
@@ -1,12 +1,38 @@
 """Base components for the project."""
 from .annealing_variable import AnnealingVariable
+from .compressed_replay_queue import CompressedReplayQueue
+from .frame_replay_queue import FrameReplayQueue
+from .inference_server import InferenceClient
+from .inference_server import InferenceServer
+from .memmap_replay_queue import MemmapReplayQueue
+from .phase_timer import PhaseTimer
+from .prefetcher import Prefetcher
 from .prioritized_replay_queue import PrioritizedReplayQueue
 from .replay_queue import ReplayQueue
+from .replay_ratio import ReplayRatio
+from .replay_snapshot import load_snapshot
+from .replay_snapshot import save_snapshot
+from .shared_prioritized_replay_queue import SharedPrioritizedReplayQueue
+from .shared_replay_queue import SharedReplayQueue
+from .shared_weights import SharedWeights
 
 
 # explicitly define the outward facing API for the package.
 __all__ = [
     AnnealingVariable.__name__,
+    CompressedReplayQueue.__name__,
+    FrameReplayQueue.__name__,
+    InferenceClient.__name__,
+    InferenceServer.__name__,
+    MemmapReplayQueue.__name__,
+    PhaseTimer.__name__,
+    Prefetcher.__name__,
     PrioritizedReplayQueue.__name__,
     ReplayQueue.__name__,
+    ReplayRatio.__name__,
+    SharedPrioritizedReplayQueue.__name__,
+    SharedReplayQueue.__name__,
+    SharedWeights.__name__,
+    load_snapshot.__name__,
+    save_snapshot.__name__,
 ]
@@ -0,0 +1,195 @@
+"""A frame replay queue that stores compressed frames."""
+import lzma
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .frame_replay_queue import FrameReplayQueue
+
+
+# the codecs to compress frames with by name as tuples of compress and
+# decompress functions. both release the GIL so they run in parallel threads
+_CODECS = {
+    'zlib': (lambda data, level: zlib.compress(data, level), zlib.decompress),
+    'lzma': (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+}
+
+
+class CompressedReplayQueue(FrameReplayQueue):
+    """A frame replay queue that stores compressed frames."""
+
+    def __init__(self,
+        size: int,
+        frame_shape: tuple=(84, 84),
+        history_length: int=4,
+        codec: str='zlib',
+        level: int=1,
+        workers: int=4,
+    ) -> None:
+        """
+        Initialize a new compressed frame replay buffer.
+
+        Notes:
+            frames of games have large flat regions and repeated tiles, so
+            compressing them stores several times more experiences in the
+            same memory. frames are compressed on push and the unique frames
+            of a batch are decompressed in a pool of threads on sample
+
+        Args:
+            size: the size of the replay buffer
+                  (the number of previous experiences to store)
+            frame_shape: the shape of the individual frames in a state
+            history_length: the number of frames stacked into a state
+            codec: the name of the codec to compress frames with, either
+                'zlib' or 'lzma'
+            level: the compression level (or preset) of the codec
+            workers: the number of threads to decompress frames with
+
+        Returns:
+            None
+
+        """
+        if codec not in _CODECS:
+            raise ValueError('`codec` must be one of {}'.format(list(_CODECS)))
+        self.codec = codec
+        self.level = level
+        self.workers = workers
+        self._compress, self._decompress = _CODECS[codec]
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        # the number of stored frames and the bytes they're compressed to
+        self._frames = 0
+        self._compressed_bytes = 0
+        self._last_write = None
+        # the seconds spent decompressing the frames of the last batch
+        self.decode_time = 0.0
+        super().__init__(size, frame_shape, history_length)
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of self."""
+        template = '{}(size={}, frame_shape={}, history_length={}, ' \
+            'codec={}, level={}, workers={})'
+        return template.format(
+            self.__class__.__name__,
+            self.size,
+            self.frame_shape,
+            self.history_length,
+            repr(self.codec),
+            self.level,
+            self.workers,
+        )
+
+    def _allocate(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        """
+        Allocate an array to store a field of the experiences in.
+
+        Args:
+            name: the name of the field the array stores
+            shape: the shape of the array
+            dtype: the data type of the array
+
+        Returns:
+            a new array of zeros, or of None for the compressed frames
+
+        """
+        if name == 'frames':
+            return np.full(shape[0], None, dtype=object)
+        return super()._allocate(name, shape, dtype)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the number of bytes used by the queue's storage."""
+        return super().nbytes + self._compressed_bytes
+
+    @property
+    def compression_ratio(self) -> float:
+        """Return the ratio of the size of stored frames to their compressed size."""
+        if self._compressed_bytes == 0:
+            return 1.0
+        frame_bytes = int(np.prod(self.frame_shape))
+        return self._frames * frame_bytes / self._compressed_bytes
+
+    def _write_frame(self, index: int, frame: np.ndarray) -> None:
+        """
+        Compress and write a frame to the ring of frames.
+
+        Args:
+            index: the index in the ring to write the frame to
+            frame: the frame to write
+
+        Returns:
+            None
+
+        """
+        raw = np.ascontiguousarray(frame).tobytes()
+        # each push writes the newest frame of `s2` to the next slot and the
+        # next push writes the same frame there again as the newest of `s`,
+        # so skip compressing it twice
+        if self._last_write == (index, raw):
+            return
+        self._last_write = (index, raw)
+        data = self._compress(raw, self.level)
+        old = self.frames[index]
+        if old is None:
+            self._frames += 1
+        else:
+            self._compressed_bytes -= len(old)
+        self._compressed_bytes += len(data)
+        self.frames[index] = data
+
+    def _read_frame(self, index: int) -> np.ndarray:
+        """
+        Read and decompress a frame from the ring of frames.
+
+        Args:
+            index: the index in the ring to read the frame from
+
+        Returns:
+            the frame at the index
+
+        """
+        # the frame read on push is usually the last one written
+        if self._last_write is not None and self._last_write[0] == index:
+            raw = self._last_write[1]
+        else:
+            raw = self._decompress(self.frames[index])
+        return np.frombuffer(raw, dtype=np.uint8).reshape(self.frame_shape)
+
+    def _gather_frames(self,
+        frames: np.ndarray,
+        s: np.ndarray,
+        s2: np.ndarray
+    ) -> None:
+        """
+        Decompress and gather the frames of states into batches.
+
+        Args:
+            frames: the matrix of frame indexes of the experiences
+            s: the batch of current states to gather frames into
+            s2: the batch of next states to gather frames into
+
+        Returns:
+            None
+
+        """
+        start = time.perf_counter()
+        # states share most of their frames, so decompress each unique frame
+        # of the batch once in the pool of threads
+        unique, inverse = np.unique(frames, return_inverse=True)
+        inverse = inverse.reshape(frames.shape)
+        data = self._executor.map(self._decompress, self.frames[unique])
+        decoded = np.empty((len(unique), *self.frame_shape), dtype=np.uint8)
+        for index, frame in enumerate(data):
+            decoded[index] = np.frombuffer(frame, dtype=np.uint8).reshape(self.frame_shape)
+        self.decode_time = time.perf_counter() - start
+        # gather the decoded frames into the batches (see FrameReplayQueue)
+        for column in range(self.history_length):
+            np.take(decoded, inverse[:, column], 0, s[..., column], 'clip')
+            np.take(decoded, inverse[:, column + 1], 0, s2[..., column], 'clip')
+
+    def close(self) -> None:
+        """Shut down the pool of threads that decompresses frames."""
+        self._executor.shutdown()
+
+
+# explicitly define the outward facing API of this module
+__all__ = [CompressedReplayQueue.__name__]
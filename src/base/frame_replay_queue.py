@@ -0,0 +1,536 @@
+"""A replay queue that stores each frame of a frame stack only once."""
+import numpy as np
+
+
+class FrameReplayQueue(object):
+    """A replay queue for replaying previous experiences of frame stacks."""
+
+    def __init__(self,
+        size: int,
+        frame_shape: tuple=(84, 84),
+        history_length: int=4,
+        streams: int=1,
+    ) -> None:
+        """
+        Initialize a new frame replay buffer with a given size.
+
+        Notes:
+            Consecutive frame stacks share all but one frame, so instead of
+            storing both stacks of every experience, this queue stores the
+            newest frame of each state in a ring and rebuilds the stacks when
+            sampling. This requires experiences to be pushed in the order
+            they were experienced (i.e. `s` of an experience is `s2` of the
+            previous one unless the previous one was terminal) and the first
+            state of each episode to be its first frame repeated, which is
+            how `FrameStackEnv` behaves on reset. The next state of terminal
+            experiences is not preserved as it's never evaluated. The
+            experiences of several streams (e.g. the environments of a
+            vector) are interleaved, so with `streams` the queue is split
+            into equal rings, one for the experiences of each stream
+
+        Args:
+            size: the size of the replay buffer
+                  (the number of previous experiences to store)
+            frame_shape: the shape of the individual frames in a state
+            history_length: the number of frames stacked into a state
+            streams: the number of rings to split the queue into
+
+        Returns:
+            None
+
+        """
+        # ensure each ring can hold at least one valid experience
+        if streams > 1 and size // streams <= history_length:
+            raise ValueError('`size` / `streams` must be > `history_length`')
+        self.streams = streams
+        # the rings are equal and the remainder of the size is unused
+        self.stream_size = size // streams
+        size = self.stream_size * streams
+        self.frame_shape = tuple(frame_shape)
+        self.history_length = history_length
+        # initialize the ring of frames and the arrays of experience fields
+        shape = (size, *self.frame_shape)
+        self.frames = self._allocate('frames', shape, np.uint8)
+        self.a = self._allocate('a', (size, ), np.uint8)
+        self.r = self._allocate('r', (size, ), np.int8)
+        self.d = self._allocate('d', (size, ), bool)
+        # setup variables for the index and top
+        self.index = 0
+        self.top = 0
+        # the index and top of each ring of a queue split into streams
+        self.indexes = None
+        self.tops = None
+        if streams > 1:
+            self.indexes = np.zeros(streams, dtype=np.int64)
+            self.tops = np.zeros(streams, dtype=np.int64)
+        # the reusable buffers to sample batches into and to take batches
+        # into (so a taken batch doesn't overwrite a sampled one)
+        self._batch = None
+        self._taken = None
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of self."""
+        template = '{}(size={}, frame_shape={}, history_length={})'
+        if self.streams > 1:
+            template = template[:-1] + ', streams={})'
+        return template.format(
+            self.__class__.__name__,
+            self.size,
+            self.frame_shape,
+            self.history_length,
+            self.streams,
+        )
+
+    def _allocate(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        """
+        Allocate an array of zeros to store a field of the experiences in.
+
+        Args:
+            name: the name of the field the array stores
+            shape: the shape of the array
+            dtype: the data type of the array
+
+        Returns:
+            a new array of zeros
+
+        """
+        return np.zeros(shape, dtype=dtype)
+
+    @property
+    def size(self) -> int:
+        """Return the size of the queue."""
+        return len(self.a)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the number of bytes used by the queue's storage."""
+        return sum(array.nbytes for array in (
+            self.frames,
+            self.a,
+            self.r,
+            self.d,
+        ))
+
+    def _write_frame(self, index: int, frame: np.ndarray) -> None:
+        """
+        Write a frame to the ring of frames.
+
+        Args:
+            index: the index in the ring to write the frame to
+            frame: the frame to write
+
+        Returns:
+            None
+
+        """
+        self.frames[index] = frame
+
+    def _read_frame(self, index: int) -> np.ndarray:
+        """
+        Read a frame from the ring of frames.
+
+        Args:
+            index: the index in the ring to read the frame from
+
+        Returns:
+            the frame at the index
+
+        """
+        return self.frames[index]
+
+    def _check_history(self,
+        s: np.ndarray,
+        index: int,
+        previous: int,
+    ) -> None:
+        """
+        Raise an error if a state can't be rebuilt from the ring of frames.
+
+        Args:
+            s: the current state of the experience to push
+            index: the index of the experience in the ring, which holds the
+                newest frame of `s2` of the previous experience
+            previous: the index of the previous experience in the ring, or
+                None if the ring is empty
+
+        Returns:
+            None
+
+        """
+        if previous is None or self.d[previous]:
+            # the history of the first state of an episode is its first
+            # frame repeated (like `FrameStackEnv` on reset)
+            if not np.all(s[..., :-1] == s[..., -1:]):
+                msg = '`s` must repeat its first frame to start an episode'
+                raise ValueError(msg)
+        elif not np.array_equal(self._read_frame(index), s[..., -1]):
+            msg = '`s` must continue `s2` of the previous experience unless ' \
+                'the previous experience was terminal'
+            raise ValueError(msg)
+
+    def push(self,
+        s: np.ndarray,
+        a: int,
+        r: int,
+        d: bool,
+        s2: np.ndarray,
+        stream: int=0,
+    ) -> None:
+        """
+        Push a new experience onto the queue.
+
+        Notes:
+            only the newest frame of each state is stored, so `s` must be
+            `s2` of the previous experience (of the stream) unless that
+            experience was terminal, in which case `s` must start an episode
+            with its first frame repeated. a ValueError is raised otherwise
+
+        Args:
+            s: the current state
+            a: the action to get from current state `s` to next state `s2`
+            r: the reward resulting from taking action `a` in state `s`
+            d: the flag denoting whether the episode ended after action `a`
+            s2: the next state from taking action `a` in state `s`
+            stream: the index of the stream of the experience (if the queue
+                is split into streams)
+
+        Returns:
+            None
+
+        """
+        if self.tops is not None:
+            self._push_stream(s, a, r, d, s2, stream)
+            self.top = int(self.tops.sum())
+            return
+        s = np.asarray(s)
+        previous = (self.index - 1) % self.size if self.top else None
+        self._check_history(s, self.index, previous)
+        # store the newest frame of each state. the newest frame of `s2` is
+        # the newest frame of `s` for the next experience, so it goes in the
+        # next slot where the next push will overwrite it with the same frame
+        next_index = (self.index + 1) % self.size
+        self._write_frame(self.index, np.asarray(s)[..., -1])
+        self._write_frame(next_index, np.asarray(s2)[..., -1])
+        self.a[self.index] = a
+        self.r[self.index] = r
+        self.d[self.index] = d
+        # increment the index
+        self.index = (self.index + 1) % self.size
+        # increment the top pointer
+        if self.top < self.size:
+            self.top += 1
+
+    def _push_stream(self,
+        s: np.ndarray,
+        a: int,
+        r: int,
+        d: bool,
+        s2: np.ndarray,
+        stream: int,
+    ) -> None:
+        """
+        Push a new experience onto the ring of a stream.
+
+        Args:
+            s: the current state
+            a: the action to get from current state `s` to next state `s2`
+            r: the reward resulting from taking action `a` in state `s`
+            d: the flag denoting whether the episode ended after action `a`
+            s2: the next state from taking action `a` in state `s`
+            stream: the index of the stream of the experience
+
+        Returns:
+            None
+
+        """
+        # see `push`, the ring of the stream wraps around on its own
+        s = np.asarray(s)
+        local = int(self.indexes[stream])
+        start = stream * self.stream_size
+        index = start + local
+        previous = start + (local - 1) % self.stream_size
+        self._check_history(s, index, previous if self.tops[stream] else None)
+        self._write_frame(index, np.asarray(s)[..., -1])
+        next_index = start + (local + 1) % self.stream_size
+        self._write_frame(next_index, np.asarray(s2)[..., -1])
+        self.a[index] = a
+        self.r[index] = r
+        self.d[index] = d
+        # advance the ring after writing the experience (so a process
+        # sharing the rings never samples an experience being written)
+        self.indexes[stream] = (local + 1) % self.stream_size
+        if self.tops[stream] < self.stream_size:
+            self.tops[stream] += 1
+
+    def cut(self, stream: int=0) -> None:
+        """
+        End the episode of the last experience pushed (to a stream).
+
+        Notes:
+            the last experience is marked terminal, so the next push can
+            start a new episode (see `push`), e.g. after the environment is
+            reset before its episode is done or after restoring the queue.
+            this is how episodes cut short by a time limit end
+
+        Args:
+            stream: the index of the stream to end the episode of
+
+        Returns:
+            None
+
+        """
+        if self.tops is not None:
+            if self.tops[stream]:
+                local = (int(self.indexes[stream]) - 1) % self.stream_size
+                self.d[stream * self.stream_size + local] = True
+        elif self.top:
+            self.d[(self.index - 1) % self.size] = True
+
+    def _sample_indexes(self, size: int) -> np.ndarray:
+        """
+        Return a uniform random sample of valid experience indexes.
+
+        Args:
+            size: the number of indexes to sample
+
+        Returns:
+            a vector of indexes of experiences in the queue
+
+        """
+        if self.tops is not None:
+            return self._sample_stream_indexes(size)
+        if self.top < self.size:
+            return np.random.randint(0, self.top, size)
+        # when full, the slot at the index holds the newest frame of the last
+        # `s2` and the next `history_length - 1` experiences have this frame
+        # in their history, so skip these `history_length` experiences
+        offset = self.index + self.history_length
+        valid = self.size - self.history_length
+        return (offset + np.random.randint(0, valid, size)) % self.size
+
+    def _sample_stream_indexes(self, size: int) -> np.ndarray:
+        """
+        Return a uniform random sample of valid experience indexes of streams.
+
+        Args:
+            size: the number of indexes to sample
+
+        Returns:
+            a vector of indexes of experiences in the queue
+
+        """
+        # take a snapshot of the rings in case they're pushed to meanwhile
+        indexes = self.indexes.copy()
+        tops = self.tops.copy()
+        # see `_sample_indexes`
+        full = tops == self.stream_size
+        valid = np.where(full, self.stream_size - self.history_length, tops)
+        offsets = np.where(full, indexes + self.history_length, 0)
+        # sample the stream of each experience proportional to its valid
+        # experiences, then an experience uniformly from the stream
+        streams = np.random.choice(self.streams, size, p=valid / valid.sum())
+        local = (np.random.random(size) * valid[streams]).astype(np.int64)
+        local = (offsets[streams] + local) % self.stream_size
+
+        return streams * self.stream_size + local
+
+    def _frame_indexes(self, indexes: np.ndarray) -> np.ndarray:
+        """
+        Return the indexes of the frames in the states of experiences.
+
+        Args:
+            indexes: a vector of indexes of experiences in the queue
+
+        Returns:
+            a matrix with a row of `history_length + 1` frame indexes for each
+            experience. the first `history_length` columns are the frames of
+            `s` and the last `history_length` columns are the frames of `s2`
+
+        """
+        offsets = np.arange(1 - self.history_length, 2)
+        if self.tops is not None:
+            # the rings of the streams are independent
+            streams, local = np.divmod(indexes, self.stream_size)
+            frames = local[:, np.newaxis] + offsets
+            full = (self.tops[streams] == self.stream_size)[:, np.newaxis]
+            frames = np.where(full,
+                frames % self.stream_size,
+                np.maximum(frames, 0)
+            )
+            frames += (streams * self.stream_size)[:, np.newaxis]
+            return self._replace_previous_episodes(frames)
+        frames = indexes[:, np.newaxis] + offsets
+        if self.top < self.size:
+            # the first experience in the queue starts the history
+            frames = np.maximum(frames, 0)
+        else:
+            frames %= self.size
+
+        return self._replace_previous_episodes(frames)
+
+    def _replace_previous_episodes(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Replace the frames of previous episodes in the states of experiences.
+
+        Args:
+            frames: the matrix of frame indexes of the experiences
+
+        Returns:
+            the matrix with the frames of each state from previous episodes
+            replaced with the first frame of the episode of the state
+
+        """
+        # replace frames from previous episodes with the first frame of the
+        # episode (like `FrameStackEnv` does on reset), moving backward from
+        # the newest frame so terminal flags carry to all older frames
+        terminal = np.zeros(len(frames), dtype=bool)
+        for column in reversed(range(self.history_length - 1)):
+            terminal |= self.d[frames[:, column]]
+            frames[:, column] = np.where(terminal,
+                frames[:, column + 1],
+                frames[:, column]
+            )
+
+        return frames
+
+    def _batch_buffers(self, size: int, name: str='_batch') -> tuple:
+        """
+        Return the reusable buffers for a batch of a given size.
+
+        Args:
+            size: the number of experiences in the batch
+            name: the name of the attribute with the buffers, i.e. `_batch`
+                for samples and `_taken` for takes
+
+        Returns:
+            a tuple of preallocated arrays for s, a, r, d, and s2
+
+        """
+        # allocate new buffers only if the batch size changes
+        batch = getattr(self, name)
+        if batch is None or len(batch[1]) != size:
+            shape = (size, *self.frame_shape, self.history_length)
+            batch = (
+                np.empty(shape, dtype=np.uint8),
+                np.empty(size, dtype=self.a.dtype),
+                np.empty(size, dtype=self.r.dtype),
+                np.empty(size, dtype=self.d.dtype),
+                np.empty(shape, dtype=np.uint8),
+            )
+            setattr(self, name, batch)
+
+        return batch
+
+    def _gather_frames(self,
+        frames: np.ndarray,
+        s: np.ndarray,
+        s2: np.ndarray
+    ) -> None:
+        """
+        Gather the frames of states into batches.
+
+        Args:
+            frames: the matrix of frame indexes of the experiences
+            s: the batch of current states to gather frames into
+            s2: the batch of next states to gather frames into
+
+        Returns:
+            None
+
+        """
+        # gather the frames of each state into the batches one frame of the
+        # history at a time. the batches have the history last to match the
+        # layout of the stacks produced by `FrameStackEnv`. the indexes are
+        # in bounds so clip mode saves the copy numpy makes to check them
+        for column in range(self.history_length):
+            s_frames = frames[:, column]
+            s2_frames = frames[:, column + 1]
+            np.take(self.frames, s_frames, 0, s[..., column], 'clip')
+            np.take(self.frames, s2_frames, 0, s2[..., column], 'clip')
+
+    def _gather(self,
+        indexes: np.ndarray,
+        frames: np.ndarray,
+        batch: tuple
+    ) -> tuple:
+        """
+        Gather experiences into a batch.
+
+        Args:
+            indexes: a vector of indexes of experiences in the queue
+            frames: the matrix of frame indexes of the experiences
+            batch: the tuple of arrays for s, a, r, d, and s2 to gather into
+
+        Returns:
+            the batch
+
+        """
+        s, a, r, d, s2 = batch
+        self._gather_frames(frames, s, s2)
+        np.take(self.a, indexes, out=a, mode='clip')
+        np.take(self.r, indexes, out=r, mode='clip')
+        np.take(self.d, indexes, out=d, mode='clip')
+
+        return batch
+
+    def _take(self, indexes: np.ndarray, name: str) -> tuple:
+        """
+        Gather the experiences at the given indexes into a set of buffers.
+
+        Args:
+            indexes: a vector of indexes of experiences in the queue
+            name: the name of the attribute with the buffers
+
+        Returns:
+            a tuple of the batches s, a, r, d, and s2 of the experiences
+
+        """
+        indexes = np.asarray(indexes)
+        frames = self._frame_indexes(indexes)
+        batch = self._batch_buffers(len(indexes), name)
+        return self._gather(indexes, frames, batch)
+
+    def take(self, indexes: np.ndarray, out: tuple=None) -> tuple:
+        """
+        Return the experiences at the given indexes.
+
+        Notes:
+            unless `out` is given, the arrays of the batch are buffers owned
+            by the queue that are overwritten by the next call to take.
+            samples have buffers of their own, so a take doesn't overwrite a
+            sampled batch
+
+        Args:
+            indexes: a vector of indexes of experiences in the queue
+            out: the arrays for s, a, r, d, and s2 to gather the experiences
+                into. if None, the buffers of the queue
+
+        Returns:
+            a tuple of the batches s, a, r, d, and s2 of the experiences
+
+        """
+        if out is None:
+            return self._take(indexes, '_taken')
+        indexes = np.asarray(indexes)
+        return self._gather(indexes, self._frame_indexes(indexes), out)
+
+    def sample(self, size: int=32) -> tuple:
+        """
+        Return a random sample of items from the queue.
+
+        Notes:
+            the arrays of the sample are buffers owned by the queue that are
+            overwritten by the next call to sample (but not by take)
+
+        Args:
+            size: the number of items to sample and return
+
+        Returns:
+            A random sample from the queue sampled uniformly
+
+        """
+        return self._take(self._sample_indexes(size), '_batch')
+
+
+# explicitly define the outward facing API of this module
+__all__ = [FrameReplayQueue.__name__]
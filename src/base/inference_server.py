@@ -0,0 +1,323 @@
+"""A server that batches the inference requests of many acting processes."""
+from multiprocessing import connection
+from multiprocessing import shared_memory
+import multiprocessing
+import threading
+import time
+from typing import Callable
+import numpy as np
+from .phase_timer import PhaseTimer
+
+
+def _layout(num_clients: int,
+    input_shape: tuple,
+    input_dtype: np.dtype,
+    output_shape: tuple,
+) -> tuple:
+    """Return the shapes, dtypes, and offsets of the arrays of a server."""
+    arrays = [
+        ((num_clients, *input_shape), np.dtype(input_dtype)),
+        ((num_clients, *output_shape), np.dtype(np.float32)),
+        ((num_clients, ), np.dtype(np.float64)),
+    ]
+    offsets = np.cumsum([0] + [int(np.prod(s)) * d.itemsize for s, d in arrays])
+    return arrays, offsets
+
+
+def _attach(block: shared_memory.SharedMemory, arrays: list, offsets: list) -> list:
+    """Return the arrays of a server in a block of shared memory."""
+    return [
+        np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=int(offset))
+        for (shape, dtype), offset in zip(arrays, offsets[:-1])
+    ]
+
+
+class InferenceClient(object):
+    """A handle of an acting process to request inferences from a server."""
+
+    def __init__(self,
+        name: str,
+        index: int,
+        num_clients: int,
+        input_shape: tuple,
+        input_dtype: np.dtype,
+        output_shape: tuple,
+        conn: connection.Connection,
+    ) -> None:
+        """
+        Initialize a new client of an inference server.
+
+        Notes:
+            clients are built by the server (see `InferenceServer.clients`)
+            and pickled to pass them to acting processes
+
+        Args:
+            name: the name of the block of shared memory of the server
+            index: the index of the client (and of its slots in the block)
+            num_clients: the number of clients of the server
+            input_shape: the shape of a single input
+            input_dtype: the dtype of the inputs
+            output_shape: the shape of a single output
+            conn: the end of the pipe of the client to signal the server on
+
+        Returns:
+            None
+
+        """
+        self.name = name
+        self.index = index
+        self.num_clients = num_clients
+        self.input_shape = tuple(input_shape)
+        self.input_dtype = np.dtype(input_dtype)
+        self.output_shape = tuple(output_shape)
+        self.conn = conn
+        arrays, offsets = _layout(num_clients, input_shape, input_dtype, output_shape)
+        self._block = shared_memory.SharedMemory(name=name)
+        inputs, outputs, stamps = _attach(self._block, arrays, offsets)
+        # the slots of this client
+        self.input = inputs[index]
+        self.output = outputs[index]
+        self._stamps = stamps
+
+    def __getstate__(self) -> dict:
+        """Return the arguments to attach to the server from another process."""
+        return dict(
+            name=self.name,
+            index=self.index,
+            num_clients=self.num_clients,
+            input_shape=self.input_shape,
+            input_dtype=self.input_dtype.str,
+            output_shape=self.output_shape,
+            conn=self.conn,
+        )
+
+    def __setstate__(self, state: dict) -> None:
+        """Attach to the server of another process."""
+        self.__init__(**state)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        """
+        Return the output of the model of the server for a single input.
+
+        Args:
+            x: the input to infer the output of
+
+        Returns:
+            a view of the output, which the next call overwrites
+
+        """
+        self.input[...] = x
+        self._stamps[self.index] = time.perf_counter()
+        self.conn.send_bytes(b'\0')
+        self.conn.recv_bytes()
+        return self.output
+
+    def close(self) -> None:
+        """Detach from the server."""
+        self.input = self.output = self._stamps = None
+        self._block.close()
+        self.conn.close()
+
+
+class InferenceServer(object):
+    """A server that batches the inference requests of many acting processes."""
+
+    def __init__(self,
+        predict: Callable,
+        input_shape: tuple,
+        output_shape: tuple,
+        num_clients: int,
+        input_dtype: np.dtype=np.uint8,
+        max_batch_size: int=None,
+        max_wait_us: int=1000,
+    ) -> None:
+        """
+        Initialize a new inference server.
+
+        Notes:
+            each client has a slot for its input and its output in a block
+            of shared memory and a pipe to the server. a client writes its
+            input to its slot and sends a byte on its pipe, and the server
+            replies with a byte once the output is in the slot of the client.
+            after the first request of a batch, the server waits up to
+            `max_wait_us` microseconds for more requests (or until the batch
+            has `max_batch_size` requests) before running the model once on
+            the whole batch. the queueing latency of a request is the time
+            from the request to the start of the forward pass of its batch
+            (`time.perf_counter` is the same clock in every process). an
+            error that stops the server (e.g. from `predict`) closes the
+            pipes of the server, so clients raise an EOFError instead of
+            waiting forever, and `stop` raises the error
+
+        Args:
+            predict: a callable that returns a batch of outputs for a batch
+                of inputs (e.g., the Q values of the model of an agent)
+            input_shape: the shape of a single input
+            output_shape: the shape of a single output
+            num_clients: the number of clients (i.e., acting processes)
+            input_dtype: the dtype of the inputs
+            max_batch_size: the max number of requests in a batch. if None,
+                a batch can have a request from every client
+            max_wait_us: the max number of microseconds to wait for more
+                requests after the first request of a batch
+
+        Returns:
+            None
+
+        """
+        if max_batch_size is None:
+            max_batch_size = num_clients
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.predict = predict
+        self.input_shape = tuple(input_shape)
+        self.output_shape = tuple(output_shape)
+        self.num_clients = num_clients
+        self.input_dtype = np.dtype(input_dtype)
+        self.max_batch_size = max_batch_size
+        self.max_wait_us = max_wait_us
+        arrays, offsets = _layout(num_clients, input_shape, input_dtype, output_shape)
+        self._block = shared_memory.SharedMemory(create=True, size=int(offsets[-1]))
+        self.name = self._block.name
+        self.inputs, self.outputs, self._stamps = _attach(self._block, arrays, offsets)
+        pipes = [multiprocessing.Pipe() for _ in range(num_clients)]
+        self._conns = [server for server, _ in pipes]
+        self._indexes = {conn: index for index, conn in enumerate(self._conns)}
+        self.clients = [
+            InferenceClient(self.name, index, num_clients,
+                input_shape,
+                input_dtype,
+                output_shape,
+                conn=client,
+            )
+            for index, (_, client) in enumerate(pipes)
+        ]
+        # the number of batches of each size, and the timers of the queueing
+        # latency of requests and the forward passes of batches
+        self.batch_sizes = np.zeros(max_batch_size + 1, dtype=np.int64)
+        self.timer = PhaseTimer()
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+
+    def __repr__(self) -> str:
+        """Return a debugging string of the server."""
+        return '{}(input_shape={}, output_shape={}, num_clients={}, ' \
+            'input_dtype={}, max_batch_size={}, max_wait_us={})'.format(
+                self.__class__.__name__,
+                self.input_shape,
+                self.output_shape,
+                self.num_clients,
+                self.input_dtype,
+                self.max_batch_size,
+                self.max_wait_us,
+            )
+
+    @property
+    def mean_batch_size(self) -> float:
+        """Return the mean size of the batches served."""
+        batches = self.batch_sizes.sum()
+        if batches == 0:
+            return 0.0
+        return np.dot(np.arange(len(self.batch_sizes)), self.batch_sizes) / batches
+
+    def stats(self) -> dict:
+        """
+        Return the statistics of the batches and requests served.
+
+        Returns:
+            a dictionary of the number of batches of each size, the mean
+            batch size, and the statistics of the queueing latency and the
+            forward pass in the format of `PhaseTimer.stats`
+
+        """
+        return dict(
+            batch_sizes={
+                size: int(count)
+                for size, count in enumerate(self.batch_sizes) if count
+            },
+            mean_batch_size=self.mean_batch_size,
+            **self.timer.stats(),
+        )
+
+    @property
+    def error(self) -> BaseException:
+        """Return the error that stopped the server (None if serving)."""
+        return self._error
+
+    def serve(self) -> None:
+        """Serve batches of requests until stopped (or an error)."""
+        try:
+            self._serve()
+        except BaseException as error:
+            self._error = error
+            # wake up the waiting clients with an EOFError
+            for conn in self._conns:
+                conn.close()
+
+    def _serve(self) -> None:
+        """Serve batches of requests until stopped."""
+        max_wait = self.max_wait_us * 1e-6
+        while not self._stop.is_set():
+            ready = connection.wait(self._conns, timeout=0.1)
+            if not ready:
+                continue
+            requests = ready[:self.max_batch_size]
+            # wait for more requests to batch until the deadline
+            deadline = time.perf_counter() + max_wait
+            while len(requests) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                idle = [conn for conn in self._conns if conn not in requests]
+                ready = connection.wait(idle, timeout=timeout)
+                if not ready:
+                    break
+                requests += ready[:self.max_batch_size - len(requests)]
+            for conn in requests:
+                conn.recv_bytes()
+            indexes = np.array([self._indexes[conn] for conn in requests])
+            # run the model once on the inputs of the whole batch
+            start = time.perf_counter()
+            for stamp in self._stamps[indexes]:
+                self.timer.record('queue', stamp, start)
+            self.outputs[indexes] = self.predict(self.inputs[indexes])
+            self.timer.record('forward', start, time.perf_counter())
+            self.batch_sizes[len(indexes)] += 1
+            for conn in requests:
+                conn.send_bytes(b'\0')
+
+    def start(self) -> None:
+        """Start serving requests in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.serve, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving requests and raise the error that stopped the server."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self) -> None:
+        """Stop serving and free the shared memory of the server."""
+        try:
+            self.stop()
+        finally:
+            for client in self.clients:
+                client.close()
+            for conn in self._conns:
+                conn.close()
+            self.inputs = self.outputs = self._stamps = None
+            self._block.close()
+            self._block.unlink()
+
+
+# explicitly define the outward facing API of this module
+__all__ = [InferenceClient.__name__, InferenceServer.__name__]
@@ -0,0 +1,85 @@
+"""A frame replay queue stored in memory-mapped files."""
+import os
+import numpy as np
+from .frame_replay_queue import FrameReplayQueue
+
+
+class MemmapReplayQueue(FrameReplayQueue):
+    """A frame replay queue stored in memory-mapped files on disk."""
+
+    def __init__(self,
+        size: int,
+        directory: str,
+        frame_shape: tuple=(84, 84),
+        history_length: int=4,
+        streams: int=1,
+    ) -> None:
+        """
+        Initialize a new memory-mapped frame replay buffer.
+
+        Notes:
+            the frames and experience fields are stored in `.npy` files in
+            the directory and accessed through memory maps, so the queue can
+            be larger than RAM and the OS page cache keeps hot data in memory
+
+        Args:
+            size: the size of the replay buffer
+                  (the number of previous experiences to store)
+            directory: the directory to store the memory-mapped files in
+            frame_shape: the shape of the individual frames in a state
+            history_length: the number of frames stacked into a state
+            streams: the number of rings to split the queue into (e.g. one
+                for each environment of a vector)
+
+        Returns:
+            None
+
+        """
+        self.directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        super().__init__(size, frame_shape, history_length, streams)
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of self."""
+        template = '{}(size={}, directory={}, frame_shape={}, ' \
+            'history_length={})'
+        if self.streams > 1:
+            template = template[:-1] + ', streams={})'
+        return template.format(
+            self.__class__.__name__,
+            self.size,
+            repr(self.directory),
+            self.frame_shape,
+            self.history_length,
+            self.streams,
+        )
+
+    def _allocate(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        """
+        Allocate a memory-mapped array to store a field of the experiences in.
+
+        Args:
+            name: the name of the field the array stores
+            shape: the shape of the array
+            dtype: the data type of the array
+
+        Returns:
+            a new memory-mapped array of zeros
+
+        """
+        filename = os.path.join(self.directory, '{}.npy'.format(name))
+        return np.lib.format.open_memmap(filename,
+            mode='w+',
+            dtype=dtype,
+            shape=shape
+        )
+
+    def flush(self) -> None:
+        """Write any changes in the memory-mapped arrays to disk."""
+        for array in (self.frames, self.a, self.r, self.d):
+            array.flush()
+
+
+# explicitly define the outward facing API of this module
+__all__ = [MemmapReplayQueue.__name__]
@@ -0,0 +1,181 @@
+"""Low overhead timers for the phases of a training loop."""
+import json
+import os
+import threading
+import time
+import numpy as np
+
+
+class _Phase(object):
+    """A reusable context manager that times a phase of a `PhaseTimer`."""
+
+    __slots__ = ['timer', 'name', 'start']
+
+    def __init__(self, timer: 'PhaseTimer', name: str) -> None:
+        self.timer = timer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args) -> None:
+        self.timer.record(self.name, self.start, time.perf_counter())
+
+
+class PhaseTimer(object):
+    """Low overhead timers for the phases of a training loop."""
+
+    def __init__(self,
+        window: int=4096,
+        trace: bool=False,
+        max_events: int=1000000,
+    ) -> None:
+        """
+        Initialize a new timer of phases.
+
+        Notes:
+            the durations of each phase are kept in a ring of the last
+            `window` durations that the statistics are calculated over. with
+            `trace`, an event is also kept for each timed phase (up to
+            `max_events`) to export in the Chrome trace event format
+
+        Args:
+            window: the number of recent durations of each phase to keep
+            trace: whether to keep the events of timed phases for a trace
+            max_events: the max number of events to keep for a trace
+
+        Returns:
+            None
+
+        """
+        self.window = window
+        self.trace = trace
+        self.max_events = max_events
+        # the phases (context managers) and the ring of durations of each
+        self._phases = {}
+        self._durations = {}
+        self._counts = {}
+        self._totals = {}
+        # the events of the trace as tuples of name, start, and end
+        self.events = []
+        self._origin = time.perf_counter()
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of this timer."""
+        return '{}(window={}, trace={}, max_events={})'.format(
+            self.__class__.__name__,
+            self.window,
+            self.trace,
+            self.max_events,
+        )
+
+    def __call__(self, name: str) -> _Phase:
+        """
+        Return a context manager that times a phase.
+
+        Args:
+            name: the name of the phase to time
+
+        Returns:
+            a context manager that records the duration of its block
+
+        """
+        try:
+            return self._phases[name]
+        except KeyError:
+            self._phases[name] = _Phase(self, name)
+            self._durations[name] = np.zeros(self.window)
+            self._counts[name] = 0
+            self._totals[name] = 0.0
+            return self._phases[name]
+
+    def record(self, name: str, start: float, end: float) -> None:
+        """
+        Record a timed phase.
+
+        Args:
+            name: the name of the phase
+            start: the `time.perf_counter` at the start of the phase
+            end: the `time.perf_counter` at the end of the phase
+
+        Returns:
+            None
+
+        """
+        if name not in self._durations:
+            self(name)
+        count = self._counts[name]
+        self._durations[name][count % self.window] = end - start
+        self._counts[name] = count + 1
+        self._totals[name] += end - start
+        if self.trace and len(self.events) < self.max_events:
+            self.events.append((name, start, end))
+
+    def stats(self) -> dict:
+        """
+        Return the statistics of the recent durations of each phase.
+
+        Returns:
+            a dictionary mapping the name of each phase to a dictionary of the
+            count and total seconds of all the durations, and the mean, 50th,
+            and 99th percentile milliseconds of the recent durations
+
+        """
+        stats = {}
+        for name, durations in self._durations.items():
+            count = self._counts[name]
+            if count == 0:
+                continue
+            recent = 1000 * durations[:min(count, self.window)]
+            p50, p99 = np.percentile(recent, [50, 99])
+            stats[name] = dict(
+                count=count,
+                total=self._totals[name],
+                mean=recent.mean(),
+                p50=p50,
+                p99=p99,
+            )
+
+        return stats
+
+    def postfix(self) -> dict:
+        """Return the mean and 99th percentile of each phase for tqdm."""
+        return {
+            name: '{:.2f}/{:.2f}ms'.format(stats['mean'], stats['p99'])
+            for name, stats in self.stats().items()
+        }
+
+    def write_trace(self, path: str) -> None:
+        """
+        Write the events of the timed phases to a Chrome trace event file.
+
+        Notes:
+            the file can be opened in chrome://tracing or Perfetto
+
+        Args:
+            path: the path of the JSON file to write
+
+        Returns:
+            None
+
+        """
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events = [
+            dict(
+                name=name,
+                ph='X',
+                ts=1e6 * (start - self._origin),
+                dur=1e6 * (end - start),
+                pid=pid,
+                tid=tid,
+            )
+            for name, start, end in self.events
+        ]
+        with open(path, 'w') as trace_file:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms'), trace_file)
+
+
+# explicitly define the outward facing API of this module
+__all__ = [PhaseTimer.__name__]
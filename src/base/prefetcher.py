@@ -0,0 +1,206 @@
+"""A background sampler that prefetches minibatches from a replay queue."""
+import queue
+import threading
+import time
+import numpy as np
+
+
+class Prefetcher(object):
+    """A background thread that keeps a bounded queue of ready minibatches."""
+
+    def __init__(self,
+        replay_queue,
+        batch_size: int=32,
+        depth: int=2,
+        max_staleness: int=None,
+        lock: threading.Lock=None,
+    ) -> None:
+        """
+        Initialize a new prefetcher for a replay queue.
+
+        Notes:
+            the replay queue is shared with the thread that pushes to it, so
+            every mutation of the replay queue (pushes, priority updates, and
+            takes into its buffers) must hold the lock of the prefetcher. the
+            prefetcher copies each sample out of the buffers of the replay
+            queue while it holds the lock. the `pushes` of a prioritized
+            queue when the minibatch last returned by `sample` was sampled
+            is `batch_pushes`, to drop the priority updates of experiences
+            overwritten since (see `PrioritizedReplayQueue.update_priorities`).
+            the β of a prioritized queue steps when `sample` returns a
+            minibatch, rather than when the minibatch is sampled ahead (and
+            maybe discarded as stale or when the prefetcher stops)
+
+        Args:
+            replay_queue: the replay queue to sample minibatches from
+            batch_size: the number of experiences in each minibatch
+            depth: the max number of ready minibatches to keep
+            max_staleness: the max number of pushes to the replay queue
+                since a minibatch was sampled for it to still be used. if
+                None, minibatches are never discarded
+            lock: the lock that guards the replay queue. if None, a new lock
+                is created
+
+        Returns:
+            None
+
+        """
+        if depth < 1:
+            raise ValueError('`depth` must be >= 1')
+        self.replay_queue = replay_queue
+        self.batch_size = batch_size
+        self.depth = depth
+        self.max_staleness = max_staleness
+        self.lock = threading.Lock() if lock is None else lock
+        # the number of pushes to the replay queue
+        self.pushes = 0
+        # the statistics about the batches returned to the learner
+        self.batches = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.discarded = 0
+        self.batch_pushes = None
+        # the queue of ready minibatches, the thread that fills it, and the
+        # error that stopped the thread
+        self._ready = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of self."""
+        return '{}(replay_queue={}, batch_size={}, depth={}, max_staleness={})'.format(
+            self.__class__.__name__,
+            self.replay_queue,
+            self.batch_size,
+            self.depth,
+            self.max_staleness,
+        )
+
+    @property
+    def wait_rate(self) -> float:
+        """Return the fraction of minibatches the learner had to wait for."""
+        if self.batches == 0:
+            return 0.0
+        return self.waits / self.batches
+
+    def push(self, *experience) -> None:
+        """
+        Push an experience onto the replay queue.
+
+        Args:
+            experience: the arguments to the push method of the replay queue
+
+        Returns:
+            None
+
+        """
+        with self.lock:
+            self.replay_queue.push(*experience)
+            self.pushes += 1
+
+    def _run(self) -> None:
+        """Sample minibatches into the queue of ready minibatches until stopped."""
+        try:
+            while not self._stop.is_set():
+                with self.lock:
+                    pushes = self.pushes
+                    # queues that count their pushes (i.e. prioritized ones)
+                    counted = getattr(self.replay_queue, 'pushes', None)
+                    if counted is not None:
+                        counted = np.copy(counted)
+                    # undo the step of β of prioritized queues, it steps when
+                    # the minibatch is returned by sample
+                    beta = getattr(self.replay_queue, 'beta', None)
+                    value = None if beta is None else beta.value
+                    batch = self.replay_queue.sample(size=self.batch_size)
+                    batch = tuple(np.copy(array) for array in batch)
+                    if beta is not None:
+                        beta.value = value
+                # block while the queue of minibatches is full, waking up
+                # periodically to check if the prefetcher stopped
+                while not self._stop.is_set():
+                    try:
+                        self._ready.put((pushes, counted, batch), timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+        except BaseException as error:
+            # raise the error in the thread of the learner when it samples
+            self._error = error
+
+    def start(self) -> None:
+        """Start sampling minibatches in the background."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling minibatches and discard the ready ones."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        # discard the remaining minibatches, they're stale by the next start
+        while not self._ready.empty():
+            self._ready.get_nowait()
+
+    def _get(self) -> tuple:
+        """Return the next ready minibatch, raising if the thread died."""
+        # wake up periodically to check if the thread died without a batch
+        while True:
+            try:
+                return self._ready.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            if self._error is not None:
+                raise self._error
+            if self._thread is None or not self._thread.is_alive():
+                raise RuntimeError('the prefetcher is not running')
+
+    def sample(self) -> tuple:
+        """
+        Return the next ready minibatch, waiting for one if necessary.
+
+        Notes:
+            an error that stops the thread of the prefetcher (e.g. from
+            sampling the replay queue) is raised here, as is a RuntimeError
+            if the prefetcher isn't running, instead of waiting forever
+
+        Returns:
+            a minibatch sampled from the replay queue, with the same layout
+            as the return value of the sample method of the replay queue
+
+        """
+        self.batches += 1
+        waited = False
+        while True:
+            try:
+                pushes, counted, batch = self._ready.get_nowait()
+            except queue.Empty:
+                waited = True
+                start = time.perf_counter()
+                pushes, counted, batch = self._get()
+                self.wait_time += time.perf_counter() - start
+            # discard minibatches sampled too many pushes ago
+            if self.max_staleness is None:
+                break
+            if self.pushes - pushes <= self.max_staleness:
+                break
+            self.discarded += 1
+        self.waits += waited
+        self.batch_pushes = counted
+        beta = getattr(self.replay_queue, 'beta', None)
+        if beta is not None:
+            with self.lock:
+                beta.step()
+
+        return batch
+
+
+# explicitly define the outward facing API of this module
+__all__ = [Prefetcher.__name__]
@@ -1,18 +1,43 @@
 """A priority queue for storing previous experiences to sample from."""
-import itertools
-from heapq import heappush, heappushpop
 import numpy as np
+from .annealing_variable import AnnealingVariable
+from .frame_replay_queue import FrameReplayQueue
+from .segment_tree import MinTree
+from .segment_tree import SumTree
 
 
-class PrioritizedReplayQueue(object):
+class PrioritizedReplayQueue(FrameReplayQueue):
     """A prioritized replay queue for replaying previous experiences."""
 
-    def __init__(self, size: int) -> None:
+    def __init__(self,
+        size: int,
+        frame_shape: tuple=(84, 84),
+        history_length: int=4,
+        alpha: float=0.6,
+        beta: AnnealingVariable=None,
+        epsilon: float=1e-6,
+    ) -> None:
         """
         Initialize a new prioritized replay buffer with a given size.
 
+        Notes:
+            experiences are sampled with probability proportional to their
+            priority, p^α, using a sum tree (and the smallest priority is
+            tracked with a min tree) as described in "Prioritized Experience
+            Replay" (Schaul et al. 2015)
+
         Args:
             size: the max number of experiences to store in the queue
+            frame_shape: the shape of the individual frames in a state
+            history_length: the number of frames stacked into a state
+            alpha: the exponent, α, determining how much prioritization is
+                used (0 is uniform sampling)
+            beta: the exponent, β, of the importance-sampling weights that
+                correct the bias of prioritized sampling, expected as an
+                AnnealingVariable subclass that is stepped every sample. if
+                None, β anneals from 0.4 to 1 over 1e6 samples
+            epsilon: a small constant added to the absolute TD-errors so no
+                experience has zero priority
 
         Returns:
             None
@@ -22,26 +47,45 @@ class PrioritizedReplayQueue(object):
         if not isinstance(size, int):
             raise TypeError('`size` must be of type int')
         # ensure the size is within a legal range of values
-        if size <= 0:
-            raise ValueError('`size` must be > 0')
-        self.size = size
-        # initialize the priority queue as a heap
-        self.heap = []
-        # create a counter for resolving issues of equal priority. multi-
-        # dimensional numpy arrays can't be directly compared, thus rendering
-        # a value error if we try to compare them. Thus adding a unique count
-        # as the secondary comparison (after priority) prevents the comparison
-        # of numpy arrays altogether
-        self.counter = itertools.count()
+        if size <= history_length:
+            raise ValueError('`size` must be > `history_length`')
+        super().__init__(size, frame_shape, history_length)
+        self.alpha = alpha
+        if beta is None:
+            beta = AnnealingVariable(0.4, 1.0, 1000000)
+        self.beta = beta
+        self.epsilon = epsilon
+        # setup the trees of priorities and the max priority for new items
+        self.sum_tree = SumTree(size)
+        self.min_tree = MinTree(size)
+        self.max_priority = 1.0
+        # flags for experiences pushed without a priority that still have
+        # the max priority in place of the priority from their TD-error
+        self.stale = np.zeros(size, dtype=bool)
+        # the number of experiences pushed onto the queue
+        self.pushes = 0
 
     def __repr__(self) -> str:
         """Return an executable string representation of priority queue."""
-        return '{}(size={})'.format(self.__class__.__name__, self.size)
+        template = '{}(size={}, frame_shape={}, history_length={}, ' \
+            'alpha={}, beta={}, epsilon={})'
+        return template.format(
+            self.__class__.__name__,
+            self.size,
+            self.frame_shape,
+            self.history_length,
+            self.alpha,
+            self.beta,
+            self.epsilon,
+        )
 
-    @property
-    def top(self)-> int:
-        """Return the index of the top element in the queue."""
-        return len(self.heap)
+    def _invalid_indexes(self) -> np.ndarray:
+        """Return the indexes of experiences that can't be sampled."""
+        if self.top < self.size:
+            return np.arange(0)
+        # see `FrameReplayQueue._sample_indexes`
+        offsets = np.arange(self.history_length)
+        return (self.index + offsets) % self.size
 
     def push(self,
         s: np.ndarray,
@@ -49,7 +93,7 @@ class PrioritizedReplayQueue(object):
         r: int,
         d: bool,
         s2: np.ndarray,
-        priority: float
+        priority: float=None
     ) -> None:
         """
         Push a new experience onto the queue.
@@ -60,58 +104,131 @@ class PrioritizedReplayQueue(object):
             r: the reward resulting from taking action `a` in state `s`
             d: the flag denoting whether the episode ended after action `a`
             s2: the next state from taking action `a` in state `s`
-            priority: the priority of the item to push to the queue
+            priority: the priority of the item to push to the queue, i.e.,
+                the TD-error of the experience. if None, the experience gets
+                the max priority in the queue and is marked stale until its
+                priority is updated
 
         Returns:
             None
 
         """
-        # get the unique count for this item
-        count = next(self.counter)
-        # if the heap has arrived at capacity, use push pop to add new items
-        if len(self.heap) == self.size:
-            heappushpop(self.heap, (priority, count, (s, a, r, d, s2)))
-        # otherwise heap push the item onto the queue
+        index = self.index
+        full = self.top == self.size
+        super().push(s, a, r, d, s2)
+        if priority is None:
+            priority = self.max_priority
+            self.stale[index] = True
         else:
-            heappush(self.heap, (priority, count, (s, a, r, d, s2)))
+            priority = (abs(priority) + self.epsilon)**self.alpha
+            self.max_priority = max(self.max_priority, priority)
+            self.stale[index] = False
+        self.sum_tree[index] = priority
+        self.min_tree[index] = priority
+        self.pushes += 1
+        # remove the experiences invalidated by the push from the trees. the
+        # push that fills the queue invalidates `history_length` experiences
+        # and each push after invalidates one more
+        if self.top == self.size:
+            invalid = self._invalid_indexes()
+            if full:
+                invalid = invalid[-1]
+            self.sum_tree[invalid] = SumTree.identity
+            self.min_tree[invalid] = MinTree.identity
+            self.stale[invalid] = False
+
+    def stale_indexes(self) -> np.ndarray:
+        """Return the indexes of experiences that have a stale priority."""
+        return np.flatnonzero(self.stale)
+
+    def _sample_indexes(self, size: int) -> np.ndarray:
+        """
+        Return a prioritized random sample of valid experience indexes.
+
+        Args:
+            size: the number of indexes to sample
+
+        Returns:
+            a vector of indexes of experiences in the queue
 
-    def sample(self, size: int=32) -> bool:
+        """
+        if not self.sum_tree.root > 0:
+            raise ValueError('the queue has no experiences to sample')
+        # sample one prefix sum uniformly from each of `size` equal segments
+        # of the total priority (i.e. stratified sampling)
+        segment = self.sum_tree.root / size
+        prefix_sums = (np.arange(size) + np.random.random(size)) * segment
+        return self.sum_tree.find(prefix_sums)
+
+    def sample(self, size: int=32) -> tuple:
         """
         Return a random sample of items from the queue.
 
+        Notes:
+            the arrays of the sample are buffers owned by the queue that are
+            overwritten by the next call to sample (but not by take)
+
         Args:
             size: the number of items to sample and return
 
         Returns:
-            A random sample from the queue sampled uniformly
+            a random sample from the queue sampled by priority as a tuple of
+            s, a, r, d, s2, the importance-sampling weights of the sample, and
+            the indexes of the sample to update the priorities of
 
         """
-        # extract a sample from the heap (priorities are in increasing order)
-        # i.e. the lowest priority value is the first item in the sample.
-        # ignore the first two values in each heap item (priority & count)
-        sample_batch = [experience for (_, _, experience) in self.heap[-size:]]
-        # initialize lists for each component of the batch
-        s = [None] * len(sample_batch)
-        a = [None] * len(sample_batch)
-        r = [None] * len(sample_batch)
-        d = [None] * len(sample_batch)
-        s2 = [None] * len(sample_batch)
-        # iterate over the indexes and copy references to the arrays
-        for batch, sample in enumerate(sample_batch):
-            _s, _a, _r, _d, _s2 = sample
-            s[batch] = np.array(_s, copy=False)
-            a[batch] = _a
-            r[batch] = _r
-            d[batch] = _d
-            s2[batch] = np.array(_s2, copy=False)
-        # convert the lists to arrays for returning for training
-        return (
-            np.array(s),
-            np.array(a, dtype=np.uint8),
-            np.array(r, dtype=np.int8),
-            np.array(d, dtype=np.bool),
-            np.array(s2),
-        )
+        indexes = self._sample_indexes(size)
+        batch = self._take(indexes, '_batch')
+        # calculate the importance-sampling weights, (N * P(i))^-β, scaled
+        # by the max weight for stability. the max weight is that of the
+        # smallest priority so N and the total priority cancel out
+        beta = self.beta.value
+        priorities = self.sum_tree[indexes]
+        # the sampled priorities are positive, so they bound the smallest
+        # priority if the min tree has a zero priority (with a zero epsilon)
+        smallest = self.min_tree.root
+        if not 0 < smallest <= priorities.min():
+            smallest = priorities.min()
+        weights = (priorities / smallest)**-beta
+        self.beta.step()
+
+        return (*batch, weights.astype(np.float32), indexes)
+
+    def update_priorities(self,
+        indexes: np.ndarray,
+        td_errors: np.ndarray,
+        pushes: int=None,
+    ) -> None:
+        """
+        Update the priorities of experiences from new TD-errors.
+
+        Args:
+            indexes: the indexes of the experiences returned by sample
+            td_errors: the TD-errors of the experiences
+            pushes: the `pushes` of the queue when the experiences were
+                sampled. if not None, the priorities of experiences that were
+                overwritten by pushes since are left as pushed
+
+        Returns:
+            None
+
+        """
+        indexes = np.asarray(indexes)
+        priorities = (np.abs(td_errors) + self.epsilon)**self.alpha
+        # ignore experiences that were invalidated since they were sampled
+        valid = ~np.isin(indexes, self._invalid_indexes())
+        if pushes is not None:
+            # and the experiences in the slots of the pushes since, i.e. the
+            # slots before the index
+            since = min(self.pushes - int(pushes), self.size)
+            valid &= (self.index - 1 - indexes) % self.size >= since
+        indexes = indexes[valid]
+        priorities = priorities[valid]
+        if len(priorities):
+            self.max_priority = max(self.max_priority, priorities.max())
+            self.sum_tree[indexes] = priorities
+            self.min_tree[indexes] = priorities
+            self.stale[indexes] = False
 
 
 # explicitly define the outward facing API of this module
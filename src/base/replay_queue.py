@@ -17,11 +17,18 @@ class ReplayQueue(object):
             None
 
         """
-        # initialize the queue data-structure as a list of nil values
-        self.queue = [None] * size
+        # initialize the arrays of experience fields. the arrays of states
+        # are allocated on the first push when their shape is known
+        self.s = None
+        self.a = np.zeros(size, dtype=np.uint8)
+        self.r = np.zeros(size, dtype=np.int8)
+        self.d = np.zeros(size, dtype=bool)
+        self.s2 = None
         # setup variables for the index and top
         self.index = 0
         self.top = 0
+        # the reusable buffers to sample batches into
+        self._batch = None
 
     def __repr__(self) -> str:
         """Return an executable string representation of self."""
@@ -30,7 +37,30 @@ class ReplayQueue(object):
     @property
     def size(self) -> int:
         """Return the size of the queue."""
-        return len(self.queue)
+        return len(self.a)
+
+    def _batch_buffers(self, size: int) -> tuple:
+        """
+        Return the reusable buffers for a batch of a given size.
+
+        Args:
+            size: the number of experiences in the batch
+
+        Returns:
+            a tuple of preallocated arrays for s, a, r, d, and s2
+
+        """
+        # allocate new buffers only if the batch size changes
+        if self._batch is None or len(self._batch[1]) != size:
+            self._batch = (
+                np.empty((size, *self.s.shape[1:]), dtype=self.s.dtype),
+                np.empty(size, dtype=self.a.dtype),
+                np.empty(size, dtype=self.r.dtype),
+                np.empty(size, dtype=self.d.dtype),
+                np.empty((size, *self.s2.shape[1:]), dtype=self.s2.dtype),
+            )
+
+        return self._batch
 
     def push(self,
         s: np.ndarray,
@@ -53,8 +83,18 @@ class ReplayQueue(object):
             None
 
         """
-        # push the variables onto the queue
-        self.queue[self.index] = s, a, r, d, s2
+        s = np.asarray(s)
+        s2 = np.asarray(s2)
+        # allocate the arrays of states on the first push
+        if self.s is None:
+            self.s = np.zeros((self.size, *s.shape), dtype=s.dtype)
+            self.s2 = np.zeros((self.size, *s2.shape), dtype=s2.dtype)
+        # copy the variables into the queue
+        self.s[self.index] = s
+        self.a[self.index] = a
+        self.r[self.index] = r
+        self.d[self.index] = d
+        self.s2[self.index] = s2
         # increment the index
         self.index = (self.index + 1) % self.size
         # increment the top pointer
@@ -65,6 +105,10 @@ class ReplayQueue(object):
         """
         Return a random sample of items from the queue.
 
+        Notes:
+            the arrays of the sample are buffers owned by the queue that are
+            overwritten by the next call to sample
+
         Args:
             size: the number of items to sample and return
 
@@ -72,28 +116,17 @@ class ReplayQueue(object):
             A random sample from the queue sampled uniformly
 
         """
-        # initialize lists for each component of the batch
-        s = [None] * size
-        a = [None] * size
-        r = [None] * size
-        d = [None] * size
-        s2 = [None] * size
-        # iterate over the indexes and copy references to the arrays
-        for batch, sample in enumerate(np.random.randint(0, self.top, size)):
-            _s, _a, _r, _d, _s2 = self.queue[sample]
-            s[batch] = np.array(_s, copy=False)
-            a[batch] = _a
-            r[batch] = _r
-            d[batch] = _d
-            s2[batch] = np.array(_s2, copy=False)
-        # convert the lists to arrays for returning for training
-        return (
-            np.array(s),
-            np.array(a, dtype=np.uint8),
-            np.array(r, dtype=np.int8),
-            np.array(d, dtype=np.bool),
-            np.array(s2),
-        )
+        indexes = np.random.randint(0, self.top, size)
+        s, a, r, d, s2 = batch = self._batch_buffers(size)
+        # gather the experiences into the buffers. the indexes are in bounds
+        # so clip mode saves the copy numpy makes to check them
+        np.take(self.s, indexes, axis=0, out=s, mode='clip')
+        np.take(self.a, indexes, out=a, mode='clip')
+        np.take(self.r, indexes, out=r, mode='clip')
+        np.take(self.d, indexes, out=d, mode='clip')
+        np.take(self.s2, indexes, axis=0, out=s2, mode='clip')
+
+        return batch
 
 
 # explicitly define the outward facing API of this module
@@ -0,0 +1,127 @@
+"""A controller of the ratio of frames played to updates of a learner thread."""
+import threading
+import time
+
+
+class ReplayRatio(object):
+    """A controller of the ratio of frames played to updates of a learner thread."""
+
+    def __init__(self,
+        frames_per_update: int=4,
+        max_lag: int=1000,
+    ) -> None:
+        """
+        Initialize a new controller of the replay ratio.
+
+        Notes:
+            the actor reports each frame it plays with `played` and the
+            learner waits with `wait_to_update` until the actor played the
+            frames of its next update, so the learner never replays more
+            than the serial schedule would. the actor blocks in `played`
+            when the learner falls more than `max_lag` frames behind the
+            schedule, so the learner never replays much less either
+
+        Args:
+            frames_per_update: the number of frames played per update
+            max_lag: the max number of frames the actor can play ahead of the
+                updates of the learner
+
+        Returns:
+            None
+
+        """
+        self.frames_per_update = frames_per_update
+        self.max_lag = max_lag
+        self.frames = 0
+        self.updates = 0
+        self.loss = 0.0
+        self.stopped = False
+        # the seconds each thread spent waiting for the other
+        self.actor_wait_time = 0.0
+        self.learner_wait_time = 0.0
+        self._condition = threading.Condition()
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of self."""
+        return '{}(frames_per_update={}, max_lag={})'.format(
+            self.__class__.__name__,
+            self.frames_per_update,
+            self.max_lag,
+        )
+
+    @property
+    def lag(self) -> int:
+        """Return the number of frames the learner is behind the schedule."""
+        return self.frames - self.updates * self.frames_per_update
+
+    def played(self, frames: int=1) -> None:
+        """
+        Report frames played by the actor, waiting if the learner is behind.
+
+        Args:
+            frames: the number of frames played
+
+        Returns:
+            None
+
+        """
+        with self._condition:
+            self.frames += frames
+            # wake the learner up once the frames of an update are played
+            if self.lag >= self.frames_per_update:
+                self._condition.notify_all()
+            if self.lag <= self.max_lag or self.stopped:
+                return
+            start = time.perf_counter()
+            self._condition.wait_for(lambda: self.lag <= self.max_lag or self.stopped)
+            self.actor_wait_time += time.perf_counter() - start
+
+    def wait_to_update(self) -> bool:
+        """
+        Wait until the actor played the frames of the next update.
+
+        Returns:
+            True if the learner should update, False if the controller stopped
+
+        """
+        with self._condition:
+            if self.lag < self.frames_per_update and not self.stopped:
+                start = time.perf_counter()
+                self._condition.wait_for(
+                    lambda: self.lag >= self.frames_per_update or self.stopped
+                )
+                self.learner_wait_time += time.perf_counter() - start
+            return not self.stopped
+
+    def updated(self, loss: float=0.0) -> None:
+        """
+        Report an update of the learner.
+
+        Args:
+            loss: the loss of the update
+
+        Returns:
+            None
+
+        """
+        with self._condition:
+            self.updates += 1
+            self.loss += loss
+            if self.lag <= self.max_lag:
+                self._condition.notify_all()
+
+    def take_loss(self) -> float:
+        """Return the total loss of the updates since the last call."""
+        with self._condition:
+            loss, self.loss = self.loss, 0.0
+        return loss
+
+    def stop(self) -> None:
+        """Stop waiting in both threads."""
+        with self._condition:
+            self.stopped = True
+            self._condition.notify_all()
+
+
+# explicitly define the outward facing API of this module
+__all__ = [ReplayRatio.__name__]
@@ -0,0 +1,171 @@
+"""Methods for snapshotting replay queues to disk and restoring them."""
+import json
+import os
+import time
+import numpy as np
+from .compressed_replay_queue import CompressedReplayQueue
+from .prioritized_replay_queue import PrioritizedReplayQueue
+from .replay_queue import ReplayQueue
+
+
+# the name of the file with the scalar state of a snapshot. it's written
+# last, so a snapshot without it is incomplete
+_STATE_FILE = 'replay.json'
+
+
+def _array_names(queue) -> list:
+    """Return the names of the arrays that make up the state of a queue."""
+    if isinstance(queue, CompressedReplayQueue):
+        raise TypeError('snapshots of compressed replay queues are not supported')
+    if isinstance(queue, ReplayQueue):
+        names = ['s', 'a', 'r', 'd', 's2']
+    else:
+        names = ['frames', 'a', 'r', 'd']
+    if getattr(queue, 'tops', None) is not None:
+        names += ['indexes', 'tops']
+    if isinstance(queue, PrioritizedReplayQueue):
+        names += ['stale', 'sum_tree.tree', 'min_tree.tree']
+
+    return names
+
+
+def _owner(queue, name: str) -> tuple:
+    """Return the object with the attribute of an array and the attribute."""
+    *path, attribute = name.split('.')
+    owner = queue
+    for member in path:
+        owner = getattr(owner, member)
+
+    return owner, attribute
+
+
+def _filled_rows(queue, name: str) -> int:
+    """Return the number of rows of an array that hold experiences."""
+    # the rings of streams fill independently and the trees aren't indexed
+    # by experience, so they're stored whole
+    if getattr(queue, 'tops', None) is not None or name.endswith('tree'):
+        return None
+    # the next slot of frame rings holds the newest frame of the last `s2`
+    if name == 'frames':
+        return min(queue.top + 1, queue.size)
+
+    return queue.top
+
+
+def save_snapshot(queue, directory: str) -> float:
+    """
+    Write a snapshot of a replay queue to a directory.
+
+    Notes:
+        each array is written directly from the queue (only the rows that
+        hold experiences) to a `.npy` file, so writing a snapshot doesn't
+        copy the queue in memory. the scalar state is written last to
+        `replay.json`
+
+    Args:
+        queue: the replay queue to snapshot
+        directory: the directory to write the snapshot to
+
+    Returns:
+        the throughput of writing the snapshot in MB/s
+
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    # remove the state of a previous snapshot so an interrupted write leaves
+    # an incomplete snapshot instead of an inconsistent one
+    state_file = os.path.join(directory, _STATE_FILE)
+    if os.path.exists(state_file):
+        os.remove(state_file)
+    start = time.perf_counter()
+    nbytes = 0
+    for name in _array_names(queue):
+        array = getattr(*_owner(queue, name))
+        # the arrays of states of replay queues are allocated on first push
+        if array is None:
+            continue
+        array = array[:_filled_rows(queue, name)]
+        np.save(os.path.join(directory, '{}.npy'.format(name)), array)
+        nbytes += array.nbytes
+    state = dict(
+        type=queue.__class__.__name__,
+        size=queue.size,
+        index=getattr(queue, 'index', None),
+        top=queue.top,
+    )
+    if isinstance(queue, PrioritizedReplayQueue):
+        state['max_priority'] = queue.max_priority
+        state['beta'] = queue.beta.value
+    with open(state_file, 'w') as state_file:
+        json.dump(state, state_file)
+
+    return nbytes / 1e6 / (time.perf_counter() - start)
+
+
+def load_snapshot(queue, directory: str) -> float:
+    """
+    Restore a replay queue from a snapshot in a directory.
+
+    Notes:
+        arrays of a full snapshot replace the in-memory arrays of the queue
+        with copy-on-write memory maps of the files, so pages are read
+        lazily when sampled and the files are never changed. the rows of
+        other snapshots are copied into the arrays of the queue, as are all
+        arrays of queues with storage that can't be replaced (e.g. memory-
+        mapped files of their own or shared memory)
+
+    Args:
+        queue: the replay queue to restore, with the same type and size as
+            the snapshotted queue
+        directory: the directory with the snapshot
+
+    Returns:
+        the throughput of restoring the snapshot in MB/s
+
+    """
+    with open(os.path.join(directory, _STATE_FILE)) as state_file:
+        state = json.load(state_file)
+    if state['type'] != queue.__class__.__name__:
+        raise ValueError('snapshot is of a {}'.format(state['type']))
+    if state['size'] != queue.size:
+        raise ValueError('snapshot is of size {}'.format(state['size']))
+    start = time.perf_counter()
+    nbytes = 0
+    for name in _array_names(queue):
+        filename = os.path.join(directory, '{}.npy'.format(name))
+        if not os.path.exists(filename):
+            continue
+        owner, attribute = _owner(queue, name)
+        array = getattr(owner, attribute)
+        saved = np.load(filename, mmap_mode='c')
+        nbytes += saved.nbytes
+        # allocate the arrays of states of replay queues like the first push
+        if array is None:
+            array = np.zeros((queue.size, *saved.shape[1:]), dtype=saved.dtype)
+            setattr(owner, attribute, array)
+        # replace arrays that the queue owns in memory with the memory map
+        owned = type(array) is np.ndarray and array.base is None
+        if owned and saved.shape == array.shape:
+            setattr(owner, attribute, saved)
+        else:
+            array[:len(saved)] = saved
+    if state['index'] is not None:
+        queue.index = state['index']
+        queue.top = state['top']
+    if isinstance(queue, PrioritizedReplayQueue):
+        queue.max_priority = state['max_priority']
+        queue.beta.value = state['beta']
+    # the buffers of batches may have the wrong shape (e.g. if the states of
+    # a replay queue were allocated by the restore)
+    queue._batch = None
+    if hasattr(queue, '_taken'):
+        queue._taken = None
+
+    return nbytes / 1e6 / (time.perf_counter() - start)
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    save_snapshot.__name__,
+    load_snapshot.__name__,
+]
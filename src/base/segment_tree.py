@@ -0,0 +1,150 @@
+"""Segment trees for reducing ranges of priorities in logarithmic time."""
+import operator
+import numpy as np
+
+
+class SegmentTree(object):
+    """A binary tree of values with nodes reduced from their children."""
+
+    # the universal function to reduce the children of a node with
+    reduce = None
+    # the built-in equivalent of the reduce function for single nodes
+    reduce_scalar = None
+    # the identity of the reduce function (i.e. the value of an empty leaf)
+    identity = None
+
+    def __init__(self, size: int) -> None:
+        """
+        Initialize a new segment tree with a given number of leaves.
+
+        Args:
+            size: the number of leaves in the tree
+
+        Returns:
+            None
+
+        """
+        self.size = size
+        # round the number of leaves up to a power of two so the tree is
+        # complete. the nodes are stored in an array with the root at 1 and
+        # the children of node i at 2i and 2i + 1, i.e. the leaves start at
+        # the number of leaves
+        self.depth = int(np.ceil(np.log2(max(size, 1))))
+        self.capacity = 2**self.depth
+        self.tree = np.full(2 * self.capacity, self.identity, dtype=np.float64)
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of self."""
+        return '{}(size={})'.format(self.__class__.__name__, self.size)
+
+    def __getitem__(self, indexes: np.ndarray) -> np.ndarray:
+        """
+        Return the values of leaves.
+
+        Args:
+            indexes: the indexes of the leaves to return the values of
+
+        Returns:
+            the values of the leaves at the indexes
+
+        """
+        return self.tree[self.capacity + np.asarray(indexes)]
+
+    def __setitem__(self, indexes: np.ndarray, values: np.ndarray) -> None:
+        """
+        Set the values of leaves and update the nodes above them.
+
+        Args:
+            indexes: the indexes of the leaves to set the values of
+            values: the values to set the leaves to
+
+        Returns:
+            None
+
+        """
+        # setting a single leaf (i.e. a push) is faster with built-in types
+        # than with the overhead of universal functions on tiny arrays
+        if np.ndim(indexes) == 0:
+            node = self.capacity + int(indexes)
+            tree = self.tree
+            tree[node] = values
+            for _ in range(self.depth):
+                node //= 2
+                tree[node] = self.reduce_scalar(
+                    tree.item(2 * node),
+                    tree.item(2 * node + 1)
+                )
+            return
+        nodes = self.capacity + np.asarray(indexes)
+        self.tree[nodes] = values
+        # update the parents of the changed nodes one level at a time. nodes
+        # with a common parent update it to the same value, so duplicate
+        # parents are harmless and cheaper than finding unique ones
+        for _ in range(self.depth):
+            nodes = nodes // 2
+            self.tree[nodes] = self.reduce(
+                self.tree[2 * nodes],
+                self.tree[2 * nodes + 1]
+            )
+
+    @property
+    def root(self) -> float:
+        """Return the reduction of all the leaves in the tree."""
+        return self.tree[1]
+
+
+class SumTree(SegmentTree):
+    """A segment tree with nodes that sum their children."""
+
+    reduce = np.add
+    reduce_scalar = operator.add
+    identity = 0.0
+
+    def find(self, prefix_sums: np.ndarray) -> np.ndarray:
+        """
+        Return the indexes of the leaves where prefix sums are reached.
+
+        Notes:
+            the sums of the nodes are rounded, so a prefix sum can reach past
+            the sum of the leaves in the subtree it descends to. prefix sums
+            are clamped to [0, root) and only descend to the right of a node
+            if the right subtree has a value, so for a tree with a positive
+            root the leaves found always have a value
+
+        Args:
+            prefix_sums: a vector of prefix sums in [0, root)
+
+        Returns:
+            for each prefix sum, the index of the first leaf for which the sum
+            of the leaves up to and including it is greater than the prefix
+            sum, i.e. leaves are found with probability proportional to value
+
+        """
+        prefix_sums = np.asarray(prefix_sums, dtype=np.float64)
+        prefix_sums = np.clip(prefix_sums, 0, np.nextafter(self.root, 0))
+        nodes = np.ones(len(prefix_sums), dtype=np.int64)
+        # descend the tree one level at a time for all prefix sums at once
+        for _ in range(self.depth):
+            nodes *= 2
+            left = self.tree[nodes]
+            right = (prefix_sums >= left) & (self.tree[nodes + 1] > 0)
+            prefix_sums -= np.where(right, left, 0)
+            nodes += right
+
+        return nodes - self.capacity
+
+
+class MinTree(SegmentTree):
+    """A segment tree with nodes that are the minimum of their children."""
+
+    reduce = np.minimum
+    reduce_scalar = min
+    identity = np.inf
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    SegmentTree.__name__,
+    SumTree.__name__,
+    MinTree.__name__,
+]
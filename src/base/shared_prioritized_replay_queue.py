@@ -0,0 +1,259 @@
+"""A prioritized frame replay queue in shared memory for multiple actors."""
+import numpy as np
+from .annealing_variable import AnnealingVariable
+from .prioritized_replay_queue import PrioritizedReplayQueue
+from .segment_tree import MinTree
+from .segment_tree import SumTree
+from .shared_replay_queue import SharedReplayQueue
+
+
+class SharedPrioritizedReplayQueue(SharedReplayQueue):
+    """A prioritized frame replay queue in shared memory for multiple actors."""
+
+    def __init__(self,
+        size: int,
+        frame_shape: tuple=(84, 84),
+        history_length: int=4,
+        streams: int=1,
+        alpha: float=0.6,
+        beta: AnnealingVariable=None,
+        epsilon: float=1e-6,
+        max_lead: int=0,
+        name: str=None,
+        create: bool=True,
+    ) -> None:
+        """
+        Initialize a new shared prioritized replay buffer.
+
+        Notes:
+            actors push experiences with the initial priorities they
+            calculated (e.g. from the TD-errors of their own copy of the
+            network) to their own rings like the `SharedReplayQueue`. the
+            priorities are written to shared memory along with the
+            experiences, and the single learner that samples from the queue
+            copies the priorities of the experiences pushed since it last
+            sampled into its own trees of priorities (which live only in the
+            memory of the learner) before each sample, like the
+            `PrioritizedReplayQueue`. the actors keep pushing while the
+            learner gathers a sample, so the `max_lead` slots past the
+            `history_length` slots after the synced head of each ring can't
+            be sampled either
+
+        Args:
+            size: the size of the replay buffer
+                  (the number of previous experiences to store)
+            frame_shape: the shape of the individual frames in a state
+            history_length: the number of frames stacked into a state
+            streams: the number of rings (i.e. actors) to split the queue into
+            alpha: the exponent, α, determining how much prioritization is
+                used (0 is uniform sampling)
+            beta: the exponent, β, of the importance-sampling weights. if
+                None, β anneals from 0.4 to 1 over 1e6 samples
+            epsilon: a small constant added to the absolute TD-errors so no
+                experience has zero priority
+            max_lead: the max number of experiences an actor can push
+                between the learner syncing the queue and gathering a sample
+            name: the prefix of the names of the blocks of shared memory. if
+                None, a unique prefix is generated
+            create: whether to create the blocks of shared memory or to
+                attach to existing ones with the given name
+
+        Returns:
+            None
+
+        """
+        super().__init__(size,
+            frame_shape=frame_shape,
+            history_length=history_length,
+            streams=streams,
+            name=name,
+            create=create,
+        )
+        # ensure each ring has valid experiences past the window of the lead
+        if self.stream_size <= history_length + max_lead:
+            msg = '`size` / `streams` must be > `history_length` + `max_lead`'
+            raise ValueError(msg)
+        self.max_lead = max_lead
+        self.alpha = alpha
+        if beta is None:
+            beta = AnnealingVariable(0.4, 1.0, 1000000)
+        self.beta = beta
+        self.epsilon = epsilon
+        # the absolute TD-errors of the experiences written by the actors
+        # (NaN for experiences pushed without a priority) and the number of
+        # experiences each actor pushed
+        self.priorities = self._allocate('priorities', (self.size, ), np.float32)
+        self.pushes = self._allocate('pushes', (streams, ), np.int64)
+        # the trees of priorities of the learner (built when it first syncs)
+        # and the number of pushes of each actor it synced
+        self.sum_tree = None
+        self.min_tree = None
+        self.stale = None
+        self.max_priority = 1.0
+        self._synced = np.zeros(streams, dtype=np.int64)
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of self."""
+        template = '{}(size={}, frame_shape={}, history_length={}, ' \
+            'streams={}, alpha={}, beta={}, epsilon={}, max_lead={}, ' \
+            'name={})'
+        return template.format(
+            self.__class__.__name__,
+            self.size,
+            self.frame_shape,
+            self.history_length,
+            self.streams,
+            self.alpha,
+            self.beta,
+            self.epsilon,
+            self.max_lead,
+            repr(self.name),
+        )
+
+    def __getstate__(self) -> dict:
+        """Return the arguments to attach to the queue from another process."""
+        return dict(
+            super().__getstate__(),
+            alpha=self.alpha,
+            beta=self.beta,
+            epsilon=self.epsilon,
+            max_lead=self.max_lead,
+        )
+
+    def push(self,
+        s: np.ndarray,
+        a: int,
+        r: int,
+        d: bool,
+        s2: np.ndarray,
+        stream: int=0,
+        priority: float=None,
+    ) -> None:
+        """
+        Push a new experience onto the ring of a stream.
+
+        Args:
+            s: the current state
+            a: the action to get from current state `s` to next state `s2`
+            r: the reward resulting from taking action `a` in state `s`
+            d: the flag denoting whether the episode ended after action `a`
+            s2: the next state from taking action `a` in state `s`
+            stream: the index of the stream (i.e. actor) of the experience
+            priority: the priority of the experience, i.e., its TD-error. if
+                None, the experience gets the max priority of the learner and
+                is marked stale until its priority is updated
+
+        Returns:
+            None
+
+        """
+        index = stream * self.stream_size + int(self.indexes[stream])
+        self.priorities[index] = np.nan if priority is None else abs(priority)
+        super().push(s, a, r, d, s2, stream=stream)
+        # count the push after publishing the experience
+        self.pushes[stream] += 1
+
+    def _invalid_indexes(self) -> np.ndarray:
+        """Return the indexes of experiences that can't be sampled."""
+        # see `PrioritizedReplayQueue._invalid_indexes`, for each ring that
+        # its actor can lap before the learner gathers a sample. past the
+        # slots of the frames of the next push are the slots the actor can
+        # overwrite while the learner gathers
+        lapping = np.flatnonzero(self._synced + self.max_lead >= self.stream_size)
+        heads = self._synced[lapping] % self.stream_size
+        offsets = np.arange(self.history_length + self.max_lead)
+        local = (heads[:, np.newaxis] + offsets) % self.stream_size
+        return (local + (lapping * self.stream_size)[:, np.newaxis]).ravel()
+
+    def sync(self) -> None:
+        """Copy the priorities of the experiences pushed since the last sync."""
+        if self.sum_tree is None:
+            self.sum_tree = SumTree(self.size)
+            self.min_tree = MinTree(self.size)
+            self.stale = np.zeros(self.size, dtype=bool)
+        # take a snapshot of the pushes as actors keep pushing
+        pushes = self.pushes.copy()
+        new = np.minimum(pushes - self._synced, self.stream_size)
+        heads = pushes % self.stream_size
+        indexes = np.concatenate([
+            stream * self.stream_size + (head - np.arange(count, 0, -1)) % self.stream_size
+            for stream, (head, count) in enumerate(zip(heads, new))
+        ]).astype(np.int64)
+        self._synced = pushes
+        if len(indexes):
+            priorities = self.priorities[indexes].astype(np.float64)
+            stale = np.isnan(priorities)
+            priorities = (np.abs(priorities) + self.epsilon)**self.alpha
+            if (~stale).any():
+                self.max_priority = max(self.max_priority, priorities[~stale].max())
+            priorities[stale] = self.max_priority
+            self.sum_tree[indexes] = priorities
+            self.min_tree[indexes] = priorities
+            self.stale[indexes] = stale
+        # remove the experiences invalidated by the pushes from the trees
+        invalid = self._invalid_indexes()
+        self.sum_tree[invalid] = SumTree.identity
+        self.min_tree[invalid] = MinTree.identity
+        self.stale[invalid] = False
+
+    def stale_indexes(self) -> np.ndarray:
+        """Return the indexes of experiences that have a stale priority."""
+        return np.flatnonzero(self.stale)
+
+    def _sample_indexes(self, size: int) -> np.ndarray:
+        """
+        Return a prioritized random sample of valid experience indexes.
+
+        Args:
+            size: the number of indexes to sample
+
+        Returns:
+            a vector of indexes of experiences in the queue
+
+        """
+        self.sync()
+        return PrioritizedReplayQueue._sample_indexes(self, size)
+
+    # the learner samples like a prioritized queue
+    sample = PrioritizedReplayQueue.sample
+
+    def update_priorities(self,
+        indexes: np.ndarray,
+        td_errors: np.ndarray,
+        pushes: np.ndarray=None,
+    ) -> None:
+        """
+        Update the priorities of experiences from new TD-errors.
+
+        Args:
+            indexes: the indexes of the experiences returned by sample
+            td_errors: the TD-errors of the experiences
+            pushes: the `pushes` of the queue before the experiences were
+                sampled. if not None, the priorities of experiences that were
+                overwritten by pushes synced since are left as synced
+
+        Returns:
+            None
+
+        """
+        indexes = np.asarray(indexes)
+        td_errors = np.asarray(td_errors)
+        if pushes is not None:
+            # the slot of an experience is overwritten by the pushes to its
+            # ring that land on it between the snapshot and the last sync
+            streams, local = np.divmod(indexes, self.stream_size)
+            then = np.asarray(pushes)[streams]
+            since = np.minimum(self._synced[streams] - then, self.stream_size)
+            kept = (local - then) % self.stream_size >= since
+            indexes = indexes[kept]
+            td_errors = td_errors[kept]
+        PrioritizedReplayQueue.update_priorities(self, indexes, td_errors)
+
+    def close(self) -> None:
+        """Detach from the shared memory of the queue."""
+        self.priorities = self.pushes = None
+        super().close()
+
+
+# explicitly define the outward facing API of this module
+__all__ = [SharedPrioritizedReplayQueue.__name__]
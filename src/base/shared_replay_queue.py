@@ -0,0 +1,185 @@
+"""A frame replay queue in shared memory for multiple processes."""
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+import uuid
+import numpy as np
+from .frame_replay_queue import FrameReplayQueue
+
+
+class SharedReplayQueue(FrameReplayQueue):
+    """A frame replay queue in shared memory for multiple processes."""
+
+    def __init__(self,
+        size: int,
+        frame_shape: tuple=(84, 84),
+        history_length: int=4,
+        streams: int=1,
+        name: str=None,
+        create: bool=True,
+    ) -> None:
+        """
+        Initialize a new shared frame replay buffer.
+
+        Notes:
+            the ring of frames and the arrays of experience fields live in
+            blocks of shared memory that other processes attach to by name
+            (pickling the queue, e.g. to pass it to a `Process`, attaches the
+            unpickled queue). the queue is split into `streams` equal rings,
+            each pushed to by a single actor in the order of its experiences
+            as the frame replay queue requires. an actor reserves the slots
+            of its experiences by advancing the index of its own ring, so
+            concurrent pushes need no lock. the index of a ring is advanced
+            after the experience is written, so a learner never samples an
+            experience that is being written. an experience sampled by the
+            learner may however be overwritten before it's gathered if its
+            actor wraps around its ring in the meantime. the queue starts the
+            resource tracker of its process, so processes started after the
+            queue is created share it. an attaching process with a tracker
+            of its own would unlink the blocks when it exits (bpo-38119)
+
+        Args:
+            size: the size of the replay buffer
+                  (the number of previous experiences to store)
+            frame_shape: the shape of the individual frames in a state
+            history_length: the number of frames stacked into a state
+            streams: the number of rings (i.e. actors) to split the queue into
+            name: the prefix of the names of the blocks of shared memory. if
+                None, a unique prefix is generated
+            create: whether to create the blocks of shared memory or to
+                attach to existing ones with the given name
+
+        Returns:
+            None
+
+        """
+        # type check the size parameter
+        if not isinstance(size, int):
+            raise TypeError('`size` must be of type int')
+        # ensure each ring can hold at least one valid experience
+        if size // streams <= history_length:
+            raise ValueError('`size` / `streams` must be > `history_length`')
+        if name is None:
+            name = 'replay_{}'.format(uuid.uuid4().hex[:16])
+        # start the resource tracker before the processes that attach to
+        # the queue so they share it (see the notes above)
+        resource_tracker.ensure_running()
+        self.streams = streams
+        self.name = name
+        self.create = create
+        self._blocks = []
+        # the rings are equal and the remainder of the size is unused
+        self.stream_size = size // streams
+        size = self.stream_size * streams
+        self.frame_shape = tuple(frame_shape)
+        self.history_length = history_length
+        # initialize the ring of frames and the arrays of experience fields
+        shape = (size, *self.frame_shape)
+        self.frames = self._allocate('frames', shape, np.uint8)
+        self.a = self._allocate('a', (size, ), np.uint8)
+        self.r = self._allocate('r', (size, ), np.int8)
+        self.d = self._allocate('d', (size, ), bool)
+        # the index and top of each ring
+        self.indexes = self._allocate('indexes', (streams, ), np.int64)
+        self.tops = self._allocate('tops', (streams, ), np.int64)
+        # the reusable buffers to sample and take batches into
+        self._batch = None
+        self._taken = None
+
+    def __repr__(self) -> str:
+        """Return an executable string representation of self."""
+        template = '{}(size={}, frame_shape={}, history_length={}, ' \
+            'streams={}, name={})'
+        return template.format(
+            self.__class__.__name__,
+            self.size,
+            self.frame_shape,
+            self.history_length,
+            self.streams,
+            repr(self.name),
+        )
+
+    def __getstate__(self) -> dict:
+        """Return the arguments to attach to the queue from another process."""
+        return dict(
+            size=self.size,
+            frame_shape=self.frame_shape,
+            history_length=self.history_length,
+            streams=self.streams,
+            name=self.name,
+        )
+
+    def __setstate__(self, state: dict) -> None:
+        """Attach to the queue of another process."""
+        self.__init__(**state, create=False)
+
+    def _allocate(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        """
+        Allocate an array in shared memory to store a field of experiences in.
+
+        Args:
+            name: the name of the field the array stores
+            shape: the shape of the array
+            dtype: the data type of the array
+
+        Returns:
+            an array backed by a block of shared memory. new blocks are zeros
+
+        """
+        nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(
+            name='{}_{}'.format(self.name, name),
+            create=self.create,
+            size=nbytes,
+        )
+        self._blocks.append(block)
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    @property
+    def top(self) -> int:
+        """Return the number of experiences in the queue."""
+        return int(self.tops.sum())
+
+    def push(self,
+        s: np.ndarray,
+        a: int,
+        r: int,
+        d: bool,
+        s2: np.ndarray,
+        stream: int=0,
+    ) -> None:
+        """
+        Push a new experience onto the ring of a stream.
+
+        Args:
+            s: the current state
+            a: the action to get from current state `s` to next state `s2`
+            r: the reward resulting from taking action `a` in state `s`
+            d: the flag denoting whether the episode ended after action `a`
+            s2: the next state from taking action `a` in state `s`
+            stream: the index of the stream (i.e. actor) of the experience
+
+        Returns:
+            None
+
+        """
+        # see `FrameReplayQueue._push_stream`, the experience is published
+        # to other processes by advancing the ring after writing it
+        self._push_stream(s, a, r, d, s2, stream)
+
+    def close(self) -> None:
+        """Detach from the shared memory of the queue."""
+        # release the views of the blocks before closing them
+        self.frames = self.a = self.r = self.d = None
+        self.indexes = self.tops = None
+        self._batch = self._taken = None
+        for block in self._blocks:
+            block.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory of the queue (after every process closed)."""
+        for block in self._blocks:
+            block.unlink()
+
+
+# explicitly define the outward facing API of this module
+__all__ = [SharedReplayQueue.__name__]
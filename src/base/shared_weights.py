@@ -0,0 +1,126 @@
+"""Weights of a network in shared memory for publishing to other processes."""
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedWeights(object):
+    """Weights of a network in shared memory for publishing to other processes."""
+
+    def __init__(self,
+        shapes: list,
+        name: str=None,
+        create: bool=True,
+    ) -> None:
+        """
+        Initialize new shared weights.
+
+        Notes:
+            the weights are a single block of float32 values preceded by a
+            version number. a publisher increments the version before and
+            after writing the weights (i.e. the version is odd while the
+            weights are being written) and readers only keep weights that had
+            the same even version before and after they were copied (i.e. a
+            sequence lock), so a single publisher never blocks on readers.
+            pickling the weights (e.g. to pass them to a `Process`) attaches
+            the unpickled weights to the same block
+
+        Args:
+            shapes: the shapes of the arrays of weights (e.g., of the arrays
+                returned by `Model.get_weights`)
+            name: the name of the block of shared memory. if None, a unique
+                name is generated
+            create: whether to create the block of shared memory or to attach
+                to an existing one with the given name
+
+        Returns:
+            None
+
+        """
+        self.shapes = [tuple(shape) for shape in shapes]
+        self.create = create
+        sizes = [int(np.prod(shape)) for shape in self.shapes]
+        self._block = shared_memory.SharedMemory(
+            name=name,
+            create=create,
+            size=8 + 4 * max(sum(sizes), 1),
+        )
+        self.name = self._block.name
+        self.version = np.ndarray((1, ), dtype=np.int64, buffer=self._block.buf)
+        values = np.ndarray((sum(sizes), ), dtype=np.float32,
+            buffer=self._block.buf,
+            offset=8
+        )
+        # split the block into a view of each array of weights
+        offsets = np.cumsum([0] + sizes)
+        self.views = [
+            values[start:end].reshape(shape)
+            for start, end, shape in zip(offsets[:-1], offsets[1:], self.shapes)
+        ]
+
+    def __repr__(self) -> str:
+        """Return a debugging string of the shared weights."""
+        return '{}(shapes={}, name={})'.format(
+            self.__class__.__name__,
+            self.shapes,
+            repr(self.name),
+        )
+
+    def __getstate__(self) -> dict:
+        """Return the arguments to attach to the weights from another process."""
+        return dict(shapes=self.shapes, name=self.name)
+
+    def __setstate__(self, state: dict) -> None:
+        """Attach to the weights of another process."""
+        self.__init__(**state, create=False)
+
+    def publish(self, weights: list) -> None:
+        """
+        Write new weights for readers to load.
+
+        Args:
+            weights: the list of arrays of weights to publish
+
+        Returns:
+            None
+
+        """
+        self.version[0] += 1
+        for view, array in zip(self.views, weights):
+            view[...] = array
+        self.version[0] += 1
+
+    def read(self, version: int=0) -> tuple:
+        """
+        Return a copy of the weights if newer weights were published.
+
+        Args:
+            version: the version of the weights the reader has
+
+        Returns:
+            a tuple of the version and the list of arrays of weights, or None
+            if the weights are the same version or are being published
+
+        """
+        current = int(self.version[0])
+        if current == version or current % 2:
+            return None
+        weights = [view.copy() for view in self.views]
+        # discard the copy if the weights were published while copying
+        if int(self.version[0]) != current:
+            return None
+
+        return current, weights
+
+    def close(self) -> None:
+        """Detach from the shared memory of the weights."""
+        self.version = None
+        self.views = None
+        self._block.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory of the weights (after every process closed)."""
+        self._block.unlink()
+
+
+# explicitly define the outward facing API of this module
+__all__ = [SharedWeights.__name__]
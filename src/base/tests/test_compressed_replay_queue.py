@@ -0,0 +1,65 @@
+"""Unit tests for the CompressedReplayQueue class."""
+import numpy as np
+from unittest import TestCase
+from ..compressed_replay_queue import CompressedReplayQueue
+from ..frame_replay_queue import FrameReplayQueue
+from .test_frame_replay_queue import play
+
+
+class CompressedReplayQueue__init__(TestCase):
+    def test(self):
+        arb = CompressedReplayQueue(10)
+        self.assertEqual(10, arb.size)
+        self.assertEqual(1.0, arb.compression_ratio)
+        self.assertEqual(0.0, arb.decode_time)
+        arb.close()
+
+    def test_invalid_codec(self):
+        self.assertRaises(ValueError, CompressedReplayQueue, 10, codec='bz2')
+
+
+class CompressedReplayQueue__repr__(TestCase):
+    def test(self):
+        arb = CompressedReplayQueue(10, codec='lzma', level=0, workers=2)
+        expected = "CompressedReplayQueue(size=10, frame_shape=(84, 84), " \
+            "history_length=4, codec='lzma', level=0, workers=2)"
+        self.assertEqual(expected, repr(arb))
+        arb.close()
+
+
+class CompressedReplayQueue_should_sample_like_memory(TestCase):
+    def _test(self, codec):
+        arb = CompressedReplayQueue(200, codec=codec)
+        expected = FrameReplayQueue(200)
+        np.random.seed(1)
+        play(arb, 230)
+        np.random.seed(1)
+        play(expected, 230)
+        np.random.seed(2)
+        batch = arb.sample(64)
+        np.random.seed(2)
+        expected_batch = expected.sample(64)
+        for array, expected_array in zip(batch, expected_batch):
+            self.assertTrue(np.array_equal(expected_array, array))
+        self.assertGreater(arb.decode_time, 0)
+        arb.close()
+
+    def test_zlib(self):
+        self._test('zlib')
+
+    def test_lzma(self):
+        self._test('lzma')
+
+
+class CompressedReplayQueue_compression_ratio(TestCase):
+    def test(self):
+        arb = CompressedReplayQueue(20)
+        # flat frames compress far better than random ones
+        s = np.zeros((84, 84, 4), dtype=np.uint8)
+        for value in range(30):
+            s2 = np.full((84, 84, 4), value + 1, dtype=np.uint8)
+            arb.push(s, 0, 0, False, s2)
+            s = s2
+        self.assertGreater(arb.compression_ratio, 10)
+        self.assertLess(arb.nbytes, FrameReplayQueue(20).nbytes)
+        arb.close()
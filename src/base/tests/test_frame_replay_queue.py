@@ -0,0 +1,229 @@
+"""Unit tests for the FrameReplayQueue class."""
+from collections import deque
+import numpy as np
+from unittest import TestCase
+from ..frame_replay_queue import FrameReplayQueue
+
+
+def ones() -> tuple:
+    """Return an arbitrary state of ones."""
+    s = np.ones((84, 84, 4), dtype=np.uint8)
+    a = 1
+    r = 1
+    d = True
+    s2 = np.ones((84, 84, 4), dtype=np.uint8)
+    return s, a, r, d, s2
+
+
+def play(queue: FrameReplayQueue, steps: int) -> dict:
+    """
+    Push experiences from episodes of unique frames onto a queue.
+
+    Args:
+        queue: the queue to push experiences onto
+        steps: the number of experiences to push
+
+    Returns:
+        a dictionary mapping the value of the newest frame in each state `s`
+        to the experience that was pushed with it
+
+    """
+    experiences = {}
+    frame = 0
+    done = True
+    for _ in range(steps):
+        if done:
+            # stack the first frame of the episode like FrameStackEnv
+            frames = deque([np.full((84, 84), frame, dtype=np.uint8)] * 4, 4)
+        s = np.stack(frames, axis=2)
+        frame += 1
+        frames.append(np.full((84, 84), frame, dtype=np.uint8))
+        s2 = np.stack(frames, axis=2)
+        a = np.random.randint(6)
+        r = np.random.randint(3) - 1
+        done = np.random.random() < 0.1
+        queue.push(s, a, r, done, s2)
+        experiences[s[0, 0, -1]] = s, a, r, done, s2
+
+    return experiences
+
+
+class FrameReplayQueue__init__(TestCase):
+    def test(self):
+        self.assertIsInstance(FrameReplayQueue(10), object)
+        self.assertIsInstance(FrameReplayQueue(size=10), object)
+
+    def test_streams(self):
+        arb = FrameReplayQueue(13, streams=2)
+        self.assertEqual(12, arb.size)
+        self.assertEqual(6, arb.stream_size)
+        self.assertRaises(ValueError, FrameReplayQueue, 8, streams=2)
+
+
+class FrameReplayQueue__repr__(TestCase):
+    def test(self):
+        expected = 'FrameReplayQueue(size=10, frame_shape=(84, 84), history_length=4)'
+        self.assertEqual(expected, repr(FrameReplayQueue(10)))
+
+
+class FrameReplayQueue__len__(TestCase):
+    def test(self):
+        arb = FrameReplayQueue(10)
+        self.assertEqual(0, arb.top)
+        for index in range(1, 30):
+            arb.push(*ones())
+            self.assertEqual(min(index, 10), arb.top)
+            self.assertEqual(index % 10, arb.index)
+
+
+class FrameReplayQueue_nbytes(TestCase):
+    def test(self):
+        arb = FrameReplayQueue(1000)
+        # a single frame and the 3 fields per experience instead of 2 stacks
+        self.assertEqual(1000 * (84 * 84 + 3), arb.nbytes)
+        self.assertGreater(2 * 84 * 84 * 4 / (84 * 84 + 3), 7.9)
+
+
+class FrameReplayQueue_sample(TestCase):
+    def test(self):
+        arb = FrameReplayQueue(1000)
+        for i in range(1000):
+            arb.push(*ones())
+
+        s, a, r, d, s2 = arb.sample()
+
+        self.assertEqual(s.dtype, np.uint8)
+        self.assertEqual(a.dtype, np.uint8)
+        self.assertEqual(r.dtype, np.int8)
+        self.assertEqual(d.dtype, bool)
+        self.assertEqual(s2.dtype, np.uint8)
+        self.assertEqual((32, 84, 84, 4), s.shape)
+        self.assertEqual((32, 84, 84, 4), s2.shape)
+
+        exp_s, exp_a, exp_r, exp_d, exp_s2 = ones()
+
+        self.assertEqual([exp_a] * 32, list(a))
+        self.assertEqual([exp_r] * 32, list(r))
+        self.assertEqual([exp_d] * 32, list(d))
+
+        for index in range(32):
+            self.assertTrue(np.array_equal(exp_s, s[index]))
+            self.assertTrue(np.array_equal(exp_s2, s2[index]))
+
+
+class FrameReplayQueue_take(TestCase):
+    def test_should_not_overwrite_samples(self):
+        np.random.seed(1)
+        arb = FrameReplayQueue(200)
+        play(arb, 230)
+        batch = arb.sample(32)
+        expected = tuple(np.copy(array) for array in batch)
+        # a take of the same size gathers into buffers of its own
+        taken = arb.take(np.arange(32) + 10)
+        for array, expected_array in zip(batch, expected):
+            self.assertTrue(np.array_equal(expected_array, array))
+        self.assertIsNot(batch[0], taken[0])
+
+    def test_out(self):
+        np.random.seed(1)
+        arb = FrameReplayQueue(200)
+        play(arb, 230)
+        indexes = np.arange(32) + 10
+        expected = arb.take(indexes)
+        out = tuple(np.zeros_like(array) for array in expected)
+        batch = arb.take(indexes, out=out)
+        for array, out_array, expected_array in zip(batch, out, expected):
+            self.assertIs(out_array, array)
+            self.assertTrue(np.array_equal(expected_array, array))
+
+
+class FrameReplayQueue_push(TestCase):
+    def test_should_continue_episodes(self):
+        arb = FrameReplayQueue(10, streams=2)
+        s = np.zeros((84, 84, 4), dtype=np.uint8)
+        s2 = np.concatenate([s[..., 1:], np.ones((84, 84, 1), np.uint8)], axis=2)
+        arb.push(s, 0, 0, False, s2, stream=1)
+        # each ring continues the episode of its own last experience
+        self.assertRaises(ValueError, arb.push, s, 0, 0, False, s2, stream=1)
+        arb.push(s, 0, 0, False, s2, stream=0)
+        arb.push(s2, 0, 0, False, s2, stream=1)
+        # until the episode is cut
+        arb.cut(1)
+        self.assertEqual([False, True], list(arb.d[5:7]))
+        arb.push(s, 0, 0, False, s2, stream=1)
+        self.assertEqual(4, arb.top)
+
+
+class FrameReplayQueue_should_rebuild_stacks(TestCase):
+    def _check(self, arb, experiences, size):
+        s, a, r, d, s2 = arb.sample(size)
+        for index in range(size):
+            exp_s, exp_a, exp_r, exp_d, exp_s2 = experiences[s[index, 0, 0, -1]]
+            self.assertTrue(np.array_equal(exp_s, s[index]))
+            self.assertEqual(exp_a, a[index])
+            self.assertEqual(exp_r, r[index])
+            self.assertEqual(exp_d, d[index])
+            # the next state of terminal experiences isn't preserved
+            if not exp_d:
+                self.assertTrue(np.array_equal(exp_s2, s2[index]))
+
+    def test_partial(self):
+        np.random.seed(1)
+        arb = FrameReplayQueue(200)
+        experiences = play(arb, 150)
+        self._check(arb, experiences, 512)
+
+    def test_full(self):
+        np.random.seed(1)
+        arb = FrameReplayQueue(200)
+        experiences = play(arb, 230)
+        self._check(arb, experiences, 512)
+        # the oldest experiences should be overwritten
+        s, *_ = arb.sample(512)
+        self.assertTrue(np.all(s[:, 0, 0, -1] >= 230 - 200 + 4))
+
+
+class Recorder(object):
+    """A stand-in for a queue that records the experiences pushed to it."""
+
+    def __init__(self) -> None:
+        """Initialize a new recorder with no experiences."""
+        self.experiences = []
+
+    def push(self, *experience) -> None:
+        """Record an experience."""
+        self.experiences.append(experience)
+
+
+class FrameReplayQueue_should_keep_streams_apart(TestCase):
+    def test(self):
+        np.random.seed(1)
+        arb = FrameReplayQueue(200, streams=2)
+        # play the episodes of two streams with different frames and push
+        # their experiences interleaved like a vector of environments
+        recorders = [Recorder(), Recorder()]
+        experiences = {}
+        for stream, recorder in enumerate(recorders):
+            for frame, experience in play(recorder, 120).items():
+                experiences[frame + 128 * stream] = experience
+        for step in range(120):
+            for stream, recorder in enumerate(recorders):
+                s, a, r, d, s2 = recorder.experiences[step]
+                arb.push(s + 128 * stream, a, r, d, s2 + 128 * stream,
+                    stream=stream
+                )
+        self.assertEqual(200, arb.top)
+        self.assertEqual([100, 100], list(arb.tops))
+        self.assertEqual([20, 20], list(arb.indexes))
+        s, a, r, d, s2 = arb.sample(512)
+        for index in range(512):
+            exp_s, exp_a, exp_r, exp_d, exp_s2 = experiences[s[index, 0, 0, -1]]
+            offset = s[index, 0, 0, -1] // 128 * 128
+            self.assertTrue(np.array_equal(exp_s + offset, s[index]))
+            self.assertEqual(exp_a, a[index])
+            self.assertEqual(exp_r, r[index])
+            self.assertEqual(exp_d, d[index])
+            if not exp_d:
+                self.assertTrue(np.array_equal(exp_s2 + offset, s2[index]))
+        # the oldest experiences of each stream should be overwritten
+        self.assertTrue(np.all(s[:, 0, 0, -1] % 128 >= 120 - 100 + 4))
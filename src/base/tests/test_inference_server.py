@@ -0,0 +1,102 @@
+"""Unit tests for the InferenceServer class."""
+import multiprocessing
+import threading
+import numpy as np
+from unittest import TestCase
+from ..inference_server import InferenceServer
+
+
+def total(x: np.ndarray) -> np.ndarray:
+    """Return the sum and max of each input of a batch."""
+    x = x.reshape(len(x), -1).astype(np.float32)
+    return np.stack([x.sum(axis=1), x.max(axis=1)], axis=1)
+
+
+def request(client, values: list) -> None:
+    """Request the outputs of inputs filled with each value from a client."""
+    for value in values:
+        output = client(np.full((4, 4), value, dtype=np.uint8))
+        assert output[0] == 16 * value and output[1] == value
+
+
+class InferenceServer__init__(TestCase):
+    def test(self):
+        server = InferenceServer(total, (4, 4), (2, ), num_clients=3)
+        self.assertEqual(3, server.max_batch_size)
+        self.assertEqual((3, 4, 4), server.inputs.shape)
+        self.assertEqual((3, 2), server.outputs.shape)
+        self.assertEqual(3, len(server.clients))
+        self.assertEqual(0.0, server.mean_batch_size)
+        server.close()
+
+    def test_invalid_max_batch_size(self):
+        self.assertRaises(ValueError, InferenceServer, total, (4, 4), (2, ),
+            num_clients=3,
+            max_batch_size=0,
+        )
+
+
+class InferenceServer_serve(TestCase):
+    def test(self):
+        server = InferenceServer(total, (4, 4), (2, ), num_clients=1)
+        server.start()
+        output = server.clients[0](np.full((4, 4), 3, dtype=np.uint8))
+        self.assertTrue(np.array_equal([48, 3], output))
+        server.stop()
+        stats = server.stats()
+        self.assertEqual({1: 1}, stats['batch_sizes'])
+        self.assertEqual(1, stats['queue']['count'])
+        self.assertEqual(1, stats['forward']['count'])
+        server.close()
+
+    def test_batches(self):
+        server = InferenceServer(total, (4, 4), (2, ),
+            num_clients=4,
+            max_batch_size=3,
+            max_wait_us=50000,
+        )
+        server.start()
+        threads = [
+            threading.Thread(target=request, args=(client, range(20)))
+            for client in server.clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.stop()
+        # every request is served in batches of at most 3 requests
+        self.assertEqual(80, np.dot(np.arange(4), server.batch_sizes))
+        self.assertEqual(4, len(server.batch_sizes))
+        self.assertGreater(server.mean_batch_size, 1)
+        server.close()
+
+    def test_processes(self):
+        server = InferenceServer(total, (4, 4), (2, ), num_clients=2)
+        server.start()
+        context = multiprocessing.get_context('spawn')
+        actors = [
+            context.Process(target=request, args=(client, range(10)))
+            for client in server.clients
+        ]
+        for actor in actors:
+            actor.start()
+        for actor in actors:
+            actor.join()
+        server.stop()
+        self.assertEqual([0, 0], [actor.exitcode for actor in actors])
+        self.assertEqual(20, np.dot(np.arange(3), server.batch_sizes))
+        server.close()
+
+    def test_error(self):
+        def fail(x):
+            raise ValueError('bad batch')
+        server = InferenceServer(fail, (4, 4), (2, ), num_clients=2)
+        server.start()
+        # the clients raise instead of waiting for the dead server
+        client = server.clients[0]
+        self.assertRaises(EOFError, client, np.zeros((4, 4), dtype=np.uint8))
+        self.assertIsInstance(server.error, ValueError)
+        self.assertRaises(ValueError, server.stop)
+        self.assertIsNone(server.error)
+        server.close()
@@ -0,0 +1,41 @@
+"""Unit tests for the MemmapReplayQueue class."""
+import os
+import tempfile
+import numpy as np
+from unittest import TestCase
+from ..frame_replay_queue import FrameReplayQueue
+from ..memmap_replay_queue import MemmapReplayQueue
+from .test_frame_replay_queue import play
+
+
+class MemmapReplayQueue__init__(TestCase):
+    def test(self):
+        with tempfile.TemporaryDirectory() as directory:
+            arb = MemmapReplayQueue(10, directory)
+            self.assertIsInstance(arb.frames, np.memmap)
+            for name in ['frames', 'a', 'r', 'd']:
+                filename = os.path.join(directory, '{}.npy'.format(name))
+                self.assertTrue(os.path.exists(filename))
+            del arb
+
+
+class MemmapReplayQueue_should_sample_like_memory(TestCase):
+    def test(self):
+        with tempfile.TemporaryDirectory() as directory:
+            arb = MemmapReplayQueue(200, directory)
+            expected = FrameReplayQueue(200)
+            np.random.seed(1)
+            play(arb, 230)
+            np.random.seed(1)
+            play(expected, 230)
+            np.random.seed(2)
+            batch = arb.sample(64)
+            np.random.seed(2)
+            expected_batch = expected.sample(64)
+            for array, expected_array in zip(batch, expected_batch):
+                self.assertTrue(np.array_equal(expected_array, array))
+            # the files should hold the frames after a flush
+            arb.flush()
+            frames = np.load(os.path.join(directory, 'frames.npy'))
+            self.assertTrue(np.array_equal(expected.frames, frames))
+            del arb
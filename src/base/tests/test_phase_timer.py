@@ -0,0 +1,47 @@
+"""Unit tests for the PhaseTimer class."""
+import json
+import os
+import tempfile
+import time
+from unittest import TestCase
+from ..phase_timer import PhaseTimer
+
+
+class PhaseTimer__call__(TestCase):
+    def test_reuses_phases(self):
+        timer = PhaseTimer()
+        self.assertIs(timer('predict'), timer('predict'))
+
+    def test_times_blocks(self):
+        timer = PhaseTimer(window=4)
+        for _ in range(6):
+            with timer('sleep'):
+                time.sleep(0.002)
+        with timer('pass'):
+            pass
+        stats = timer.stats()
+        self.assertEqual(['sleep', 'pass'], list(stats))
+        self.assertEqual(6, stats['sleep']['count'])
+        self.assertGreater(stats['sleep']['total'], 0.012)
+        self.assertGreater(stats['sleep']['mean'], 2)
+        self.assertGreaterEqual(stats['sleep']['p99'], stats['sleep']['p50'])
+        self.assertLess(stats['pass']['mean'], stats['sleep']['mean'])
+        self.assertEqual(['pass', 'sleep'], sorted(timer.postfix()))
+        # events aren't kept without tracing
+        self.assertEqual([], timer.events)
+
+
+class PhaseTimer_write_trace(TestCase):
+    def test(self):
+        timer = PhaseTimer(trace=True, max_events=3)
+        for name in ['predict', 'step', 'predict', 'step']:
+            with timer(name):
+                pass
+        self.assertEqual(3, len(timer.events))
+        path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+        timer.write_trace(path)
+        with open(path) as trace_file:
+            events = json.load(trace_file)['traceEvents']
+        self.assertEqual(['predict', 'step', 'predict'], [e['name'] for e in events])
+        self.assertTrue(all(e['ph'] == 'X' for e in events))
+        self.assertLessEqual(events[0]['ts'] + events[0]['dur'], events[1]['ts'])
@@ -0,0 +1,114 @@
+"""Unit tests for the Prefetcher class."""
+import numpy as np
+from unittest import TestCase
+from ..annealing_variable import AnnealingVariable
+from ..frame_replay_queue import FrameReplayQueue
+from ..prefetcher import Prefetcher
+from ..prioritized_replay_queue import PrioritizedReplayQueue
+from .test_frame_replay_queue import play
+
+
+class Prefetcher__init__(TestCase):
+    def test(self):
+        prefetcher = Prefetcher(FrameReplayQueue(10), depth=3)
+        self.assertEqual(3, prefetcher.depth)
+        self.assertIsNone(prefetcher.max_staleness)
+        self.assertEqual(0.0, prefetcher.wait_rate)
+
+    def test_invalid_depth(self):
+        self.assertRaises(ValueError, Prefetcher, FrameReplayQueue(10), depth=0)
+
+
+class Prefetcher_push(TestCase):
+    def test(self):
+        queue = FrameReplayQueue(10)
+        prefetcher = Prefetcher(queue)
+        s = np.zeros((84, 84, 4), dtype=np.uint8)
+        prefetcher.push(s, 1, 1, False, s)
+        self.assertEqual(1, queue.top)
+        self.assertEqual(1, prefetcher.pushes)
+
+
+class Prefetcher_sample(TestCase):
+    def test(self):
+        queue = FrameReplayQueue(100)
+        experiences = play(queue, 100)
+        prefetcher = Prefetcher(queue, batch_size=16, depth=2)
+        prefetcher.start()
+        batches = [prefetcher.sample() for _ in range(10)]
+        prefetcher.stop()
+        self.assertEqual(10, prefetcher.batches)
+        self.assertLessEqual(prefetcher.waits, 10)
+        # each batch is a copy that isn't overwritten by the next sample
+        self.assertEqual(10, len({id(batch[0]) for batch in batches}))
+        for s, a, r, d, s2 in batches:
+            self.assertEqual((16, 84, 84, 4), s.shape)
+            for index in range(16):
+                expected = experiences[s[index, 0, 0, -1]]
+                self.assertEqual(expected[1], a[index])
+                self.assertTrue(np.array_equal(expected[4], s2[index]))
+
+    def test_prioritized(self):
+        queue = PrioritizedReplayQueue(100)
+        play(queue, 100)
+        prefetcher = Prefetcher(queue, batch_size=8)
+        prefetcher.start()
+        batch = prefetcher.sample()
+        prefetcher.stop()
+        self.assertEqual(7, len(batch))
+        self.assertEqual((8, ), batch[-1].shape)
+        # the pushes to the queue when the batch was sampled
+        self.assertEqual(100, prefetcher.batch_pushes)
+
+
+class Prefetcher_max_staleness(TestCase):
+    def test(self):
+        queue = FrameReplayQueue(100)
+        play(queue, 100)
+        prefetcher = Prefetcher(queue, batch_size=4, depth=4, max_staleness=0)
+        prefetcher.start()
+        prefetcher.sample()
+        # every ready batch is stale after a push
+        while not prefetcher._ready.full():
+            pass
+        s = np.zeros((84, 84, 4), dtype=np.uint8)
+        with prefetcher.lock:
+            queue.cut()
+        prefetcher.push(s, 1, 1, True, s)
+        prefetcher.sample()
+        prefetcher.stop()
+        self.assertGreaterEqual(prefetcher.discarded, 4)
+
+    def test_prioritized(self):
+        beta = AnnealingVariable(0.5, 1.0, 100)
+        queue = PrioritizedReplayQueue(100, beta=beta)
+        play(queue, 100)
+        prefetcher = Prefetcher(queue, batch_size=4, depth=4, max_staleness=0)
+        prefetcher.start()
+        prefetcher.sample()
+        while not prefetcher._ready.full():
+            pass
+        s = np.zeros((84, 84, 4), dtype=np.uint8)
+        with prefetcher.lock:
+            queue.cut()
+        prefetcher.push(s, 1, 1, True, s)
+        prefetcher.sample()
+        prefetcher.stop()
+        self.assertGreaterEqual(prefetcher.discarded, 4)
+        # β steps for the returned batches, not the discarded ones
+        self.assertAlmostEqual(0.5 * beta.rate**2, beta.value)
+
+
+class Prefetcher_should_raise_errors_of_the_thread(TestCase):
+    def test(self):
+        # sampling an empty queue raises in the thread of the prefetcher
+        prefetcher = Prefetcher(FrameReplayQueue(100), batch_size=4)
+        prefetcher.start()
+        self.assertRaises(ValueError, prefetcher.sample)
+        prefetcher.stop()
+
+    def test_not_running(self):
+        queue = FrameReplayQueue(100)
+        play(queue, 100)
+        prefetcher = Prefetcher(queue, batch_size=4)
+        self.assertRaises(RuntimeError, prefetcher.sample)
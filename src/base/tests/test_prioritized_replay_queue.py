@@ -2,6 +2,7 @@
 import os
 import numpy as np
 from unittest import TestCase
+from ..annealing_variable import AnnealingVariable
 from ..prioritized_replay_queue import PrioritizedReplayQueue
 
 
@@ -24,19 +25,38 @@ def zeros() -> tuple:
     s = np.zeros((84, 84, 4), dtype=np.uint8)
     a = 0
     r = 0
-    d = False
+    d = True
     s2 = np.zeros((84, 84, 4), dtype=np.uint8)
     return s, a, r, d, s2
 
 
-def random_state() -> tuple:
-    """Return an arbitrary randomized state"""
-    s = np.random.randint(0, 256, (84, 84, 4)).astype(np.uint8)
-    a = np.random.randint(6)
-    r = np.random.randint(2) - 1
-    d = bool(np.random.randint(1))
-    s2 = np.random.randint(0, 256, (84, 84, 4)).astype(np.uint8)
-    return s, a, r, d, s2
+def random_episodes(steps: int) -> list:
+    """
+    Return experiences of episodes of random frames stacked like FrameStackEnv.
+
+    Args:
+        steps: the number of experiences to return
+
+    Returns:
+        a list of tuples of s, a, r, d, and s2 where `s` of each experience
+        is `s2` of the previous one unless the previous one was terminal
+
+    """
+    experiences = []
+    done = True
+    for _ in range(steps):
+        if done:
+            frame = np.random.randint(0, 256, (84, 84, 1)).astype(np.uint8)
+            s = np.repeat(frame, 4, axis=2)
+        else:
+            s = s2
+        frame = np.random.randint(0, 256, (84, 84, 1)).astype(np.uint8)
+        s2 = np.concatenate([s[..., 1:], frame], axis=2)
+        a = np.random.randint(6)
+        r = np.random.randint(2) - 1
+        done = np.random.random() < 0.05
+        experiences.append((s, a, r, done, s2))
+    return experiences
 
 
 class ReplyBuffer__init__(TestCase):
@@ -47,8 +67,11 @@ class ReplyBuffer__init__(TestCase):
 
 class ReplyBuffer__repr__(TestCase):
     def test(self):
-        self.assertEqual('PrioritizedReplayQueue(size=4321)', repr(PrioritizedReplayQueue(4321)))
-        self.assertEqual('PrioritizedReplayQueue(size=1234)', repr(PrioritizedReplayQueue(size=1234)))
+        beta = AnnealingVariable(0.4, 1.0, 100)
+        expected = 'PrioritizedReplayQueue(size=4321, frame_shape=(84, 84), ' \
+            'history_length=4, alpha=0.6, beta={}, epsilon=1e-06)'.format(beta)
+        self.assertEqual(expected, repr(PrioritizedReplayQueue(4321, beta=beta)))
+        self.assertEqual(expected, repr(PrioritizedReplayQueue(size=4321, beta=beta)))
 
 
 class ReplyBuffer__len__(TestCase):
@@ -88,13 +111,14 @@ class ReplyBuffer_sample(TestCase):
         for i in range(1000):
             arb.push(*ones(), priority=i)
 
-        s, a, r, d, s2 = arb.sample()
+        s, a, r, d, s2, w, indexes = arb.sample()
 
         self.assertEqual(s.dtype, np.uint8)
         self.assertEqual(a.dtype, np.uint8)
         self.assertEqual(r.dtype, np.int8)
         self.assertEqual(d.dtype, np.bool)
         self.assertEqual(s2.dtype, np.uint8)
+        self.assertEqual(w.dtype, np.float32)
 
         sample_size = len(s)
 
@@ -113,10 +137,11 @@ class ReplyBuffer_sample_random(TestCase):
     def test(self):
         np.random.seed(1)
         arb = PrioritizedReplayQueue(1000)
-        for i in range(1000):
-            arb.push(*random_state(), priority=i)
+        experiences = random_episodes(1000)
+        for i, experience in enumerate(experiences):
+            arb.push(*experience, priority=i)
 
-        s, a, r, d, s2 = arb.sample()
+        s, a, r, d, s2, w, indexes = arb.sample()
 
         self.assertEqual(s.dtype, np.uint8)
         self.assertEqual(a.dtype, np.uint8)
@@ -124,26 +149,42 @@ class ReplyBuffer_sample_random(TestCase):
         self.assertEqual(d.dtype, np.bool)
         self.assertEqual(s2.dtype, np.uint8)
 
-        # save the arrays as the expected arrays
-        # np.save('{}/arrays/s_np_prio.npy'.format(DIR), s)
-        # np.save('{}/arrays/a_np_prio.npy'.format(DIR), a)
-        # np.save('{}/arrays/r_np_prio.npy'.format(DIR), r)
-        # np.save('{}/arrays/d_np_prio.npy'.format(DIR), d)
-        # np.save('{}/arrays/s2_np_prio.npy'.format(DIR), s2)
+        # check that the returned arrays are the pushed ones
+        for index, experience_index in enumerate(indexes):
+            exp_s, exp_a, exp_r, exp_d, exp_s2 = experiences[experience_index]
+            self.assertTrue(np.array_equal(exp_s, s[index]))
+            self.assertEqual(exp_a, a[index])
+            self.assertEqual(exp_r, r[index])
+            self.assertEqual(exp_d, d[index])
+            # the next state of terminal experiences isn't preserved
+            if not exp_d:
+                self.assertTrue(np.array_equal(exp_s2, s2[index]))
 
-        # load the expected arrays
-        exp_s = np.load('{}/arrays/s_np_prio.npy'.format(DIR))
-        exp_a = np.load('{}/arrays/a_np_prio.npy'.format(DIR))
-        exp_r = np.load('{}/arrays/r_np_prio.npy'.format(DIR))
-        exp_d = np.load('{}/arrays/d_np_prio.npy'.format(DIR))
-        exp_s2 = np.load('{}/arrays/s2_np_prio.npy'.format(DIR))
 
-        # check that the returned arrays are the expected ones
-        self.assertTrue(np.array_equal(exp_s, s))
-        self.assertTrue(np.array_equal(exp_a, a))
-        self.assertTrue(np.array_equal(exp_r, r))
-        self.assertTrue(np.array_equal(exp_d, d))
-        self.assertTrue(np.array_equal(exp_s2, s2))
+class ReplyBuffer_should_reject_unchained_states(TestCase):
+    def test(self):
+        # the stacks of a sample of random states from the queue of stacks
+        # this queue replaced, which don't continue each other
+        s = np.load('{}/arrays/s_np_prio.npy'.format(DIR))
+        a = np.load('{}/arrays/a_np_prio.npy'.format(DIR))
+        r = np.load('{}/arrays/r_np_prio.npy'.format(DIR))
+        s2 = np.load('{}/arrays/s2_np_prio.npy'.format(DIR))
+        arb = PrioritizedReplayQueue(100)
+        # a stack of different frames doesn't start an episode
+        self.assertRaises(ValueError, arb.push, s[0], a[0], r[0], False, s2[0])
+        self.assertEqual(0, arb.top)
+        start = np.repeat(s[0][..., -1:], 4, axis=2)
+        arb.push(start, a[0], r[0], False, s2[0])
+        # a stack that isn't `s2` of the previous experience doesn't
+        # continue its episode
+        self.assertRaises(ValueError, arb.push, s[1], a[1], r[1], False, s2[1])
+        arb.push(s2[0], a[1], r[1], False, s2[1])
+        # unless the episode is cut
+        start = np.repeat(s[2][..., -1:], 4, axis=2)
+        self.assertRaises(ValueError, arb.push, start, a[2], r[2], False, s2[2])
+        arb.cut()
+        arb.push(start, a[2], r[2], False, s2[2])
+        self.assertEqual([False, True, False], list(arb.d[:3]))
 
 
 class ReplyBuffer_should_push_items_with_uniform_priority(TestCase):
@@ -160,3 +201,119 @@ class ReplyBuffer_should_push_items_with_uniform_priority(TestCase):
             else:
                 arb.push(*ones(), priority=0)
                 self.assertEqual(10, arb.top)
+
+
+class ReplyBuffer_should_sample_proportional_to_priority(TestCase):
+    def test(self):
+        np.random.seed(1)
+        arb = PrioritizedReplayQueue(200, alpha=1, epsilon=0)
+        for i in range(100):
+            arb.push(*zeros(), priority=1 if i < 50 else 3)
+        counts = np.zeros(200)
+        for _ in range(1000):
+            *_, indexes = arb.sample()
+            counts += np.bincount(indexes, minlength=200)
+        # the second half has 3 times the priority of the first half
+        self.assertAlmostEqual(3, counts[50:].sum() / counts[:50].sum(), 1)
+        self.assertEqual(0, counts[100:].sum())
+
+
+class ReplyBuffer_should_weight_by_priority(TestCase):
+    def test(self):
+        beta = AnnealingVariable(0.5, 1.0, 100)
+        arb = PrioritizedReplayQueue(200, alpha=1, beta=beta, epsilon=0)
+        for i in range(100):
+            arb.push(*zeros(), priority=1 if i < 50 else 4)
+        *_, w, indexes = arb.sample(100)
+        # the smallest priority has a weight of 1 and the others (1 / 4)^0.5
+        self.assertTrue(np.allclose(np.where(indexes < 50, 1, 0.5), w))
+        # beta should step forward with each sample
+        self.assertGreater(beta.value, 0.5)
+
+
+class ReplyBuffer_should_update_priorities(TestCase):
+    def test(self):
+        arb = PrioritizedReplayQueue(200, alpha=1, epsilon=0)
+        for i in range(100):
+            arb.push(*zeros(), priority=1)
+        arb.update_priorities(np.arange(50), np.zeros(50))
+        *_, indexes = arb.sample(1000)
+        self.assertTrue(np.all(indexes >= 50))
+        self.assertEqual(50, arb.sum_tree.root)
+
+
+class ReplyBuffer_should_weight_tiny_priorities(TestCase):
+    def test(self):
+        arb = PrioritizedReplayQueue(100, alpha=1, epsilon=0)
+        for i in range(100):
+            arb.push(*zeros(), priority=1)
+        # zero priorities (with a zero epsilon) next to tiny ones
+        arb.update_priorities(np.arange(0, 100, 2), np.zeros(50))
+        arb.update_priorities(np.arange(1, 100, 4), np.full(25, 1e-300))
+        *_, w, indexes = arb.sample(1000)
+        self.assertTrue(np.all(indexes % 2 == 1))
+        self.assertTrue(np.all(np.isfinite(w)))
+        self.assertTrue(np.all(w > 0))
+
+    def test_empty(self):
+        self.assertRaises(ValueError, PrioritizedReplayQueue(10).sample)
+
+
+class ReplyBuffer_should_not_sample_invalid_experiences(TestCase):
+    def test(self):
+        arb = PrioritizedReplayQueue(10)
+        for i in range(25):
+            arb.push(*zeros(), priority=1)
+        # the 4 experiences after the write index have overwritten history
+        invalid = (arb.index + np.arange(4)) % 10
+        *_, indexes = arb.sample(1000)
+        self.assertFalse(np.any(np.isin(indexes, invalid)))
+        self.assertEqual(6, len(np.unique(indexes)))
+        # updates to invalidated experiences should be ignored
+        arb.update_priorities(invalid, np.ones(4))
+        self.assertEqual(0, arb.sum_tree[invalid].sum())
+
+
+class ReplyBuffer_should_not_update_overwritten_experiences(TestCase):
+    def test(self):
+        arb = PrioritizedReplayQueue(10, alpha=1, epsilon=0)
+        for i in range(30):
+            arb.push(*zeros(), priority=1)
+        pushes = arb.pushes
+        # the next pushes overwrite slots 0 to 2 after the sample
+        for i in range(3):
+            arb.push(*zeros(), priority=1)
+        self.assertEqual(33, arb.pushes)
+        arb.update_priorities([7, 8, 9, 0, 1, 2], np.full(6, 5), pushes=pushes)
+        self.assertEqual([5, 5, 5], list(arb.sum_tree[[7, 8, 9]]))
+        self.assertEqual([1, 1, 1], list(arb.sum_tree[[0, 1, 2]]))
+
+
+class ReplyBuffer_should_push_stale_items_with_max_priority(TestCase):
+    def test(self):
+        arb = PrioritizedReplayQueue(100, alpha=1, epsilon=0)
+        arb.push(*zeros(), priority=2)
+        arb.push(*zeros())
+        arb.push(*zeros())
+        self.assertEqual(2, arb.max_priority)
+        self.assertEqual([2, 2, 2], list(arb.sum_tree[[0, 1, 2]]))
+        self.assertEqual([1, 2], list(arb.stale_indexes()))
+        # updating the priorities should clear the stale flags
+        arb.update_priorities([1], [5])
+        self.assertEqual([2], list(arb.stale_indexes()))
+        self.assertEqual(5, arb.max_priority)
+        arb.push(*zeros())
+        self.assertEqual(5, arb.sum_tree[3])
+        self.assertEqual([2, 3], list(arb.stale_indexes()))
+
+
+class ReplyBuffer_should_take_indexes(TestCase):
+    def test(self):
+        arb = PrioritizedReplayQueue(100)
+        arb.push(*zeros())
+        arb.push(*ones())
+        s, a, r, d, s2 = arb.take([1, 0])
+        self.assertEqual([1, 0], list(a))
+        # the stacks are the pushed ones
+        self.assertTrue(np.array_equal(ones()[0], s[0]))
+        self.assertTrue(np.array_equal(zeros()[0], s[1]))
@@ -66,7 +66,7 @@ class ReplyBuffer__len__(TestCase):
                 arb.push(*ones())
                 self.assertEqual(10, arb.top)
 
-        self.assertTrue(ones(), arb.queue[arb.index])
+        self.assertTrue(np.array_equal(ones()[0], arb.s[arb.index]))
 
 
 class ReplyBuffer_is_bound(TestCase):
@@ -83,7 +83,7 @@ class ReplyBuffer_is_bound(TestCase):
         # there should only be 10 elements
         self.assertEqual(10, arb.top)
         # it should move the items along as new ones are added
-        self.assertEqual(ones()[1], arb.queue[arb.index][1])
+        self.assertEqual(ones()[1], arb.a[arb.index])
 
 
 class ReplyBuffer_sample(TestCase):
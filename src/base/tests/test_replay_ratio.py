@@ -0,0 +1,73 @@
+"""Unit tests for the ReplayRatio class."""
+import threading
+from unittest import TestCase
+from ..replay_ratio import ReplayRatio
+
+
+class ReplayRatio__init__(TestCase):
+    def test(self):
+        ratio = ReplayRatio(frames_per_update=4, max_lag=100)
+        self.assertEqual(0, ratio.frames)
+        self.assertEqual(0, ratio.updates)
+        self.assertEqual(0, ratio.lag)
+        self.assertFalse(ratio.stopped)
+
+
+class ReplayRatio_should_schedule_updates(TestCase):
+    def test_learner_waits_for_frames(self):
+        ratio = ReplayRatio(frames_per_update=4, max_lag=100)
+        ratio.played(3)
+        learner = threading.Thread(target=ratio.wait_to_update)
+        learner.start()
+        learner.join(0.05)
+        # the frames of the next update aren't played yet
+        self.assertTrue(learner.is_alive())
+        ratio.played(1)
+        learner.join(1)
+        self.assertFalse(learner.is_alive())
+
+    def test_actor_waits_for_updates(self):
+        ratio = ReplayRatio(frames_per_update=4, max_lag=8)
+        ratio.played(8)
+        actor = threading.Thread(target=ratio.played)
+        actor.start()
+        actor.join(0.05)
+        # the learner is more than 8 frames behind
+        self.assertTrue(actor.is_alive())
+        ratio.updated(0.5)
+        actor.join(1)
+        self.assertFalse(actor.is_alive())
+        self.assertEqual(5, ratio.lag)
+        self.assertEqual(0.5, ratio.take_loss())
+        self.assertEqual(0.0, ratio.take_loss())
+
+    def test_threads(self):
+        ratio = ReplayRatio(frames_per_update=4, max_lag=16)
+        lags = []
+
+        def learn():
+            while ratio.wait_to_update():
+                ratio.updated(1.0)
+
+        learner = threading.Thread(target=learn)
+        learner.start()
+        for _ in range(4000):
+            ratio.played()
+            lags.append(ratio.lag)
+        ratio.stop()
+        learner.join(1)
+        self.assertFalse(learner.is_alive())
+        self.assertGreaterEqual(ratio.updates, (4000 - 16) // 4)
+        self.assertLessEqual(ratio.updates, 1000)
+        self.assertLessEqual(max(lags), 17)
+
+
+class ReplayRatio_stop(TestCase):
+    def test(self):
+        ratio = ReplayRatio()
+        learner = threading.Thread(target=ratio.wait_to_update)
+        learner.start()
+        ratio.stop()
+        learner.join(1)
+        self.assertFalse(learner.is_alive())
+        self.assertFalse(ratio.wait_to_update())
@@ -0,0 +1,107 @@
+"""Unit tests for the replay snapshot methods."""
+import os
+import tempfile
+import numpy as np
+from unittest import TestCase
+from ..compressed_replay_queue import CompressedReplayQueue
+from ..frame_replay_queue import FrameReplayQueue
+from ..memmap_replay_queue import MemmapReplayQueue
+from ..prioritized_replay_queue import PrioritizedReplayQueue
+from ..replay_queue import ReplayQueue
+from ..replay_snapshot import load_snapshot
+from ..replay_snapshot import save_snapshot
+from .test_frame_replay_queue import play
+
+
+def assert_samples_equal(test: TestCase, queue, expected) -> None:
+    """Assert that two queues return the same samples."""
+    np.random.seed(2)
+    batch = queue.sample(64)
+    np.random.seed(2)
+    expected_batch = expected.sample(64)
+    for array, expected_array in zip(batch, expected_batch):
+        test.assertTrue(np.array_equal(expected_array, array))
+
+
+class save_snapshot_should_write_filled_rows(TestCase):
+    def test(self):
+        queue = FrameReplayQueue(200)
+        play(queue, 50)
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertGreater(save_snapshot(queue, directory), 0)
+            self.assertEqual(51, len(np.load(os.path.join(directory, 'frames.npy'))))
+            self.assertEqual(50, len(np.load(os.path.join(directory, 'a.npy'))))
+            self.assertTrue(os.path.exists(os.path.join(directory, 'replay.json')))
+
+    def test_compressed(self):
+        queue = CompressedReplayQueue(10)
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertRaises(TypeError, save_snapshot, queue, directory)
+        queue.close()
+
+
+class load_snapshot_should_restore(TestCase):
+    def _test(self, build, steps):
+        queue = build()
+        np.random.seed(1)
+        play(queue, steps)
+        with tempfile.TemporaryDirectory() as directory:
+            save_snapshot(queue, directory)
+            restored = build()
+            self.assertGreater(load_snapshot(restored, directory), 0)
+            self.assertEqual(queue.index, restored.index)
+            self.assertEqual(queue.top, restored.top)
+            assert_samples_equal(self, restored, queue)
+            # the restored queue keeps working (from a new episode)
+            if hasattr(restored, 'cut'):
+                restored.cut()
+            play(restored, 10)
+            restored.sample(64)
+            del restored
+
+    def test_replay_queue(self):
+        self._test(lambda: ReplayQueue(200), 150)
+
+    def test_replay_queue_full(self):
+        self._test(lambda: ReplayQueue(200), 230)
+
+    def test_frame_replay_queue(self):
+        self._test(lambda: FrameReplayQueue(200), 150)
+
+    def test_frame_replay_queue_full(self):
+        self._test(lambda: FrameReplayQueue(200), 230)
+
+    def test_frame_replay_queue_streams(self):
+        self._test(lambda: FrameReplayQueue(200, streams=2), 150)
+
+    def test_prioritized_replay_queue(self):
+        self._test(lambda: PrioritizedReplayQueue(200), 230)
+
+    def test_memmap_replay_queue(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self._test(lambda: MemmapReplayQueue(200, directory), 230)
+
+
+class load_snapshot_should_map_full_snapshots(TestCase):
+    def test(self):
+        queue = FrameReplayQueue(200)
+        play(queue, 230)
+        with tempfile.TemporaryDirectory() as directory:
+            save_snapshot(queue, directory)
+            restored = FrameReplayQueue(200)
+            load_snapshot(restored, directory)
+            self.assertIsInstance(restored.frames, np.memmap)
+            # changes to the restored queue don't change the snapshot
+            restored.cut()
+            play(restored, 10)
+            frames = np.load(os.path.join(directory, 'frames.npy'))
+            self.assertTrue(np.array_equal(queue.frames, frames))
+            del restored
+
+    def test_mismatch(self):
+        queue = FrameReplayQueue(200)
+        play(queue, 20)
+        with tempfile.TemporaryDirectory() as directory:
+            save_snapshot(queue, directory)
+            self.assertRaises(ValueError, load_snapshot, FrameReplayQueue(100), directory)
+            self.assertRaises(ValueError, load_snapshot, ReplayQueue(200), directory)
@@ -0,0 +1,66 @@
+"""Test cases for the segment tree classes."""
+import numpy as np
+from unittest import TestCase
+from ..segment_tree import SumTree, MinTree
+
+
+class ShouldSumLeaves(TestCase):
+    def test(self):
+        tree = SumTree(10)
+        self.assertEqual(16, tree.capacity)
+        self.assertEqual(0, tree.root)
+        tree[np.arange(10)] = np.arange(10)
+        self.assertEqual(45, tree.root)
+        tree[[3, 5]] = [0, 0]
+        self.assertEqual(37, tree.root)
+        self.assertEqual([0, 0, 6], list(tree[[3, 5, 6]]))
+
+
+class ShouldMinimizeLeaves(TestCase):
+    def test(self):
+        tree = MinTree(10)
+        self.assertEqual(np.inf, tree.root)
+        tree[np.arange(10)] = np.arange(10) + 1
+        self.assertEqual(1, tree.root)
+        tree[0] = np.inf
+        self.assertEqual(2, tree.root)
+
+
+class ShouldFindPrefixSums(TestCase):
+    def test(self):
+        tree = SumTree(5)
+        tree[np.arange(5)] = [1, 0, 2, 3, 0]
+        prefix_sums = [0, 0.5, 1, 2.9, 3, 5.9]
+        self.assertEqual([0, 0, 2, 2, 3, 3], list(tree.find(prefix_sums)))
+
+
+class ShouldFindProportionally(TestCase):
+    def test(self):
+        np.random.seed(1)
+        tree = SumTree(4)
+        tree[np.arange(4)] = [1, 2, 3, 4]
+        found = tree.find(np.random.random(100000) * tree.root)
+        frequencies = np.bincount(found) / len(found)
+        self.assertTrue(np.allclose([0.1, 0.2, 0.3, 0.4], frequencies, atol=0.01))
+
+
+class ShouldNotFindEmptyLeavesFromRoundOff(TestCase):
+    def test(self):
+        tree = SumTree(4)
+        # the tiny leaf is lost to round-off in the sums of its parents
+        tree[np.arange(4)] = [1e-17, 1, 0, 0]
+        self.assertEqual(1, tree.root)
+        self.assertEqual([1, 1, 1], list(tree.find([1, 2, np.nextafter(1, 0)])))
+        self.assertEqual([0], list(tree.find([-1])))
+
+    def test_tiny_leaves_next_to_empty_ones(self):
+        np.random.seed(1)
+        tree = SumTree(1000)
+        values = np.random.random(1000) * 10.0**np.random.randint(-300, 3, 1000)
+        values[np.random.random(1000) < 0.5] = 0
+        tree[np.arange(1000)] = values
+        prefix_sums = np.concatenate([
+            np.random.random(10000) * tree.root,
+            [tree.root, np.nextafter(tree.root, 0), np.nextafter(tree.root, 2 * tree.root)],
+        ])
+        self.assertTrue(np.all(tree[tree.find(prefix_sums)] > 0))
@@ -0,0 +1,162 @@
+"""Unit tests for the SharedPrioritizedReplayQueue class."""
+import multiprocessing
+import pickle
+import numpy as np
+from unittest import TestCase
+from ..prioritized_replay_queue import PrioritizedReplayQueue
+from ..shared_prioritized_replay_queue import SharedPrioritizedReplayQueue
+
+
+def push(queue, experiences: int, stream: int=0, seed: int=0) -> None:
+    """Push experiences with random priorities (some missing) onto a queue."""
+    # the experiences start a new episode
+    queue.cut(stream)
+    rng = np.random.RandomState(seed)
+    s = np.zeros((84, 84, 4), dtype=np.uint8)
+    for step in range(experiences):
+        s2 = np.full((84, 84, 4), step % 256, dtype=np.uint8)
+        priority = None if step % 5 == 0 else rng.random_sample() - 0.5
+        if isinstance(queue, SharedPrioritizedReplayQueue):
+            queue.push(s, 1, 0, step % 9 == 8, s2, stream=stream, priority=priority)
+        else:
+            queue.push(s, 1, 0, step % 9 == 8, s2, priority=priority)
+        s = s2
+
+
+def actor(queue, stream: int, experiences: int) -> None:
+    """Push experiences onto a stream of a queue from another process."""
+    push(queue, experiences, stream=stream, seed=stream)
+    queue.close()
+
+
+class SharedPrioritizedReplayQueue__init__(TestCase):
+    def test(self):
+        arb = SharedPrioritizedReplayQueue(12, streams=2)
+        self.assertEqual(12, arb.size)
+        self.assertEqual((12, ), arb.priorities.shape)
+        self.assertEqual([0, 0], list(arb.pushes))
+        self.assertIsNone(arb.sum_tree)
+        arb.close()
+        arb.unlink()
+
+
+class SharedPrioritizedReplayQueue_sync(TestCase):
+    def assert_same_trees(self, experiences):
+        expected = PrioritizedReplayQueue(20)
+        arb = SharedPrioritizedReplayQueue(20)
+        push(expected, experiences)
+        push(arb, experiences)
+        arb.sync()
+        self.assertTrue(np.allclose(expected.sum_tree.tree, arb.sum_tree.tree))
+        self.assertTrue(np.allclose(expected.min_tree.tree, arb.min_tree.tree))
+        self.assertTrue(np.array_equal(expected.stale, arb.stale))
+        arb.close()
+        arb.unlink()
+
+    def test_not_full(self):
+        self.assert_same_trees(12)
+
+    def test_full(self):
+        self.assert_same_trees(33)
+
+    def test_lapped(self):
+        # the ring laps itself more than once between syncs
+        self.assert_same_trees(57)
+
+    def test_incremental(self):
+        expected = PrioritizedReplayQueue(20)
+        arb = SharedPrioritizedReplayQueue(20)
+        s = np.zeros((84, 84, 4), dtype=np.uint8)
+        for step in range(45):
+            expected.push(s, 1, 0, False, s, priority=step / 10)
+            arb.push(s, 1, 0, False, s, priority=step / 10)
+            if step % 7 == 0:
+                arb.sync()
+        arb.sync()
+        self.assertTrue(np.allclose(expected.sum_tree.tree, arb.sum_tree.tree))
+        self.assertTrue(np.allclose(expected.min_tree.tree, arb.min_tree.tree))
+        arb.close()
+        arb.unlink()
+
+
+class SharedPrioritizedReplayQueue_should_sample_from_actors(TestCase):
+    def test(self):
+        arb = SharedPrioritizedReplayQueue(200, streams=2)
+        other = pickle.loads(pickle.dumps(arb))
+        self.assertEqual(arb.alpha, other.alpha)
+        other.close()
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=actor, args=(arb, stream, 150))
+            for stream in range(2)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual([150, 150], list(arb.pushes))
+        s, a, r, d, s2, w, indexes = arb.sample(32)
+        self.assertEqual((32, 84, 84, 4), s.shape)
+        self.assertEqual((32, ), w.shape)
+        self.assertFalse(np.isin(indexes, arb._invalid_indexes()).any())
+        # both rings are sampled from
+        self.assertEqual([0, 1], sorted(set(indexes // arb.stream_size)))
+        arb.update_priorities(indexes, np.zeros(32))
+        self.assertFalse(arb.stale[indexes].any())
+        arb.close()
+        arb.unlink()
+
+
+class SharedPrioritizedReplayQueue_max_lead(TestCase):
+    def test(self):
+        arb = SharedPrioritizedReplayQueue(40, streams=2, max_lead=6)
+        push(arb, 25, stream=0)
+        push(arb, 12, stream=1)
+        arb.sync()
+        # the full ring invalidates the frames of the next push and the lead,
+        # the other ring only once its actor can lap it within the lead
+        expected = (5 + np.arange(10)) % 20
+        self.assertEqual(sorted(expected), sorted(arb._invalid_indexes()))
+        push(arb, 2, stream=1)
+        arb.sync()
+        expected = np.concatenate([expected, 20 + (14 + np.arange(10)) % 20])
+        self.assertEqual(sorted(expected), sorted(arb._invalid_indexes()))
+        *_, indexes = arb.sample(1000)
+        self.assertFalse(np.isin(indexes, expected).any())
+        arb.close()
+        arb.unlink()
+
+    def test_invalid_lead(self):
+        self.assertRaises(ValueError, SharedPrioritizedReplayQueue, 20,
+            streams=2,
+            max_lead=6,
+        )
+
+
+class SharedPrioritizedReplayQueue_update_priorities(TestCase):
+    def test_overwritten_since_sampled(self):
+        np.random.seed(1)
+        expected = PrioritizedReplayQueue(20)
+        arb = SharedPrioritizedReplayQueue(20)
+        push(expected, 33)
+        push(arb, 33)
+        pushes = arb.pushes.copy()
+        *_, indexes = arb.sample(64)
+        # the actor overwrites slots 13 to 19 and 0 after the sample, and
+        # the learner syncs them (e.g. to sample the next batch)
+        push(expected, 8, seed=1)
+        push(arb, 8, seed=1)
+        arb.sync()
+        overwritten = np.isin(indexes, [13, 14, 15, 16, 17, 18, 19, 0])
+        self.assertTrue(overwritten.any())
+        self.assertFalse(overwritten.all())
+        arb.update_priorities(indexes, np.full(64, 100.0), pushes=pushes)
+        # the overwritten experiences keep the priorities of their actor
+        kept = indexes[overwritten]
+        self.assertTrue(np.allclose(expected.sum_tree[kept], arb.sum_tree[kept]))
+        self.assertTrue(np.array_equal(expected.stale[kept], arb.stale[kept]))
+        # the others are updated unless the pushes invalidated them
+        updated = indexes[~overwritten & ~np.isin(indexes, arb._invalid_indexes())]
+        self.assertTrue(np.allclose((100 + arb.epsilon)**arb.alpha, arb.sum_tree[updated]))
+        arb.close()
+        arb.unlink()
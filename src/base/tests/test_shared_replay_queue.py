@@ -0,0 +1,113 @@
+"""Unit tests for the SharedReplayQueue class."""
+import multiprocessing
+import pickle
+import numpy as np
+from unittest import TestCase
+from ..frame_replay_queue import FrameReplayQueue
+from ..shared_replay_queue import SharedReplayQueue
+from .test_frame_replay_queue import play
+
+
+def actor(queue: SharedReplayQueue, stream: int, steps: int) -> None:
+    """Push experiences with frames of the stream's value onto a queue."""
+    s = np.full((84, 84, 4), stream, dtype=np.uint8)
+    for step in range(steps):
+        s2 = np.full((84, 84, 4), stream, dtype=np.uint8)
+        queue.push(s, stream, step % 3 - 1, step % 7 == 6, s2, stream=stream)
+        s = s2
+    queue.close()
+
+
+class SharedReplayQueue__init__(TestCase):
+    def test(self):
+        arb = SharedReplayQueue(12, streams=2)
+        self.assertEqual(12, arb.size)
+        self.assertEqual(6, arb.stream_size)
+        self.assertEqual(0, arb.top)
+        arb.close()
+        arb.unlink()
+
+    def test_invalid_size(self):
+        self.assertRaises(TypeError, SharedReplayQueue, 12.0)
+        self.assertRaises(ValueError, SharedReplayQueue, 8, streams=2)
+
+
+class SharedReplayQueue__repr__(TestCase):
+    def test(self):
+        arb = SharedReplayQueue(10, name='test_repr')
+        expected = "SharedReplayQueue(size=10, frame_shape=(84, 84), " \
+            "history_length=4, streams=1, name='test_repr')"
+        self.assertEqual(expected, repr(arb))
+        arb.close()
+        arb.unlink()
+
+
+class SharedReplayQueue_should_attach(TestCase):
+    def test(self):
+        arb = SharedReplayQueue(10)
+        other = pickle.loads(pickle.dumps(arb))
+        s = np.ones((84, 84, 4), dtype=np.uint8)
+        other.push(s, 1, 1, False, s)
+        self.assertEqual(1, arb.top)
+        self.assertEqual(1, arb.a[0])
+        self.assertTrue(np.array_equal(s[..., -1], arb.frames[0]))
+        other.close()
+        arb.close()
+        arb.unlink()
+
+
+class SharedReplayQueue_should_take_like_memory(TestCase):
+    def test(self):
+        arb = SharedReplayQueue(200)
+        expected = FrameReplayQueue(200)
+        np.random.seed(1)
+        play(arb, 230)
+        np.random.seed(1)
+        play(expected, 230)
+        indexes = expected._sample_indexes(64)
+        batch = arb.take(indexes)
+        expected_batch = expected.take(indexes)
+        for array, expected_array in zip(batch, expected_batch):
+            self.assertTrue(np.array_equal(expected_array, array))
+        arb.close()
+        arb.unlink()
+
+
+class SharedReplayQueue_should_push_from_processes(TestCase):
+    def test(self):
+        arb = SharedReplayQueue(400, streams=4)
+        steps = [50, 100, 150, 200]
+        processes = [
+            multiprocessing.Process(target=actor, args=(arb, stream, steps[stream]))
+            for stream in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual([50, 100, 100, 100], list(arb.tops))
+        self.assertEqual([50, 0, 50, 0], list(arb.indexes))
+        s, a, r, d, s2 = arb.sample(256)
+        # every experience has the frames of its stream and each stream is
+        # sampled (about) proportional to its valid experiences
+        self.assertTrue(np.all(s == a[:, None, None, None]))
+        self.assertTrue(np.all(s2 == a[:, None, None, None]))
+        self.assertEqual({0, 1, 2, 3}, set(a))
+        arb.close()
+        arb.unlink()
+
+
+class SharedReplayQueue_should_outlive_attached_processes(TestCase):
+    def test(self):
+        arb = SharedReplayQueue(100)
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(target=actor, args=(arb, 0, 10))
+        process.start()
+        process.join()
+        self.assertEqual(0, process.exitcode)
+        # the blocks are still there for a new process to attach to
+        other = SharedReplayQueue(100, name=arb.name, create=False)
+        self.assertEqual(10, other.top)
+        other.close()
+        arb.close()
+        arb.unlink()
@@ -0,0 +1,49 @@
+"""Unit tests for the SharedWeights class."""
+import pickle
+import numpy as np
+from unittest import TestCase
+from ..shared_weights import SharedWeights
+
+
+def weights(value: float) -> list:
+    """Return a list of arrays of weights with the given value."""
+    return [np.full((3, 2), value), np.full((2, ), value), np.full((), value)]
+
+
+class SharedWeights__init__(TestCase):
+    def test(self):
+        shared = SharedWeights([(3, 2), (2, ), ()])
+        self.assertEqual([(3, 2), (2, ), ()], [view.shape for view in shared.views])
+        self.assertEqual(0, shared.version[0])
+        # nothing was published yet
+        self.assertIsNone(shared.read())
+        shared.close()
+        shared.unlink()
+
+
+class SharedWeights_read(TestCase):
+    def test(self):
+        shared = SharedWeights([(3, 2), (2, ), ()])
+        other = pickle.loads(pickle.dumps(shared))
+        shared.publish(weights(1.5))
+        version, values = other.read()
+        self.assertEqual(2, version)
+        for expected, value in zip(weights(1.5), values):
+            self.assertTrue(np.array_equal(expected, value))
+        # the weights are copies
+        values[0][:] = 0
+        self.assertEqual(1.5, shared.views[0][0, 0])
+        # the same version isn't read again
+        self.assertIsNone(other.read(version))
+        shared.publish(weights(2))
+        self.assertEqual(4, other.read(version)[0])
+        other.close()
+        shared.close()
+        shared.unlink()
+
+    def test_while_publishing(self):
+        shared = SharedWeights([(2, )])
+        shared.version[0] = 3
+        self.assertIsNone(shared.read())
+        shared.close()
+        shared.unlink()
@@ -0,0 +1 @@
+"""Benchmarks for the throughput of the hot paths of the project."""
@@ -0,0 +1,141 @@
+"""Benchmarks for the memory allocated by stacking frames."""
+import time
+import tracemalloc
+import gym
+from gym.spaces import Box
+from gym.spaces import Discrete
+import numpy as np
+from src.environment.wrappers import FrameStackEnv
+
+
+class ConstantEnv(gym.Env):
+    """An environment that returns the same preallocated frame every step."""
+
+    def __init__(self, shape: tuple=(84, 84, 1)) -> None:
+        """
+        Initialize a new constant environment.
+
+        Args:
+            shape: the shape of the frames
+
+        Returns:
+            None
+
+        """
+        self.observation_space = Box(0, 255, shape, dtype=np.uint8)
+        self.action_space = Discrete(2)
+        self.frame = np.zeros(shape, dtype=np.uint8)
+
+    def reset(self):
+        return self.frame
+
+    def step(self, action):
+        return self.frame, 0, False, {}
+
+
+def allocations_per_step(env, steps: int=1000) -> float:
+    """
+    Return the mean number of bytes allocated by each step of an environment.
+
+    Notes:
+        each observation is converted to an array like the agent does to
+        predict from it. the allocations of a step are measured as the
+        increase of the peak memory traced by `tracemalloc` during the step
+        (which includes arrays that are freed before the step returns)
+
+    Args:
+        env: the environment to step with random actions
+        steps: the number of steps to measure
+
+    Returns:
+        the mean number of bytes allocated per step
+
+    """
+    env.reset()
+    actions = np.random.randint(env.action_space.n, size=steps)
+    total = 0
+    tracemalloc.start()
+    for action in actions:
+        # release the previous observation first, otherwise freeing it
+        # during the step offsets the allocation of the next one
+        ob = None
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        ob, _, done, _ = env.step(action)
+        np.asarray(ob)
+        if done:
+            env.reset()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - current
+    tracemalloc.stop()
+
+    return total / steps
+
+
+def steps_per_second(env, seconds: float=5.0) -> float:
+    """
+    Return the number of steps per second of an environment.
+
+    Args:
+        env: the environment to step with random actions
+        seconds: the minimal number of seconds to step for
+
+    Returns:
+        the number of steps per second (converting each observation to an
+        array like the agent does to predict from it)
+
+    """
+    env.reset()
+    actions = np.random.randint(env.action_space.n, size=1024)
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        ob, _, done, _ = env.step(actions[steps % len(actions)])
+        np.asarray(ob)
+        if done:
+            env.reset()
+        steps += 1
+
+    return steps / (time.perf_counter() - start)
+
+
+def main(seconds: float=5.0) -> dict:
+    """
+    Benchmark the allocations and speed of stacking frames.
+
+    Notes:
+        the frame stack wraps an environment that returns the same
+        preallocated frame, so only the allocations of stacking are measured
+
+    Args:
+        seconds: the number of seconds to step the environment for
+
+    Returns:
+        a dictionary of the bytes allocated per step and steps per second
+
+    """
+    env = FrameStackEnv(ConstantEnv(), 4)
+    results = {
+        'bytes_per_step': allocations_per_step(env),
+        'steps_per_second': steps_per_second(env, seconds),
+    }
+    env.close()
+    print('{:>9.0f} bytes/step {:>9.0f} steps/s'.format(
+        results['bytes_per_step'],
+        results['steps_per_second'],
+    ))
+
+    return results
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    ConstantEnv.__name__,
+    allocations_per_step.__name__,
+    steps_per_second.__name__,
+    main.__name__,
+]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmarks for pipelining the acting of vectors of environments."""
+import time
+from typing import Callable
+import numpy as np
+from src.setup_env import setup_env
+
+
+def frames_per_second(env,
+    predict: Callable,
+    groups: int=2,
+    seconds: float=5.0,
+) -> tuple:
+    """
+    Return the frames per second and overlap of acting in groups.
+
+    Notes:
+        the groups step in turns like `DeepQAgent` trains with `env_groups`,
+        a single group is the serial loop of predicting and then stepping
+
+    Args:
+        env: the vector of environments to step
+        predict: a callable that returns a vector of actions for a batch of
+            stacks of frames (e.g. the `predict_batch` of an agent)
+        groups: the number of groups to split the vector into
+        seconds: the minimal number of seconds to step for
+
+    Returns:
+        a tuple of:
+        - the number of agent steps per second summed over the environments
+        - the fraction of the time not spent waiting for the environments
+
+    """
+    bounds = np.linspace(0, env.num_envs, groups + 1).astype(int)
+    groups = [slice(*bound) for bound in zip(bounds[:-1], bounds[1:])]
+    state = env.reset().copy()
+    frames = 0
+    waited = 0
+    start = time.perf_counter()
+    for group in groups:
+        env.step_async(predict(state[group]), group)
+    while time.perf_counter() - start < seconds:
+        for group in groups:
+            wait = time.perf_counter()
+            next_state, reward, _, _ = env.step_wait(group)
+            waited += time.perf_counter() - wait
+            np.copyto(state[group], next_state)
+            env.step_async(predict(state[group]), group)
+            frames += len(reward)
+    elapsed = time.perf_counter() - start
+    for group in groups:
+        env.step_wait(group)
+
+    return frames / elapsed, 1 - waited / elapsed
+
+
+def main(env_id: str='SuperMarioBros-1-1-v2',
+    num_envs: int=8,
+    groups: tuple=(1, 2, 4),
+    seconds: float=5.0,
+    predict: Callable=None,
+) -> dict:
+    """
+    Benchmark acting in groups against the serial loop and print results.
+
+    Args:
+        env_id: the ID of the environment to step
+        num_envs: the number of environments in the vector
+        groups: the numbers of groups to benchmark (1 is the serial loop)
+        seconds: the number of seconds to step for each number of groups
+        predict: an optional callable that returns a vector of actions for a
+            batch of frame stacks. if None, the greedy actions of an
+            untrained `DeepQAgent` are used
+
+    Returns:
+        a dictionary mapping the number of groups to a tuple of frames per
+        second and overlap
+
+    """
+    env = setup_env(env_id, num_envs=num_envs)
+    if predict is None:
+        from src.agents import DeepQAgent
+        agent = DeepQAgent(env,
+            replay_memory_size=1,
+            frame_indexed_replay=False,
+        )
+        predict = lambda frames: agent.predict_batch(frames, 0)
+    results = {}
+    for count in groups:
+        results[count] = frames_per_second(env, predict, count, seconds)
+        print('G={:<6} {:>9.0f} frames/s {:>6.1%} overlap'.format(
+            count,
+            *results[count]
+        ))
+    env.close()
+
+    return results
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    frames_per_second.__name__,
+    main.__name__,
+]
+
+
+if __name__ == '__main__':
+    main()
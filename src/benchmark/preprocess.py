@@ -0,0 +1,67 @@
+"""Benchmarks for preprocessing the frames of Atari environments."""
+import time
+import gym
+import numpy as np
+from src.environment.atari import wrap_atari_environment
+
+
+def steps_per_second(env, seconds: float=5.0) -> float:
+    """
+    Return the number of agent steps per second of an environment.
+
+    Args:
+        env: the environment to step with random actions
+        seconds: the minimal number of seconds to step for
+
+    Returns:
+        the number of agent steps per second (including resets)
+
+    """
+    env.reset()
+    actions = np.random.randint(env.action_space.n, size=1024)
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        _, _, done, _ = env.step(actions[steps % len(actions)])
+        if done:
+            env.reset()
+        steps += 1
+
+    return steps / (time.perf_counter() - start)
+
+
+def main(game_name: str='Pong', seconds: float=5.0, make_env=None) -> dict:
+    """
+    Benchmark the chain of wrappers against the fused wrapper.
+
+    Args:
+        game_name: the name of the Atari game to step
+        seconds: the number of seconds to step each environment for
+        make_env: an optional callable that returns the raw environment to
+            wrap in place of the Atari game (e.g. a stand-in environment)
+
+    Returns:
+        a dictionary mapping 'chain' and 'fused' to steps per second
+
+    """
+    if make_env is None:
+        make_env = lambda: gym.make('{}NoFrameskip-v4'.format(game_name))
+    results = {}
+    for name, fused in (('chain', False), ('fused', True)):
+        env = wrap_atari_environment(make_env(), fused=fused)
+        results[name] = steps_per_second(env, seconds)
+        env.close()
+        print('{:<6} {:>9.0f} steps/s'.format(name, results[name]))
+
+    return results
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    steps_per_second.__name__,
+    main.__name__,
+]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Benchmarks for sampling from replay queues."""
+import tempfile
+import time
+import numpy as np
+from src.base import CompressedReplayQueue
+from src.base import FrameReplayQueue
+from src.base import MemmapReplayQueue
+from src.base import PrioritizedReplayQueue
+from src.base import ReplayQueue
+
+
+def fill(queue, experiences: int) -> None:
+    """
+    Fill a queue with experiences of random frames from random episodes.
+
+    Args:
+        queue: the queue to push experiences onto
+        experiences: the number of experiences to push
+
+    Returns:
+        None
+
+    """
+    frames = np.random.randint(0, 256, (64, 84, 84, 1), dtype=np.uint8)
+    # the first state of an episode is its first frame repeated
+    s = np.repeat(frames[0], 4, axis=2)
+    for step in range(experiences):
+        frame = frames[step % len(frames)]
+        s2 = np.concatenate([s[..., 1:], frame], axis=2)
+        a = np.random.randint(6)
+        r = np.random.randint(3) - 1
+        d = np.random.random() < 0.01
+        if isinstance(queue, PrioritizedReplayQueue):
+            queue.push(s, a, r, d, s2, priority=np.random.random())
+        else:
+            queue.push(s, a, r, d, s2)
+        s = np.repeat(frame, 4, axis=2) if d else s2
+
+
+def pushes_per_second(queue, seconds: float=1.0) -> float:
+    """
+    Return the number of experiences per second pushed onto a queue.
+
+    Args:
+        queue: the queue to push experiences onto
+        seconds: the minimal number of seconds to push for
+
+    Returns:
+        the steady-state number of experiences pushed per second
+
+    """
+    # build the stacks of a single episode ahead of time so only pushing is
+    # measured. the first stack is the first frame repeated
+    frames = np.random.randint(0, 256, (64, 84, 84, 1), dtype=np.uint8)
+    stacks = [
+        np.concatenate(frames[np.maximum(np.arange(i - 3, i + 1), 0)], axis=2)
+        for i in range(64)
+    ]
+    # start a new episode after the experiences already in the queue
+    if hasattr(queue, 'cut'):
+        queue.cut()
+    pushes = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for step in range(len(stacks) - 1):
+            d = step == len(stacks) - 2
+            queue.push(stacks[step], step % 6, 0, d, stacks[step + 1])
+        pushes += len(stacks) - 1
+
+    return pushes / (time.perf_counter() - start)
+
+
+def samples_per_second(queue, batch_size: int, seconds: float=1.0) -> float:
+    """
+    Return the number of experiences per second sampled from a queue.
+
+    Args:
+        queue: the filled queue to sample from
+        batch_size: the number of experiences in each sample
+        seconds: the minimal number of seconds to sample for
+
+    Returns:
+        the steady-state number of experiences sampled per second
+
+    """
+    # warm up the queue (i.e. allocate any reusable buffers)
+    queue.sample(size=batch_size)
+    batches = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        queue.sample(size=batch_size)
+        batches += 1
+
+    return batches * batch_size / (time.perf_counter() - start)
+
+
+def updates_per_second(queue, batch_size: int, seconds: float=1.0) -> float:
+    """
+    Return the number of priorities per second updated in a queue.
+
+    Args:
+        queue: the filled prioritized queue to update priorities in
+        batch_size: the number of priorities in each update
+        seconds: the minimal number of seconds to update for
+
+    Returns:
+        the steady-state number of priorities updated per second
+
+    """
+    *_, indexes = queue.sample(size=batch_size)
+    batches = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        queue.update_priorities(indexes, np.random.random(batch_size))
+        batches += 1
+
+    return batches * batch_size / (time.perf_counter() - start)
+
+
+def sample_latency(queue, batch_size: int, samples: int=200) -> tuple:
+    """
+    Return the latency of sampling batches from a queue.
+
+    Args:
+        queue: the filled queue to sample from
+        batch_size: the number of experiences in each sample
+        samples: the number of batches to sample
+
+    Returns:
+        a tuple of the mean and 99th percentile latency in milliseconds
+
+    """
+    latencies = np.empty(samples)
+    for sample in range(samples):
+        start = time.perf_counter()
+        queue.sample(size=batch_size)
+        latencies[sample] = time.perf_counter() - start
+    latencies *= 1000
+
+    return latencies.mean(), np.percentile(latencies, 99)
+
+
+def main(size: int=20000, batch_sizes: tuple=(32, 128, 512)) -> dict:
+    """
+    Benchmark sampling from each replay queue and print the results.
+
+    Args:
+        size: the number of experiences to fill each queue with
+        batch_sizes: the sizes of batches to sample
+
+    Returns:
+        a dictionary mapping queue names to dictionaries of results
+
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for queue in (
+            ReplayQueue(size),
+            PrioritizedReplayQueue(size),
+            FrameReplayQueue(size),
+            MemmapReplayQueue(size, directory),
+            CompressedReplayQueue(size, codec='zlib'),
+            CompressedReplayQueue(size, codec='lzma'),
+        ):
+            name = queue.__class__.__name__
+            if isinstance(queue, CompressedReplayQueue):
+                name = '{}[{}]'.format(name, queue.codec)
+            fill(queue, size)
+            results[name] = {}
+            for batch_size in batch_sizes:
+                rate = samples_per_second(queue, batch_size)
+                mean, p99 = sample_latency(queue, batch_size)
+                results[name]['samples_{}'.format(batch_size)] = rate
+                results[name]['latency_mean_{}'.format(batch_size)] = mean
+                results[name]['latency_p99_{}'.format(batch_size)] = p99
+                template = '{:<24} batch={:<4} {:>9.0f} samples/s ' \
+                    '{:>7.3f} ms/batch (p99 {:.3f} ms)'
+                print(template.format(name, batch_size, rate, mean, p99))
+                if isinstance(queue, PrioritizedReplayQueue):
+                    rate = updates_per_second(queue, batch_size)
+                    results[name]['updates_{}'.format(batch_size)] = rate
+                    print('{:<24} batch={:<4} {:>9.0f} updates/s'.format(
+                        name,
+                        batch_size,
+                        rate
+                    ))
+                if isinstance(queue, CompressedReplayQueue):
+                    decode = 1000 * queue.decode_time
+                    results[name]['decode_{}'.format(batch_size)] = decode
+                    print('{:<24} batch={:<4} {:>7.3f} ms/batch decoding'.format(
+                        name,
+                        batch_size,
+                        decode
+                    ))
+            if isinstance(queue, CompressedReplayQueue):
+                results[name]['compression_ratio'] = queue.compression_ratio
+                print('{:<24} {:.2f}x compression'.format(
+                    name,
+                    queue.compression_ratio
+                ))
+                queue.close()
+            del queue
+
+    return results
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    fill.__name__,
+    pushes_per_second.__name__,
+    samples_per_second.__name__,
+    updates_per_second.__name__,
+    sample_latency.__name__,
+    main.__name__,
+]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Benchmarks for resetting Atari environments."""
+import time
+import gym
+from src.environment.atari import wrap_atari_environment
+
+
+def resets_per_second(env, seconds: float=5.0) -> float:
+    """
+    Return the number of resets per second of an environment.
+
+    Args:
+        env: the environment to reset
+        seconds: the minimal number of seconds to reset for
+
+    Returns:
+        the number of resets per second
+
+    """
+    resets = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        env.reset()
+        resets += 1
+
+    return resets / (time.perf_counter() - start)
+
+
+def main(game_name: str='Pong', seconds: float=5.0, make_env=None) -> dict:
+    """
+    Benchmark resetting with and without the cache of initial states.
+
+    Args:
+        game_name: the name of the Atari game to reset
+        seconds: the number of seconds to reset each environment for
+        make_env: an optional callable that returns the raw environment to
+            wrap in place of the Atari game (e.g. a stand-in environment)
+
+    Returns:
+        a dictionary mapping 'uncached' and 'cached' to resets per second
+
+    """
+    if make_env is None:
+        make_env = lambda: gym.make('{}NoFrameskip-v4'.format(game_name))
+    results = {}
+    for name, cache_resets in (('uncached', False), ('cached', True)):
+        env = wrap_atari_environment(make_env(), cache_resets=cache_resets)
+        results[name] = resets_per_second(env, seconds)
+        env.close()
+        print('{:<8} {:>9.0f} resets/s'.format(name, results[name]))
+
+    return results
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    resets_per_second.__name__,
+    main.__name__,
+]
+
+
+if __name__ == '__main__':
+    main()
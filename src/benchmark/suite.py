@@ -0,0 +1,336 @@
+"""A suite of benchmarks of the hot paths of training."""
+import datetime
+import json
+import os
+import time
+import numpy as np
+from src.base import FrameReplayQueue
+from src.base import PrioritizedReplayQueue
+from src.base import ReplayQueue
+from src.setup_env import setup_env
+from .replay_queue import fill
+from .replay_queue import pushes_per_second
+from .replay_queue import samples_per_second
+from .replay_queue import updates_per_second
+
+
+def steps_per_second(env, seconds: float=2.0) -> float:
+    """
+    Return the number of steps per second of an environment.
+
+    Args:
+        env: the environment to step with random actions
+        seconds: the minimal number of seconds to step for
+
+    Returns:
+        the number of steps per second (including resets)
+
+    """
+    env.reset()
+    actions = np.random.randint(env.action_space.n, size=1024)
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        _, _, done, _ = env.step(actions[steps % len(actions)])
+        if done:
+            env.reset()
+        steps += 1
+
+    return steps / (time.perf_counter() - start)
+
+
+def benchmark_env(env_id: str, seconds: float=2.0) -> dict:
+    """
+    Benchmark the raw environment and each wrapper around it.
+
+    Notes:
+        each layer of the wrappers built by `setup_env` is stepped on its
+        own (with the layers inside it), so the cost of a wrapper is the
+        difference between its rate and the rate of the layer inside it
+
+    Args:
+        env_id: the ID of the environment to benchmark
+        seconds: the number of seconds to step each layer for
+
+    Returns:
+        a dictionary of the steps per second of the raw environment and of
+        each layer of wrappers (keyed by depth and class name)
+
+    """
+    env = setup_env(env_id)
+    layers = [env]
+    while hasattr(layers[-1], 'env'):
+        layers.append(layers[-1].env)
+    results = {'raw_steps_per_second': steps_per_second(env.unwrapped, seconds)}
+    for depth, layer in enumerate(reversed(layers[:-1])):
+        key = 'steps_per_second_{}_{}'.format(depth + 1, layer.__class__.__name__)
+        results[key] = steps_per_second(layer, seconds)
+    env.close()
+
+    return results
+
+
+def benchmark_replay(size: int=20000,
+    batch_size: int=32,
+    seconds: float=2.0,
+) -> dict:
+    """
+    Benchmark pushing to and sampling from the replay queues.
+
+    Args:
+        size: the number of experiences to fill each queue with
+        batch_size: the size of the batches to sample
+        seconds: the number of seconds to measure each operation for
+
+    Returns:
+        a dictionary of the experiences per second pushed and sampled (and
+        priorities updated) for each queue
+
+    """
+    results = {}
+    for queue in (
+        ReplayQueue(size),
+        FrameReplayQueue(size),
+        PrioritizedReplayQueue(size),
+    ):
+        name = queue.__class__.__name__
+        results['{}_pushes_per_second'.format(name)] = pushes_per_second(queue, seconds)
+        fill(queue, size)
+        rate = samples_per_second(queue, batch_size, seconds)
+        results['{}_samples_per_second'.format(name)] = rate
+        if isinstance(queue, PrioritizedReplayQueue):
+            rate = updates_per_second(queue, batch_size, seconds)
+            results['{}_updates_per_second'.format(name)] = rate
+
+    return results
+
+
+def benchmark_agent(env_id: str,
+    batch_sizes: tuple=(32, 64, 128),
+    frames: int=2000,
+    seconds: float=2.0,
+) -> dict:
+    """
+    Benchmark the inference, training, and training loop of the agent.
+
+    Args:
+        env_id: the ID of the environment to train on
+        batch_sizes: the sizes of batches to train the network on
+        frames: the number of frames to train the agent for
+        seconds: the number of seconds to measure inference and training for
+
+    Returns:
+        a dictionary of the latency of predicting from a single state
+        (through `Model.predict` and through `DeepQAgent.predict`), the
+        updates per second of `train_on_batch`, of an update that predicts
+        the targets before `train_on_batch`, and of the fused training step
+        for each batch size, and the frames per second of `DeepQAgent.train`
+        (serial and with a learner thread)
+
+    """
+    from src.agents import DeepQAgent
+    from src.models import build_deep_q_model
+    from src.models import build_dueling_deep_q_model
+    from src.models import build_train_model
+    from src.models import QFunction
+    env = setup_env(env_id)
+    agent = DeepQAgent(env,
+        replay_memory_size=max(10000, frames),
+        prefetch_depth=2,
+        prefetch_staleness=100,
+    )
+    results = {}
+    # the latency of predicting an action from a single state, through
+    # `Model.predict` and through the compiled function of the agent
+    state = np.asarray(env.reset())
+    predictors = {
+        'model_predict': lambda: agent.model.predict(state[np.newaxis]),
+        'predict': lambda: agent.predict(state, 0),
+    }
+    for name, predict in predictors.items():
+        predict()
+        latencies = []
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            predict_start = time.perf_counter()
+            predict()
+            latencies.append(time.perf_counter() - predict_start)
+        latencies = 1000 * np.array(latencies)
+        results['{}_latency_mean_ms'.format(name)] = latencies.mean()
+        results['{}_latency_p50_ms'.format(name)] = np.percentile(latencies, 50)
+        results['{}_latency_p99_ms'.format(name)] = np.percentile(latencies, 99)
+    # the throughput of training the network on batches: `train_on_batch`
+    # alone, a whole update that predicts the targets and builds them in
+    # NumPy before `train_on_batch`, and a whole update of the fused step.
+    # `train_on_batch` trains a copy of the model with its own optimizer so
+    # it doesn't step the optimizer (or change the weights) of the agent
+    if agent.dueling_network:
+        build_model = build_dueling_deep_q_model
+    else:
+        build_model = build_deep_q_model
+    model = build_model(
+        image_size=env.observation_space.shape[:2],
+        num_frames=env.observation_space.shape[-1],
+        num_actions=env.action_space.n,
+    )
+    model.set_weights(agent.model.get_weights())
+    optimizer = agent.optimizer.__class__.from_config(agent.optimizer.get_config())
+    train_model = build_train_model(model, loss=agent.loss, optimizer=optimizer)
+    target_q_function = QFunction(agent.target_model)
+    for batch_size in batch_sizes:
+        shape = (batch_size, *env.observation_space.shape)
+        s = np.random.randint(0, 256, shape, dtype=np.uint8)
+        s2 = np.random.randint(0, 256, shape, dtype=np.uint8)
+        a = np.random.randint(env.action_space.n, size=batch_size)
+        r = np.random.randint(-15, 16, size=batch_size).astype(np.float32)
+        d = np.random.random(batch_size) < 0.01
+        y = np.random.random((batch_size, 1)).astype(np.float32)
+
+        def unfused_update():
+            Q = np.max(target_q_function(s2), axis=1)
+            Q[d] = 0
+            targets = (r + agent.discount_factor * Q).astype(np.float32)
+            train_model.train_on_batch([s, a[:, np.newaxis]],
+                targets[:, np.newaxis]
+            )
+
+        updaters = {
+            'train_on_batch': lambda: train_model.train_on_batch(
+                [s, a[:, np.newaxis]], y
+            ),
+            'unfused': unfused_update,
+            'fused': lambda: agent.train_step(s, a, r, d, s2),
+        }
+        for name, update in updaters.items():
+            update()
+            updates = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                update()
+                updates += 1
+            rate = updates / (time.perf_counter() - start)
+            results['{}_updates_per_second_{}'.format(name, batch_size)] = rate
+    # the frames per second of the whole training loop
+    agent.observe(replay_start_size=max(batch_sizes))
+    start = time.perf_counter()
+    agent.train(frames_to_play=frames)
+    results['train_frames_per_second'] = frames / (time.perf_counter() - start)
+    # the frames per second of training in a learner thread
+    agent = DeepQAgent(env,
+        replay_memory_size=max(10000, frames),
+        prefetch_depth=2,
+        prefetch_staleness=100,
+        learner_thread=True,
+    )
+    agent.observe(replay_start_size=max(batch_sizes))
+    start = time.perf_counter()
+    agent.train(frames_to_play=frames)
+    rate = frames / (time.perf_counter() - start)
+    results['train_threaded_frames_per_second'] = rate
+    env.close()
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float=0.1) -> list:
+    """
+    Return the metrics of results that regressed from a baseline.
+
+    Notes:
+        metrics ending in '_ms' are latencies (lower is better) and all the
+        other metrics are rates (higher is better)
+
+    Args:
+        results: the dictionary of sections of metrics to check
+        baseline: the dictionary of sections of metrics to compare against
+        tolerance: the fraction a metric can get worse by before regressing
+
+    Returns:
+        a list of a dictionary for each regression with the section, metric,
+        baseline value, value, and the fractional change
+
+    """
+    regressions = []
+    for section, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(section, {}).get(metric)
+            if not expected:
+                continue
+            change = (value - expected) / expected
+            worse = change > tolerance if metric.endswith('_ms') else change < -tolerance
+            if worse:
+                regressions.append(dict(
+                    section=section,
+                    metric=metric,
+                    baseline=expected,
+                    value=value,
+                    change=change,
+                ))
+
+    return regressions
+
+
+def benchmark(env_id: str,
+    output_dir: str,
+    baseline: str=None,
+    seconds: float=2.0,
+) -> list:
+    """
+    Run the benchmark suite and write the results to a JSON file.
+
+    Args:
+        env_id: the ID of the environment to benchmark (e.g.,
+            'SyntheticNES-v0' to run without any game ROMs)
+        output_dir: the base directory to store results into
+        baseline: an optional JSON file of a previous run of the suite to
+            flag regressions against
+        seconds: the number of seconds to measure each metric for
+
+    Returns:
+        a list of the regressions from the baseline
+
+    """
+    # setup the output directory based on the environment ID and current time
+    now = datetime.datetime.today().strftime('%Y-%m-%d_%H-%M')
+    output_dir = '{}/{}/Benchmark/{}'.format(output_dir, env_id, now)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    print('writing results to {}'.format(repr(output_dir)))
+
+    results = {}
+    results['env'] = benchmark_env(env_id, seconds=seconds)
+    results['replay'] = benchmark_replay(seconds=seconds)
+    results['agent'] = benchmark_agent(env_id, seconds=seconds)
+    for section, metrics in results.items():
+        for metric, value in metrics.items():
+            print('{:<8} {:<56} {:>12.3f}'.format(section, metric, value))
+
+    # flag the metrics that regressed from the baseline
+    regressions = []
+    if baseline is not None:
+        with open(baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file)['results'])
+        for regression in regressions:
+            print('regression: {section} {metric} {baseline:.3f} -> '
+                '{value:.3f} ({change:+.1%})'.format(**regression))
+
+    with open('{}/benchmark.json'.format(output_dir), 'w') as results_file:
+        json.dump(dict(
+            env_id=env_id,
+            time=now,
+            results=results,
+            regressions=regressions,
+        ), results_file, indent=4)
+
+    return regressions
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    steps_per_second.__name__,
+    benchmark_env.__name__,
+    benchmark_replay.__name__,
+    benchmark_agent.__name__,
+    compare.__name__,
+    benchmark.__name__,
+]
@@ -0,0 +1,94 @@
+"""Benchmarks for stepping vectors of environments."""
+import time
+import numpy as np
+from src.setup_env import setup_env
+
+
+def frames_per_second(env, seconds: float=5.0) -> float:
+    """
+    Return the number of frames per second stepped by a vector of envs.
+
+    Args:
+        env: the vector of environments to step with random actions
+        seconds: the minimal number of seconds to step for
+
+    Returns:
+        the number of agent steps per second summed over the environments
+
+    """
+    env.reset()
+    actions = np.random.randint(env.action_space.n, size=(1024, env.num_envs))
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        env.step(actions[steps % len(actions)])
+        steps += 1
+
+    return steps * env.num_envs / (time.perf_counter() - start)
+
+
+def serial_frames_per_second(env, seconds: float=5.0) -> float:
+    """
+    Return the number of frames per second stepped by a single env.
+
+    Args:
+        env: the environment to step with random actions
+        seconds: the minimal number of seconds to step for
+
+    Returns:
+        the number of agent steps per second
+
+    """
+    env.reset()
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        _, _, done, _ = env.step(env.action_space.sample())
+        if done:
+            env.reset()
+        steps += 1
+
+    return steps / (time.perf_counter() - start)
+
+
+def main(env_id: str='SuperMarioBros-1-1-v2',
+    num_envs: tuple=(1, 2, 4, 8, 16),
+    seconds: float=5.0,
+) -> dict:
+    """
+    Benchmark stepping vectors of environments and print the results.
+
+    Args:
+        env_id: the ID of the environment to step
+        num_envs: the numbers of environments in the vectors to benchmark
+        seconds: the number of seconds to step each vector for
+
+    Returns:
+        a dictionary mapping the number of environments to frames per second
+        (with 'serial' for the single environment without worker processes)
+
+    """
+    results = {}
+    env = setup_env(env_id)
+    results['serial'] = serial_frames_per_second(env, seconds)
+    env.close()
+    print('{:<8} {:>9.0f} frames/s'.format('serial', results['serial']))
+    for num in num_envs:
+        env = setup_env(env_id, num_envs=num)
+        results[num] = frames_per_second(env, seconds)
+        env.close()
+        print('N={:<6} {:>9.0f} frames/s'.format(num, results[num]))
+
+    return results
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    frames_per_second.__name__,
+    serial_frames_per_second.__name__,
+    main.__name__,
+]
+
+
+if __name__ == '__main__':
+    main()
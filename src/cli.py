@@ -2,6 +2,7 @@
 import argparse
 from .train import train
 from .play import play, play_random
+from .benchmark.suite import benchmark
 
 
 # mapping of command line arguments by their flags to the options they embody
@@ -15,8 +16,8 @@ _CMD_LINE_ARGS = {
     ('--mode', '-m'): {
         'type': str,
         'default': 'train',
-        'help': 'The execution mode as either: train, play or random',
-        'choices': ['train', 'play', 'random'],
+        'help': 'The execution mode as either: train, play, random or benchmark',
+        'choices': ['train', 'play', 'random', 'benchmark'],
     },
     ('--output', '-o'): {
         'type': str,
@@ -28,6 +29,61 @@ _CMD_LINE_ARGS = {
         'default': False,
         'help': 'whether to monitor the operation (record frames)',
     },
+    ('--replay_on_disk', '-D'): {
+        'type': bool,
+        'default': False,
+        'help': 'whether to store the replay memory on disk (train mode)',
+    },
+    ('--snapshot_replay', '-S'): {
+        'type': bool,
+        'default': False,
+        'help': 'whether to snapshot the replay memory after training',
+    },
+    ('--resume_replay', '-R'): {
+        'type': str,
+        'default': None,
+        'help': 'A replay memory snapshot to restore instead of observing',
+    },
+    ('--num_envs', '-n'): {
+        'type': int,
+        'default': None,
+        'help': 'The number of environments to train on in parallel',
+    },
+    ('--baseline', '-b'): {
+        'type': str,
+        'default': None,
+        'help': 'A benchmark JSON file to flag regressions against',
+    },
+    ('--trace', '-t'): {
+        'type': bool,
+        'default': False,
+        'help': 'whether to write a Chrome trace of the phases of training',
+    },
+    ('--env_groups', '-g'): {
+        'type': int,
+        'default': 1,
+        'help': 'The number of groups of environments to pipeline acting',
+    },
+    ('--num_actors', '-a'): {
+        'type': int,
+        'default': None,
+        'help': 'The number of actor processes to train with (Ape-X)',
+    },
+    ('--inference_server', '-I'): {
+        'type': bool,
+        'default': False,
+        'help': 'whether actors share batched inference of the learner',
+    },
+    ('--prefetch_depth', '-p'): {
+        'type': int,
+        'default': 0,
+        'help': 'The number of minibatches to sample ahead of the learner',
+    },
+    ('--prefetch_staleness', '-s'): {
+        'type': int,
+        'default': None,
+        'help': 'The max frames pushed for a prefetched minibatch to be used',
+    },
 }
 
 
@@ -53,6 +109,16 @@ def main() -> None:
             env_id=args.env,
             output_dir=args.output,
             monitor=args.monitor,
+            replay_on_disk=args.replay_on_disk,
+            snapshot_replay=args.snapshot_replay,
+            resume_replay=args.resume_replay,
+            num_envs=args.num_envs,
+            env_groups=args.env_groups,
+            trace=args.trace,
+            num_actors=args.num_actors,
+            inference_server=args.inference_server,
+            prefetch_depth=args.prefetch_depth,
+            prefetch_staleness=args.prefetch_staleness,
         )
     elif mode == 'random':
         play_random(
@@ -65,6 +131,12 @@ def main() -> None:
             results_dir=args.output,
             monitor=args.monitor,
         )
+    elif mode == 'benchmark':
+        benchmark(
+            env_id=args.env,
+            output_dir=args.output,
+            baseline=args.baseline,
+        )
 
 
 # explicitly define the outward facing API of this module
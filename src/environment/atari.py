@@ -8,6 +8,7 @@ from src.environment.wrappers import (
     MaxFrameskipEnv,
     NoopResetEnv,
     PenalizeDeathEnv,
+    PreprocessEnv,
     RewardCacheEnv,
 )
 
@@ -19,7 +20,9 @@ def build_atari_environment(game_name: str,
     skip_frames: int=4,
     death_penalty: int=-1,
     clip_rewards: bool=True,
-    agent_history_length: int=4
+    agent_history_length: int=4,
+    fused: bool=True,
+    cache_resets: bool=False,
 ):
     """
     Build and return a configured Atari environment.
@@ -33,6 +36,10 @@ def build_atari_environment(game_name: str,
         death_penatly: the penalty for losing a life in a game
         clip_rewards: whether to clip rewards in {-1, 0, +1}
         agent_history_length: the size of the frame buffer for the agent
+        fused: whether to preprocess frames with a single fused wrapper
+            instead of a chain of wrappers (with identical observations)
+        cache_resets: whether to restore cached emulator states after the
+            no-ops on reset instead of emulating the no-ops again
 
     Returns:
         a gym environment configured for this experiment
@@ -43,11 +50,65 @@ def build_atari_environment(game_name: str,
         env = gym.make('{}NoFrameskip-v10'.format(game_name))
     else:
         env = gym.make('{}NoFrameskip-v4'.format(game_name))
+
+    return wrap_atari_environment(env,
+        image_size=image_size,
+        noop_max=noop_max,
+        skip_frames=skip_frames,
+        death_penalty=death_penalty,
+        clip_rewards=clip_rewards,
+        agent_history_length=agent_history_length,
+        fused=fused,
+        cache_resets=cache_resets,
+    )
+
+
+def wrap_atari_environment(env: gym.Env,
+    image_size: tuple=(84, 84),
+    noop_max: int=30,
+    skip_frames: int=4,
+    death_penalty: int=-1,
+    clip_rewards: bool=True,
+    agent_history_length: int=4,
+    fused: bool=True,
+    cache_resets: bool=False,
+):
+    """
+    Wrap an Atari environment with the wrappers for this experiment.
+
+    Args:
+        env: the Atari environment to wrap
+        image_size: the size to down-sample images to
+        noop_max: the max number of random no-ops at the beginning of a game
+        skip_frames: the number of frames to hold each action for
+        death_penatly: the penalty for losing a life in a game
+        clip_rewards: whether to clip rewards in {-1, 0, +1}
+        agent_history_length: the size of the frame buffer for the agent
+        fused: whether to preprocess frames with a single fused wrapper
+            instead of a chain of wrappers (with identical observations)
+        cache_resets: whether to restore cached emulator states after the
+            no-ops on reset instead of emulating the no-ops again (requires
+            `clone_state` and `restore_state` on the unwrapped environment)
+
+    Returns:
+        the wrapped environment
+
+    """
     # wrap the environment with a reward cacher
     env = RewardCacheEnv(env)
     # apply the no op max feature if enabled
     if noop_max is not None:
-        env = NoopResetEnv(env, noop_max=noop_max)
+        env = NoopResetEnv(env, noop_max=noop_max, cache_states=cache_resets)
+    # apply the rest of the preprocessing in a single wrapper if enabled
+    if fused:
+        return PreprocessEnv(env,
+            skip=1 if skip_frames is None else skip_frames,
+            image_size=image_size,
+            death_penalty=death_penalty,
+            clip_rewards=clip_rewards,
+            agent_history_length=agent_history_length,
+            fire_reset='FIRE' in env.unwrapped.get_action_meanings(),
+        )
     # apply the frame skip feature if enabled
     if skip_frames is not None:
         env = MaxFrameskipEnv(env, skip=skip_frames)
@@ -70,4 +131,7 @@ def build_atari_environment(game_name: str,
 
 
 # explicitly specify the outward facing API of this module
-__all__ = [build_atari_environment.__name__]
+__all__ = [
+    build_atari_environment.__name__,
+    wrap_atari_environment.__name__,
+]
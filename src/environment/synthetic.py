@@ -0,0 +1,260 @@
+"""A synthetic stand-in for the NES environments that needs no ROMs."""
+import re
+import time
+import gym
+from gym.spaces import Box
+from gym.spaces import Discrete
+import numpy as np
+from src.environment.wrappers import (
+    DownsampleEnv,
+    FrameStackEnv,
+    RewardCacheEnv,
+)
+
+
+# the colors of the palette of the synthetic level (like the NES palette)
+_PALETTE = np.array([
+    [92, 148, 252],  # sky
+    [200, 76, 12],   # ground and bricks
+    [252, 188, 176], # highlights of the ground and bricks
+    [0, 0, 0],       # outlines
+    [128, 208, 16],  # pipes and bushes
+    [0, 168, 0],     # shades of the pipes and bushes
+    [252, 252, 252], # clouds
+    [228, 92, 16],   # the player
+], dtype=np.uint8)
+
+
+# the horizontal motion and whether to jump of the 7 actions of the
+# `SIMPLE_MOVEMENT` action space of `gym_super_mario_bros`, i.e., NOOP,
+# right, right + A, right + B, right + A + B, A, and left
+_ACTIONS = [(0, 0), (2, 0), (2, 1), (3, 0), (3, 1), (0, 1), (-2, 0)]
+
+
+def _tile(rng: np.random.RandomState, kind: str) -> np.ndarray:
+    """
+    Return a 16x16 tile of palette indexes.
+
+    Args:
+        rng: the random number generator to pattern the tile with
+        kind: the kind of tile as either 'sky', 'ground', 'brick', 'pipe',
+            'cloud', or 'bush'
+
+    Returns:
+        a 16x16 array of indexes in the palette
+
+    """
+    tile = np.zeros((16, 16), dtype=np.uint8)
+    if kind == 'ground' or kind == 'brick':
+        tile[:] = 1
+        # mortar lines with a speckled highlight like the NES bricks
+        tile[::8] = 3 if kind == 'brick' else 2
+        tile[:8, ::8] = 3
+        tile[8:, 4::8] = 3
+        tile[rng.random_sample((16, 16)) < 0.08] = 2
+    elif kind == 'pipe':
+        tile[:] = 4
+        tile[:, :3] = 5
+        tile[:, -2:] = 3
+        tile[:, 8:10] = 6
+    elif kind == 'cloud' or kind == 'bush':
+        # a blob of an ellipse with an outline
+        y, x = np.ogrid[-7.5:8.5, -7.5:8.5]
+        inside = (y / 7) ** 2 + (x / 8) ** 2 <= 1
+        tile[inside] = 6 if kind == 'cloud' else 4
+        tile[inside & ((y / 6) ** 2 + (x / 7) ** 2 > 1)] = 3 if kind == 'cloud' else 5
+    return tile
+
+
+def _level(rng: np.random.RandomState, width: int) -> np.ndarray:
+    """
+    Return the RGB image of a synthetic level.
+
+    Args:
+        rng: the random number generator to lay the level out with
+        width: the width of the level in tiles
+
+    Returns:
+        an RGB image of shape (240, 16 * width, 3)
+
+    """
+    kinds = ['sky', 'ground', 'brick', 'pipe', 'cloud', 'bush']
+    tiles = {kind: _tile(rng, kind) for kind in kinds}
+    layout = np.full((15, width), 'sky', dtype=object)
+    layout[13:] = 'ground'
+    for column in range(width):
+        if rng.random_sample() < 0.15:
+            layout[rng.randint(2, 6), column] = 'cloud'
+        if rng.random_sample() < 0.1:
+            layout[12, column] = 'bush'
+        if rng.random_sample() < 0.08:
+            layout[9, column:column + rng.randint(1, 5)] = 'brick'
+        if rng.random_sample() < 0.04:
+            layout[13 - rng.randint(2, 4):13, column:column + 2] = 'pipe'
+        # gaps in the ground
+        if 16 < column < width - 16 and rng.random_sample() < 0.02:
+            layout[13:, column:column + 2] = 'sky'
+    rows = [np.hstack([tiles[kind] for kind in row]) for row in layout]
+    return _PALETTE[np.vstack(rows)]
+
+
+class SyntheticNESEnv(gym.Env):
+    """A synthetic stand-in for the NES environments that needs no ROMs."""
+
+    metadata = {'render.modes': ['rgb_array'], 'video.frames_per_second': 60}
+
+    def __init__(self,
+        step_cost: float=0.0,
+        life_length: int=250,
+        level_width: int=212,
+        seed: int=0,
+    ) -> None:
+        """
+        Initialize a new synthetic NES environment.
+
+        Notes:
+            the observations are 240x256x3 frames of a scrolling level of
+            tiles with a player sprite, like the frames of Super Mario Bros.
+            the 7 actions move the player like the `SIMPLE_MOVEMENT` action
+            space, and the reward is the horizontal progress. each of the 3
+            lives ends after a number of steps from a log-normal distribution
+            (with a median of `life_length`), and the episode ends when the
+            lives run out or the player reaches the end of the level. the
+            level and episodes are deterministic given the seed and actions.
+            like the NES emulator, each observation is the same buffer of the
+            screen, overwritten by the next step
+
+        Args:
+            step_cost: the number of seconds of CPU time each step takes
+                (busy waiting to stand in for the emulator)
+            life_length: the median number of steps of a life
+            level_width: the width of the level in 16 pixel tiles
+            seed: the seed of the random number generator
+
+        Returns:
+            None
+
+        """
+        self.step_cost = step_cost
+        self.life_length = life_length
+        self.observation_space = Box(0, 255, (240, 256, 3), dtype=np.uint8)
+        self.action_space = Discrete(len(_ACTIONS))
+        self.seed(seed)
+        self.level = _level(self.np_random, level_width)
+        # the sprite of the player
+        sprite = np.full((16, 16), 7, dtype=np.uint8)
+        sprite[:4, 3:13] = 1
+        sprite[6:10, 4:12] = 2
+        self._sprite = _PALETTE[sprite]
+        self.screen = np.zeros(self.observation_space.shape, dtype=np.uint8)
+        self.x_pos = 0
+        self.y_pos = 0
+        self.y_velocity = 0
+        self.life = 0
+        self._life_steps = 0
+        self._life_length = 0
+
+    def seed(self, seed: int=None) -> list:
+        """
+        Seed the random number generator of the environment.
+
+        Args:
+            seed: the seed for the random number generator
+
+        Returns:
+            a list of the seed
+
+        """
+        self.np_random = np.random.RandomState(seed)
+        return [seed]
+
+    def _start_life(self) -> None:
+        """Start a new life at the beginning of the level."""
+        self.x_pos = 0
+        self.y_pos = 0
+        self.y_velocity = 0
+        self._life_steps = 0
+        length = self.np_random.lognormal(np.log(self.life_length), 0.75)
+        self._life_length = max(16, int(length))
+
+    def _render(self) -> np.ndarray:
+        """Render the screen and return it."""
+        end = self.level.shape[1] - self.screen.shape[1]
+        scroll = min(max(0, self.x_pos - 112), end)
+        self.screen[:] = self.level[:, scroll:scroll + self.screen.shape[1]]
+        # draw the player standing on the ground (row 13)
+        x = self.x_pos - scroll
+        y = 192 - self.y_pos
+        self.screen[y:y + 16, x:x + 16] = self._sprite
+        return self.screen
+
+    def render(self, mode='rgb_array'):
+        return self.screen
+
+    def reset(self):
+        self.life = 3
+        self._start_life()
+        return self._render()
+
+    def step(self, action):
+        if self.step_cost:
+            # busy wait to hold the CPU like the emulator would
+            end = time.perf_counter() + self.step_cost
+            while time.perf_counter() < end:
+                pass
+        dx, jump = _ACTIONS[action]
+        # move the player, jumping from the ground and falling back to it
+        start = self.x_pos
+        self.x_pos = min(max(0, self.x_pos + dx), self.level.shape[1] - 16)
+        if jump and self.y_pos == 0:
+            self.y_velocity = 6
+        self.y_pos = max(0, self.y_pos + self.y_velocity)
+        self.y_velocity = self.y_velocity - 1 if self.y_pos > 0 else 0
+        reward = self.x_pos - start
+        self._life_steps += 1
+        flag_get = self.x_pos >= self.level.shape[1] - 16
+        # lose a life when it runs out of steps
+        if self._life_steps >= self._life_length and not flag_get:
+            self.life -= 1
+            reward = -15
+            if self.life > 0:
+                self._start_life()
+        done = self.life == 0 or flag_get
+        info = dict(x_pos=self.x_pos, life=self.life, flag_get=flag_get)
+        return self._render(), reward, done, info
+
+
+def build_synthetic_environment(env_id: str='SyntheticNES-v0',
+    image_size: tuple=(84, 84),
+    agent_history_length: int=4,
+) -> gym.Env:
+    """
+    Build and return a synthetic NES environment wrapped like the NES envs.
+
+    Args:
+        env_id: the ID of the environment as 'SyntheticNES-v0' or with the
+            microseconds of CPU time per step like 'SyntheticNES-500us-v0'
+        image_size: the size to down-sample frames to
+        agent_history_length: the number of frames to stack
+
+    Returns:
+        the wrapped synthetic environment
+
+    """
+    match = re.match(r'^SyntheticNES(?:-(\d+)us)?-v0$', env_id)
+    if match is None:
+        raise ValueError('invalid synthetic environment ID: {}'.format(env_id))
+    step_cost = int(match.group(1) or 0) * 1e-6
+    env = SyntheticNESEnv(step_cost=step_cost)
+    env = RewardCacheEnv(env)
+    env = DownsampleEnv(env, image_size)
+    env = FrameStackEnv(env, agent_history_length)
+
+    return env
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    SyntheticNESEnv.__name__,
+    build_synthetic_environment.__name__,
+]
@@ -0,0 +1,116 @@
+"""Unit tests for the AsyncVideoRecorderEnv class."""
+import tempfile
+import threading
+import gym
+from gym.spaces import Box
+from gym.spaces import Discrete
+import numpy as np
+from unittest import TestCase
+from ..wrappers import AsyncVideoRecorderEnv
+
+
+class RenderingEnv(gym.Env):
+    """An environment that renders frames of the number of steps taken."""
+
+    metadata = {'render.modes': ['rgb_array'], 'video.frames_per_second': 60}
+
+    def __init__(self, length: int=10) -> None:
+        self.length = length
+        self.steps = 0
+        self.closed = False
+        self.observation_space = Box(0, 255, (4, 4, 3), dtype=np.uint8)
+        self.action_space = Discrete(2)
+        self.screen = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def render(self, mode='human'):
+        # render the same buffer every time like an emulator
+        self.screen[:] = self.steps
+        return self.screen
+
+    def reset(self):
+        self.steps = 0
+        return self.render()
+
+    def step(self, action):
+        self.steps += 1
+        return self.render(), 0, self.steps == self.length, {}
+
+    def close(self):
+        self.closed = True
+
+
+class FakeEncoder(object):
+    """A stand-in for gym's ImageEncoder that keeps the frames it encodes."""
+
+    videos = {}
+    # an event the encoder waits for before encoding frames
+    ready = None
+
+    def __init__(self, path: str, frame_shape: tuple, frames_per_sec: int) -> None:
+        self.path = path
+        self.frame_shape = frame_shape
+        self.frames_per_sec = frames_per_sec
+        self.frames = []
+        self.closed = False
+        FakeEncoder.videos[path] = self
+
+    def capture_frame(self, frame):
+        if FakeEncoder.ready is not None:
+            FakeEncoder.ready.wait()
+        self.frames.append(int(frame[0, 0, 0]))
+
+    def close(self):
+        self.closed = True
+
+
+def play(env, episodes: int) -> None:
+    """Play a number of episodes in an environment."""
+    for _ in range(episodes):
+        env.reset()
+        done = False
+        while not done:
+            _, _, done, _ = env.step(0)
+
+
+class AsyncVideoRecorderEnv_should_record(TestCase):
+    def setUp(self):
+        FakeEncoder.videos = {}
+        FakeEncoder.ready = None
+
+    def test_scheduled_episodes(self):
+        directory = tempfile.mkdtemp()
+        env = AsyncVideoRecorderEnv(RenderingEnv(), directory,
+            video_callable=lambda episode: episode % 2 == 0,
+            encoder=FakeEncoder,
+        )
+        play(env, 3)
+        env.close()
+        self.assertTrue(env.env.closed)
+        paths = sorted(FakeEncoder.videos)
+        self.assertEqual(2, len(paths))
+        self.assertTrue(paths[0].endswith('video000000.mp4'))
+        self.assertTrue(paths[1].endswith('video000002.mp4'))
+        for video in FakeEncoder.videos.values():
+            self.assertTrue(video.closed)
+            self.assertEqual((4, 4, 3), video.frame_shape)
+            self.assertEqual(60, video.frames_per_sec)
+            # the frames are copies of the screen buffer
+            self.assertEqual(list(range(11)), video.frames)
+        self.assertEqual(0, env.dropped)
+
+    def test_drops_frames_under_backpressure(self):
+        FakeEncoder.ready = threading.Event()
+        env = AsyncVideoRecorderEnv(RenderingEnv(length=100), tempfile.mkdtemp(),
+            video_callable=lambda episode: True,
+            queue_size=8,
+            encoder=FakeEncoder,
+        )
+        play(env, 1)
+        self.assertGreater(env.dropped, 0)
+        self.assertEqual(101, env.frames + env.dropped)
+        # the queued frames are flushed on close
+        FakeEncoder.ready.set()
+        env.close()
+        video, = FakeEncoder.videos.values()
+        self.assertEqual(env.frames, len(video.frames))
+        self.assertTrue(video.closed)
@@ -0,0 +1,93 @@
+"""Unit tests for the FrameStackEnv class."""
+from collections import deque
+import gym
+from gym.spaces import Box
+from gym.spaces import Discrete
+import numpy as np
+from unittest import TestCase
+from ..wrappers.frame_stack_env import FrameStackEnv
+from ..wrappers.frame_stack_env import LazyFrames
+from ..wrappers.frame_stack_env import stack_lazy_frames
+
+
+class CountingFrameEnv(gym.Env):
+    """An environment with frames of the number of frames so far."""
+
+    def __init__(self, channels: int=1) -> None:
+        self.observation_space = Box(0, 255, (84, 84, channels), dtype=np.uint8)
+        self.action_space = Discrete(2)
+        self.frame = 0
+
+    def _observation(self):
+        # give each channel a different value to check the channel order
+        channels = self.observation_space.shape[-1]
+        values = (self.frame + 100 * np.arange(channels)) % 256
+        return np.broadcast_to(values, (84, 84, channels)).astype(np.uint8)
+
+    def reset(self):
+        self.frame += 1
+        return self._observation()
+
+    def step(self, action):
+        self.frame += 1
+        return self._observation(), 0, self.frame % 50 == 0, {}
+
+
+def expected_stacks(channels: int, steps: int) -> list:
+    """Return the stacks of the original deque of frames implementation."""
+    env = CountingFrameEnv(channels)
+    frames = deque([env.reset()] * 4, maxlen=4)
+    stacks = [np.concatenate(frames, axis=2)]
+    for _ in range(steps):
+        ob, _, done, _ = env.step(0)
+        if done:
+            frames.extend([env.reset()] * 4)
+        else:
+            frames.append(ob)
+        stacks.append(np.concatenate(frames, axis=2))
+    return stacks
+
+
+class FrameStackEnv_should_stack(TestCase):
+    def _test(self, channels):
+        env = FrameStackEnv(CountingFrameEnv(channels), 4, chunk=16)
+        self.assertEqual((84, 84, 4 * channels), env.observation_space.shape)
+        observations = [env.reset()]
+        for _ in range(120):
+            ob, _, done, _ = env.step(0)
+            observations.append(env.reset() if done else ob)
+        # previous observations don't change as the buffers fill and renew
+        for expected, ob in zip(expected_stacks(channels, 120), observations):
+            self.assertIsInstance(ob, LazyFrames)
+            self.assertTrue(np.array_equal(expected, np.asarray(ob)))
+
+    def test(self):
+        self._test(1)
+
+    def test_channels(self):
+        self._test(3)
+
+
+class FrameStackEnv_should_not_copy(TestCase):
+    def test(self):
+        env = FrameStackEnv(CountingFrameEnv(), 4)
+        ob = env.reset()
+        ob2, *_ = env.step(0)
+        # consecutive observations are overlapping views of one buffer
+        self.assertTrue(np.shares_memory(np.asarray(ob), np.asarray(ob2)))
+        self.assertIs(np.asarray(ob2), np.asarray(ob2))
+        self.assertEqual((84, 84, 4), ob2.shape)
+        self.assertEqual(np.uint8, ob2.dtype)
+        self.assertEqual(np.float32, np.asarray(ob2, dtype=np.float32).dtype)
+
+
+class stack_lazy_frames_should_batch(TestCase):
+    def test(self):
+        env = FrameStackEnv(CountingFrameEnv(), 4, chunk=4)
+        observations = [env.reset()] + [env.step(0)[0] for _ in range(9)]
+        out = np.zeros((10, 84, 84, 4), dtype=np.uint8)
+        self.assertIs(out, stack_lazy_frames(observations, out=out))
+        batch = stack_lazy_frames(observations)
+        for index, ob in enumerate(observations):
+            self.assertTrue(np.array_equal(np.asarray(ob), out[index]))
+            self.assertTrue(np.array_equal(np.asarray(ob), batch[index]))
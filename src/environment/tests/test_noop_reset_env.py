@@ -0,0 +1,82 @@
+"""Unit tests for the NoopResetEnv class."""
+import gym
+from gym.spaces import Box
+from gym.spaces import Discrete
+import numpy as np
+from unittest import TestCase
+from ..wrappers import NoopResetEnv
+
+
+class EmulatorEnv(gym.Env):
+    """A deterministic environment with a state that can be cloned."""
+
+    def __init__(self, seed: int=0, done_at: int=None) -> None:
+        self.np_random = np.random.RandomState(seed)
+        self.observation_space = Box(0, 255, (4, 4, 1), dtype=np.uint8)
+        self.action_space = Discrete(2)
+        self.done_at = done_at
+        self.frame = 0
+        self.steps = 0
+
+    def get_action_meanings(self) -> list:
+        return ['NOOP', 'FIRE']
+
+    def _obs(self):
+        return np.full(self.observation_space.shape, self.frame, dtype=np.uint8)
+
+    def clone_state(self):
+        return self.frame
+
+    def restore_state(self, state) -> None:
+        self.frame = state
+
+    def reset(self):
+        self.frame = 0
+        return self._obs()
+
+    def step(self, action):
+        self.frame += 1
+        self.steps += 1
+        return self._obs(), 0, self.frame == self.done_at, {}
+
+
+class StatelessEnv(gym.Env):
+    """An environment with a state that can't be cloned."""
+
+    def get_action_meanings(self) -> list:
+        return ['NOOP']
+
+
+class NoopResetEnv_should_cache_states(TestCase):
+    def test_raises_without_clone_state(self):
+        env = StatelessEnv()
+        self.assertRaises(ValueError, NoopResetEnv, env, cache_states=True)
+
+    def test_same_initial_states(self):
+        cached = NoopResetEnv(EmulatorEnv(seed=1), noop_max=5, cache_states=True)
+        uncached = NoopResetEnv(EmulatorEnv(seed=1), noop_max=5)
+        for _ in range(50):
+            expected = uncached.reset()
+            obs = cached.reset()
+            self.assertTrue(np.array_equal(expected, obs))
+            self.assertEqual(uncached.unwrapped.frame, cached.unwrapped.frame)
+            # stepping continues from the restored state
+            self.assertTrue(np.array_equal(uncached.step(0)[0], cached.step(0)[0]))
+        # each number of no-ops was emulated once
+        self.assertEqual(5, len(cached._states))
+        self.assertEqual(sum(range(1, 6)) + 50, cached.unwrapped.steps)
+
+    def test_observations_are_not_shared(self):
+        env = NoopResetEnv(EmulatorEnv(), noop_max=1, cache_states=True)
+        obs = env.reset()
+        obs[:] = 255
+        self.assertFalse(np.array_equal(obs, env.reset()))
+
+    def test_resets_during_noops_are_not_cached(self):
+        env = NoopResetEnv(EmulatorEnv(done_at=2), noop_max=3, cache_states=True)
+        env.override_num_noops = 3
+        env.reset()
+        self.assertEqual({}, env._states)
+        env.override_num_noops = 1
+        env.reset()
+        self.assertEqual([1], list(env._states))
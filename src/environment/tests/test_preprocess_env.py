@@ -0,0 +1,94 @@
+"""Unit tests for the PreprocessEnv class."""
+import gym
+from gym.spaces import Box
+from gym.spaces import Discrete
+import numpy as np
+from unittest import TestCase
+from ..atari import wrap_atari_environment
+from ..wrappers import PreprocessEnv
+
+
+class FakeALE(object):
+    """A stand-in for the interface of the Arcade Learning Environment."""
+
+    def __init__(self) -> None:
+        self._lives = 0
+
+    def lives(self) -> int:
+        return self._lives
+
+
+class FakeAtariEnv(gym.Env):
+    """An Atari-like environment with random frames, rewards, and deaths."""
+
+    def __init__(self, seed: int=0, fire: bool=False) -> None:
+        self.ale = FakeALE()
+        self.np_random = np.random.RandomState(seed)
+        self.observation_space = Box(0, 255, (210, 160, 3), dtype=np.uint8)
+        self.meanings = ['NOOP', 'FIRE', 'RIGHT', 'LEFT'] if fire else ['NOOP', 'RIGHT', 'LEFT']
+        self.action_space = Discrete(len(self.meanings))
+        # blocky frames with a few colors, like the frames of a game
+        blocks = self.np_random.randint(0, 4, (16, 21, 16, 3)) * 60
+        blocks = np.repeat(np.repeat(blocks, 10, axis=1), 10, axis=2)
+        self.frames = blocks.astype(np.uint8)
+
+    def get_action_meanings(self) -> list:
+        return self.meanings
+
+    def _frame(self):
+        return self.frames[self.np_random.randint(len(self.frames))].copy()
+
+    def reset(self):
+        self.ale._lives = 3
+        return self._frame()
+
+    def step(self, action):
+        reward = self.np_random.choice([0, 0, 0, 1, 5, -3])
+        if self.np_random.random_sample() < 0.02:
+            self.ale._lives -= 1
+        done = self.ale._lives == 0
+        return self._frame(), reward, done, {'action': action}
+
+
+def assert_same_episodes(test: TestCase, fire: bool, steps: int=400) -> None:
+    """Assert that the fused wrapper matches the chain of wrappers."""
+    chain = wrap_atari_environment(FakeAtariEnv(fire=fire), fused=False)
+    fused = wrap_atari_environment(FakeAtariEnv(fire=fire), fused=True)
+    test.assertIsInstance(fused, PreprocessEnv)
+    test.assertEqual(chain.observation_space.shape, fused.observation_space.shape)
+    expected = np.asarray(chain.reset())
+    obs = fused.reset()
+    test.assertTrue(np.array_equal(expected, obs))
+    actions = np.random.RandomState(1).randint(0, chain.action_space.n, steps)
+    dones = 0
+    for action in actions:
+        expected, expected_reward, expected_done, _ = chain.step(action)
+        obs, reward, done, _ = fused.step(action)
+        test.assertEqual(np.uint8, obs.dtype)
+        test.assertTrue(np.array_equal(np.asarray(expected), obs))
+        test.assertEqual(expected_reward, reward)
+        test.assertEqual(expected_done, done)
+        if done:
+            dones += 1
+            test.assertTrue(np.array_equal(np.asarray(chain.reset()), fused.reset()))
+    # the episodes should have ended a few times
+    test.assertGreater(dones, 0)
+
+
+class PreprocessEnv_should_match_chain(TestCase):
+    def test(self):
+        assert_same_episodes(self, fire=False)
+
+    def test_fire(self):
+        assert_same_episodes(self, fire=True)
+
+
+class PreprocessEnv_step(TestCase):
+    def test_observations_are_not_shared(self):
+        env = PreprocessEnv(FakeAtariEnv(), death_penalty=None)
+        obs = env.reset()
+        obs2, *_ = env.step(0)
+        self.assertEqual((84, 84, 4), obs2.shape)
+        self.assertFalse(np.shares_memory(obs, obs2))
+        # the stack shifts back by a frame
+        self.assertTrue(np.array_equal(obs[..., 1:], obs2[..., :-1]))
@@ -0,0 +1,67 @@
+"""Unit tests for the synthetic NES environment."""
+import numpy as np
+from unittest import TestCase
+from ..synthetic import SyntheticNESEnv
+from ..synthetic import build_synthetic_environment
+
+
+def play(env, seed: int=0) -> list:
+    """Play an episode with random actions and return the transitions."""
+    rng = np.random.RandomState(seed)
+    transitions = [env.reset().copy()]
+    done = False
+    while not done:
+        obs, reward, done, info = env.step(rng.randint(env.action_space.n))
+        transitions.append((obs.copy(), reward, info))
+    return transitions
+
+
+class SyntheticNESEnv__init__(TestCase):
+    def test(self):
+        env = SyntheticNESEnv()
+        self.assertEqual((240, 256, 3), env.observation_space.shape)
+        self.assertEqual(np.uint8, env.observation_space.dtype)
+        self.assertEqual(7, env.action_space.n)
+
+
+class SyntheticNESEnv_step(TestCase):
+    def test_episodes_are_deterministic(self):
+        first = play(SyntheticNESEnv(seed=1))
+        second = play(SyntheticNESEnv(seed=1))
+        self.assertEqual(len(first), len(second))
+        self.assertTrue(np.array_equal(first[0], second[0]))
+        for (obs, reward, info), (obs2, reward2, info2) in zip(first[1:], second[1:]):
+            self.assertTrue(np.array_equal(obs, obs2))
+            self.assertEqual(reward, reward2)
+            self.assertEqual(info, info2)
+
+    def test_episodes_end_after_three_lives(self):
+        env = SyntheticNESEnv(life_length=20)
+        transitions = play(env)
+        lives = [info['life'] for _, _, info in transitions[1:]]
+        self.assertEqual([3, 2, 1, 0], sorted(set(lives), reverse=True))
+        self.assertEqual(3, sum(reward == -15 for _, reward, _ in transitions[1:]))
+
+    def test_frames_change(self):
+        env = SyntheticNESEnv()
+        first = env.reset().copy()
+        # moving right scrolls the level
+        for _ in range(100):
+            obs, reward, _, _ = env.step(1)
+        self.assertEqual(2, reward)
+        self.assertFalse(np.array_equal(first, obs))
+
+
+class build_synthetic_environment_should(TestCase):
+    def test_wrap(self):
+        env = build_synthetic_environment()
+        self.assertEqual((84, 84, 4), env.observation_space.shape)
+        self.assertEqual(0, env.unwrapped.step_cost)
+        self.assertEqual((84, 84, 4), np.asarray(env.reset()).shape)
+
+    def test_parse_step_cost(self):
+        env = build_synthetic_environment('SyntheticNES-500us-v0')
+        self.assertAlmostEqual(5e-4, env.unwrapped.step_cost)
+
+    def test_raise_on_invalid_id(self):
+        self.assertRaises(ValueError, build_synthetic_environment, 'SyntheticNES-v1')
@@ -0,0 +1,143 @@
+"""Unit tests for the SubprocVecEnv class."""
+from functools import partial
+from multiprocessing import shared_memory
+import gym
+from gym.spaces import Box
+from gym.spaces import Discrete
+import numpy as np
+from unittest import TestCase
+from ..vec_env import SubprocVecEnv
+
+
+class CountingEnv(gym.Env):
+    """An environment with observations of the number of steps taken."""
+
+    def __init__(self, value: int, length: int=5) -> None:
+        self.value = value
+        self.length = length
+        self.steps = 0
+        self.observation_space = Box(
+            low=0,
+            high=255,
+            shape=(84, 84, 4),
+            dtype=np.uint8
+        )
+        self.action_space = Discrete(3)
+
+    def _observation(self):
+        return np.full((84, 84, 4), self.value + self.steps, dtype=np.uint8)
+
+    def reset(self):
+        self.steps = 0
+        return self._observation()
+
+    def step(self, action):
+        self.steps += 1
+        done = self.steps == self.length
+        return self._observation(), action, done, {'steps': self.steps}
+
+
+class BrokenEnv(CountingEnv):
+    """A counting environment that raises an error when it steps."""
+
+    def step(self, action):
+        raise ValueError('the environment is broken')
+
+
+def build_broken_env() -> gym.Env:
+    """Raise an error instead of building an environment."""
+    raise ValueError('the environment failed to build')
+
+
+def build_envs(num_envs: int) -> SubprocVecEnv:
+    """Return a vector of counting environments with values 0, 10, ..."""
+    return SubprocVecEnv([partial(CountingEnv, 10 * index) for index in range(num_envs)])
+
+
+class SubprocVecEnv__init__(TestCase):
+    def test(self):
+        env = build_envs(2)
+        self.assertEqual(2, env.num_envs)
+        self.assertEqual((84, 84, 4), env.observation_space.shape)
+        self.assertEqual(3, env.action_space.n)
+        self.assertEqual((2, 84, 84, 4), env.observations.shape)
+        env.close()
+
+
+class SubprocVecEnv_reset(TestCase):
+    def test(self):
+        env = build_envs(3)
+        obs = env.reset()
+        self.assertEqual((3, 84, 84, 4), obs.shape)
+        self.assertEqual([0, 10, 20], list(obs[:, 0, 0, 0]))
+        env.close()
+
+
+class SubprocVecEnv_step(TestCase):
+    def test(self):
+        env = build_envs(3)
+        env.reset()
+        obs, rewards, dones, infos = env.step([0, 1, 2])
+        self.assertEqual([1, 11, 21], list(obs[:, 0, 0, 0]))
+        self.assertEqual([0, 1, 2], list(rewards))
+        self.assertFalse(dones.any())
+        self.assertEqual([1, 1, 1], [info['steps'] for info in infos])
+        env.close()
+
+    def test_auto_reset(self):
+        env = build_envs(2)
+        env.reset()
+        for _ in range(4):
+            env.step([0, 0])
+        obs, _, dones, infos = env.step([0, 0])
+        self.assertTrue(dones.all())
+        self.assertEqual([5, 5], [info['steps'] for info in infos])
+        # the observations are of the next episodes
+        self.assertEqual([0, 10], list(obs[:, 0, 0, 0]))
+        env.close()
+
+    def test_async(self):
+        env = build_envs(2)
+        env.reset()
+        env.step_async([1, 1])
+        obs, rewards, _, _ = env.step_wait()
+        self.assertEqual([1, 11], list(obs[:, 0, 0, 0]))
+        self.assertEqual([1, 1], list(rewards))
+        env.close()
+        self.assertTrue(env.closed)
+
+    def test_groups(self):
+        env = build_envs(4)
+        env.reset()
+        first, second = slice(0, 2), slice(2, 4)
+        env.step_async([1, 1], first)
+        env.step_async([2, 2], second)
+        obs, rewards, _, _ = env.step_wait(second)
+        self.assertEqual((2, 84, 84, 4), obs.shape)
+        self.assertEqual([21, 31], list(obs[:, 0, 0, 0]))
+        self.assertEqual([2, 2], list(rewards))
+        obs, rewards, _, _ = env.step_wait(first)
+        self.assertEqual([1, 11], list(obs[:, 0, 0, 0]))
+        self.assertEqual([1, 1], list(rewards))
+        # closing waits for the environments that are still stepping
+        env.step_async([0, 0], first)
+        env.close()
+        self.assertTrue(env.closed)
+
+
+class SubprocVecEnv_should_raise_errors(TestCase):
+    def test_of_steps(self):
+        env = SubprocVecEnv([partial(CountingEnv, 0), partial(BrokenEnv, 10)])
+        name = env._block.name
+        env.reset()
+        with self.assertRaisesRegex(RuntimeError, 'the environment is broken'):
+            env.step([0, 0])
+        env.close()
+        self.assertTrue(env.closed)
+        # the shared observations are freed
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_of_builds(self):
+        with self.assertRaisesRegex(RuntimeError, 'failed to build'):
+            SubprocVecEnv([partial(CountingEnv, 0), build_broken_env])
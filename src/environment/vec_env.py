@@ -0,0 +1,293 @@
+"""A vector of environments stepped in parallel in worker processes."""
+import multiprocessing
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+import traceback
+from typing import Callable
+import numpy as np
+
+
+def _worker(pipe, env_fn: Callable, index: int) -> None:
+    """
+    Run an environment in a worker process.
+
+    Notes:
+        the errors of the environment are sent to the vector as
+        `('error', traceback)` for the vector to raise, after which the
+        worker exits
+
+    Args:
+        pipe: the worker end of the pipe to the vector of environments
+        env_fn: a callable that builds the environment
+        index: the index of the environment in the vector
+
+    Returns:
+        None
+
+    """
+    env = None
+    block = None
+    observations = observation = None
+    try:
+        env = env_fn()
+        pipe.send((env.observation_space, env.action_space))
+        # attach to the shared array of observations of the vector
+        name, shape, dtype = pipe.recv()
+        block = shared_memory.SharedMemory(name=name)
+        observations = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        observation = observations[index]
+        while True:
+            command, data = pipe.recv()
+            if command == 'step':
+                obs, reward, done, info = env.step(data)
+                # reset done environments so every step has a next state
+                if done:
+                    obs = env.reset()
+                observation[:] = obs
+                pipe.send((reward, done, info))
+            elif command == 'reset':
+                observation[:] = env.reset()
+                pipe.send(None)
+            elif command == 'close':
+                break
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        pipe.send(('error', traceback.format_exc()))
+    finally:
+        del observation, observations
+        if block is not None:
+            block.close()
+        if env is not None:
+            env.close()
+
+
+class SubprocVecEnv(object):
+    """A vector of environments stepped in parallel in worker processes."""
+
+    def __init__(self, env_fns: list) -> None:
+        """
+        Initialize a new vector of environments.
+
+        Notes:
+            each environment runs in its own process and writes observations
+            directly into a shared array of shape `(num_envs, *obs_shape)`
+            so only actions, rewards, flags, and info dictionaries are sent
+            through pipes. an environment is reset when an episode ends, so
+            the observation of a done environment is the initial observation
+            of its next episode. the errors of the environments are raised
+            by the vector as a `RuntimeError` with the traceback of the
+            worker. the shared array is freed by `close` (or when the vector
+            is garbage collected)
+
+        Args:
+            env_fns: a list of picklable callables that build the
+                environments (e.g., partials of `setup_env`)
+
+        Returns:
+            None
+
+        """
+        self.num_envs = len(env_fns)
+        self.closed = False
+        self._block = None
+        self.observations = None
+        # the indexes of the environments that are stepping
+        self._waiting = set()
+        # start the resource tracker before the workers so they share it,
+        # otherwise the tracker of each worker unlinks the shared array of
+        # observations when the worker exits (bpo-38119)
+        resource_tracker.ensure_running()
+        # start a worker process for each environment
+        self._pipes = []
+        self._processes = []
+        for index, env_fn in enumerate(env_fns):
+            pipe, worker_pipe = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(worker_pipe, env_fn, index),
+                daemon=True,
+            )
+            process.start()
+            worker_pipe.close()
+            self._pipes.append(pipe)
+            self._processes.append(process)
+        # the spaces of the vector are those of the individual environments
+        try:
+            spaces = [self._recv(index) for index in range(self.num_envs)]
+        except Exception:
+            # stop the workers that built their environments
+            for process in self._processes:
+                process.terminate()
+            for pipe in self._pipes:
+                pipe.close()
+            self.closed = True
+            raise
+        self.observation_space, self.action_space = spaces[0]
+        # setup the shared array of observations for the workers to write
+        shape = (self.num_envs, *self.observation_space.shape)
+        dtype = self.observation_space.dtype
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self._block = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.observations = np.ndarray(shape, dtype=dtype, buffer=self._block.buf)
+        for pipe in self._pipes:
+            pipe.send((self._block.name, shape, dtype))
+
+    def __repr__(self) -> str:
+        """Return a debugging string of this vector of environments."""
+        return '{}(num_envs={})'.format(self.__class__.__name__, self.num_envs)
+
+    def __len__(self) -> int:
+        """Return the number of environments in the vector."""
+        return self.num_envs
+
+    def __del__(self) -> None:
+        """Close the vector to free the shared observations."""
+        if not getattr(self, 'closed', True):
+            self.close()
+
+    def _recv(self, index: int) -> object:
+        """
+        Receive the result of a command from a worker.
+
+        Args:
+            index: the index of the environment of the worker
+
+        Returns:
+            the result the worker sent
+
+        """
+        result = self._pipes[index].recv()
+        # the only results that start with a string are errors
+        if isinstance(result, tuple) and isinstance(result[0], str):
+            msg = 'environment {} of the vector raised an error:\n{}'
+            raise RuntimeError(msg.format(index, result[1]))
+
+        return result
+
+    def reset(self) -> np.ndarray:
+        """
+        Reset all the environments.
+
+        Returns:
+            the shared array of the initial observations of the environments
+
+        """
+        for pipe in self._pipes:
+            pipe.send(('reset', None))
+        for index in range(self.num_envs):
+            self._recv(index)
+
+        return self.observations
+
+    def _indexes(self, group: slice) -> range:
+        """Return the indexes of the environments in a group."""
+        return range(self.num_envs)[group]
+
+    def step_async(self, actions: np.ndarray, group: slice=None) -> None:
+        """
+        Start stepping the environments without waiting for them.
+
+        Args:
+            actions: a vector of an action for each environment (of the
+                group)
+            group: an optional slice of the environments to step. if None,
+                all the environments step
+
+        Returns:
+            None
+
+        """
+        indexes = self._indexes(slice(None) if group is None else group)
+        for index, action in zip(indexes, actions):
+            self._pipes[index].send(('step', action))
+        self._waiting.update(indexes)
+
+    def step_wait(self, group: slice=None) -> tuple:
+        """
+        Wait for the environments to finish stepping.
+
+        Notes:
+            with groups, some of the environments can step while the caller
+            works on the observations of the others (e.g., predicting their
+            next actions)
+
+        Args:
+            group: an optional slice of the environments to wait for (that
+                were stepped with the same group). if None, all the
+                environments are waited for
+
+        Returns:
+            a tuple of:
+            - the shared array of the next observations of the environments
+              (a view of the rows of the group)
+            - a vector of the rewards of the environments
+            - a vector of the done flags of the environments
+            - a list of the info dictionaries of the environments
+
+        """
+        group = slice(None) if group is None else group
+        indexes = self._indexes(group)
+        results = []
+        for index in indexes:
+            self._waiting.discard(index)
+            results.append(self._recv(index))
+        rewards, dones, infos = zip(*results)
+
+        return (
+            self.observations[group],
+            np.array(rewards, dtype=np.float32),
+            np.array(dones, dtype=bool),
+            list(infos),
+        )
+
+    def step(self, actions: np.ndarray) -> tuple:
+        """
+        Step the environments with a vector of actions.
+
+        Notes:
+            the array of observations is shared with the workers and
+            overwritten by the next step or reset, so copy it (or push it to a
+            replay queue) before stepping again
+
+        Args:
+            actions: a vector of an action for each environment
+
+        Returns:
+            a tuple of:
+            - the shared array of the next observations of the environments
+            - a vector of the rewards of the environments
+            - a vector of the done flags of the environments
+            - a list of the info dictionaries of the environments
+
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self) -> None:
+        """Close the environments and free the shared observations."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            for index in self._waiting:
+                self._pipes[index].recv()
+            for pipe in self._pipes:
+                # the workers of environments that raised have exited
+                try:
+                    pipe.send(('close', None))
+                except BrokenPipeError:
+                    pass
+            for process in self._processes:
+                process.join()
+        finally:
+            for pipe in self._pipes:
+                pipe.close()
+            self.observations = None
+            if self._block is not None:
+                self._block.close()
+                self._block.unlink()
+
+
+# explicitly define the outward facing API of this module
+__all__ = [SubprocVecEnv.__name__]
@@ -8,6 +8,7 @@ https://github.com/openai/baselines/blob/master/baselines/common/atari_wrappers.
 These are provided by OpenAI baselines as a means of recreating some of the
 DeepMind functionality.
 """
+from .async_video_recorder_env import AsyncVideoRecorderEnv
 from .clip_reward_env import ClipRewardEnv
 from .downsample_env import DownsampleEnv
 from .fire_reset_env import FireResetEnv
@@ -15,11 +16,13 @@ from .frame_stack_env import FrameStackEnv
 from .max_frameskip_env import MaxFrameskipEnv
 from .noop_reset_env import NoopResetEnv
 from .penalize_death_env import PenalizeDeathEnv
+from .preprocess_env import PreprocessEnv
 from .reward_cache_env import RewardCacheEnv
 
 
 # explicitly specify the outward facing API of this package
 __all__ = [
+    AsyncVideoRecorderEnv.__name__,
     ClipRewardEnv.__name__,
     DownsampleEnv.__name__,
     FireResetEnv.__name__,
@@ -27,5 +30,6 @@ __all__ = [
     MaxFrameskipEnv.__name__,
     NoopResetEnv.__name__,
     PenalizeDeathEnv.__name__,
+    PreprocessEnv.__name__,
     RewardCacheEnv.__name__,
 ]
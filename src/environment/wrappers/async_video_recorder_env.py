@@ -0,0 +1,133 @@
+"""An environment wrapper that records videos in a background thread."""
+import os
+import queue
+import threading
+import gym
+from gym import logger
+from gym.wrappers.monitor import capped_cubic_video_schedule
+from gym.wrappers.monitoring.video_recorder import ImageEncoder
+import numpy as np
+
+
+class AsyncVideoRecorderEnv(gym.Wrapper):
+    """An environment wrapper that records videos in a background thread."""
+
+    def __init__(self, env,
+        directory: str,
+        video_callable=None,
+        queue_size: int=64,
+        encoder=ImageEncoder,
+    ) -> None:
+        """
+        Initialize a new asynchronous video recorder.
+
+        Notes:
+            each step of a recorded episode copies the rendered frame into a
+            bounded queue that a background thread encodes from. when the
+            queue is full (i.e., encoding is slower than the agent), the frame
+            is dropped instead of blocking the step. the queue is flushed and
+            the last video is finished on `close`. use with
+            `gym.wrappers.Monitor(..., video_callable=False)` to keep the
+            episode statistics of the monitor
+
+        Args:
+            env: the environment to record videos of
+            directory: the directory to write the videos to
+            video_callable: a callable that takes the index of an episode and
+                returns whether to record it. if None, the capped cubic
+                schedule of `gym.wrappers.Monitor` is used
+            queue_size: the max number of frames waiting to be encoded
+            encoder: the class of the video encoder with the interface of
+                gym's `ImageEncoder` (built as `encoder(path, shape, fps)`)
+
+        Returns:
+            None
+
+        """
+        gym.Wrapper.__init__(self, env)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        if video_callable is None:
+            video_callable = capped_cubic_video_schedule
+        self.video_callable = video_callable
+        self.encoder = encoder
+        self.frames_per_sec = env.metadata.get('video.frames_per_second', 30)
+        # the index of the next episode and whether the current is recorded
+        self.episode_id = 0
+        self._recording = False
+        # the number of frames queued and dropped for encoding
+        self.frames = 0
+        self.dropped = 0
+        # start the thread that encodes frames from the queue
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    def _encode(self) -> None:
+        """Encode frames from the queue until the sentinel is queued."""
+        path = None
+        encoder = None
+        while True:
+            command, data = self._queue.get()
+            if command == 'frame' and path is not None:
+                # open the video when its first frame (and shape) arrives
+                if encoder is None:
+                    try:
+                        encoder = self.encoder(path, data.shape, self.frames_per_sec)
+                    except Exception as error:
+                        logger.error('failed to record %s: %s', path, error)
+                        path = None
+                        continue
+                encoder.capture_frame(data)
+            elif command == 'start':
+                path = data
+            elif command in ('stop', None):
+                if encoder is not None:
+                    encoder.close()
+                path = None
+                encoder = None
+                if command is None:
+                    break
+
+    def _capture(self) -> None:
+        """Queue a copy of the rendered frame (or drop it if the queue is full)."""
+        # the encoder is the only consumer so the queue can't fill up between
+        # checking and putting the frame
+        if self._queue.full():
+            self.dropped += 1
+            return
+        frame = self.env.render(mode='rgb_array')
+        self._queue.put_nowait(('frame', np.array(frame, dtype=np.uint8)))
+        self.frames += 1
+
+    def reset(self, **kwargs):
+        obs = self.env.reset(**kwargs)
+        # finish the video of the last episode and start the next one
+        if self._recording:
+            self._queue.put(('stop', None))
+        self._recording = self.video_callable(self.episode_id)
+        if self._recording:
+            path = '{}/video{:06}.mp4'.format(self.directory, self.episode_id)
+            self._queue.put(('start', path))
+            self._capture()
+        self.episode_id += 1
+        return obs
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        if self._recording:
+            self._capture()
+        return obs, reward, done, info
+
+    def close(self):
+        # wait for the queued frames to be encoded
+        if self._thread.is_alive():
+            self._queue.put((None, None))
+            self._thread.join()
+        self._recording = False
+        return self.env.close()
+
+
+# explicitly specify the external API of this module
+__all__ = [AsyncVideoRecorderEnv.__name__]
@@ -1,5 +1,4 @@
 """An environment wrapper to stack observations into a tensor."""
-from collections import deque
 import numpy as np
 import gym
 
@@ -7,16 +6,32 @@ import gym
 class FrameStackEnv(gym.Wrapper):
     """An environment wrapper to stack observations into a tensor."""
 
-    def __init__(self, env, k):
-        """Stack k last frames.
-        Returns lazy array, which is much more memory efficient.
-        See Also
-        --------
-        baselines.common.atari_wrappers.LazyFrames
+    def __init__(self, env, k, chunk: int=256):
+        """
+        Stack k last frames.
+
+        Notes:
+            frames are appended along the last axis of a preallocated buffer
+            and each observation is a `LazyFrames` of a view of the last `k`
+            frames in the buffer, so observations are never copied. appending
+            a frame never changes the frames of previous observations. when
+            the buffer is full, a new buffer is allocated (starting with the
+            last `k - 1` frames) instead of overwriting the frames of
+            observations that may still be held by the caller
+
+        Args:
+            env: the environment to wrap
+            k: the number of frames to stack
+            chunk: the number of frames to append to a buffer before
+                allocating a new one
+
+        Returns:
+            None
+
         """
         gym.Wrapper.__init__(self, env)
         self.k = k
-        self.frames = deque([], maxlen=k)
+        self.chunk = chunk
         shp = env.observation_space.shape
         self.observation_space = gym.spaces.Box(
             low=0,
@@ -24,21 +39,42 @@ class FrameStackEnv(gym.Wrapper):
             shape=(shp[0], shp[1], shp[2] * k),
             dtype=np.uint8
         )
+        # the number of channels of each frame
+        self._channels = shp[2]
+        self._buffer = None
+        # the index of the newest frame in the buffer
+        self._index = 0
+
+    def _allocate(self) -> None:
+        """Allocate a new buffer for frames."""
+        shape = (*self.observation_space.shape[:2], self._channels * (self.k - 1 + self.chunk))
+        self._buffer = np.empty(shape, dtype=np.uint8)
 
     def reset(self):
         ob = self.env.reset()
-        for _ in range(self.k):
-            self.frames.append(ob)
+        # start a new buffer with the initial frame repeated k times
+        self._allocate()
+        self._index = self.k - 1
+        self._buffer[..., :self.k * self._channels] = np.tile(ob, self.k)
         return self._get_ob()
 
     def step(self, action):
         ob, reward, done, info = self.env.step(action)
-        self.frames.append(ob)
+        self._index += 1
+        if (self._index + 1) * self._channels > self._buffer.shape[-1]:
+            # move the last k - 1 frames to the start of a new buffer
+            last = self._buffer[..., (self._index - self.k + 1) * self._channels:]
+            self._allocate()
+            self._buffer[..., :last.shape[-1]] = last
+            self._index = self.k - 1
+        start = self._index * self._channels
+        self._buffer[..., start:start + self._channels] = ob
         return self._get_ob(), reward, done, info
 
     def _get_ob(self):
-        assert len(self.frames) == self.k
-        return LazyFrames(list(self.frames))
+        start = (self._index - self.k + 1) * self._channels
+        end = (self._index + 1) * self._channels
+        return LazyFrames(self._buffer[..., start:end])
 
 
 class LazyFrames(object):
@@ -49,30 +85,63 @@ class LazyFrames(object):
         This object ensures that common frames between the observations are
         only stored once. It exists purely to optimize memory usage which can
         be huge for DQN's 1M frames replay buffers. This object should only be
-        converted to numpy array before being passed to the model. You'd not
-        believe how complex the previous solution was.
+        converted to numpy array before being passed to the model.
+
+        Args:
+            frames: a view of the stacked frames in the buffer of a
+                `FrameStackEnv` that is never changed
+
         """
         self._frames = frames
-        self._out = None
-
-    def _force(self):
-        if self._out is None:
-            self._out = np.concatenate(self._frames, axis=2)
-            self._frames = None
-        return self._out
 
     def __array__(self, dtype=None):
-        out = self._force()
         if dtype is not None:
-            out = out.astype(dtype)
-        return out
+            return self._frames.astype(dtype)
+        return self._frames
 
     def __len__(self):
-        return len(self._force())
+        return len(self._frames)
 
     def __getitem__(self, i):
-        return self._force()[i]
+        return self._frames[i]
+
+    @property
+    def shape(self) -> tuple:
+        """Return the shape of the stacked frames."""
+        return self._frames.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Return the data type of the stacked frames."""
+        return self._frames.dtype
+
+
+def stack_lazy_frames(observations: list, out: np.ndarray=None) -> np.ndarray:
+    """
+    Write a list of observations into a batch.
+
+    Args:
+        observations: the list of observations (e.g., `LazyFrames`) to batch
+        out: an optional array to write the batch into. if None, a new array
+            is allocated
+
+    Returns:
+        the batch of observations with shape `(len(observations), *shape)`
+
+    """
+    if out is None:
+        shape = (len(observations), *np.shape(observations[0]))
+        out = np.empty(shape, dtype=np.uint8)
+    for index, observation in enumerate(observations):
+        # copy directly from the view of the frames without concatenating
+        out[index] = np.asarray(observation)
+
+    return out
 
 
 # explicitly define the outward facing API of this module
-__all__ = [FrameStackEnv.__name__]
+__all__ = [
+    FrameStackEnv.__name__,
+    LazyFrames.__name__,
+    stack_lazy_frames.__name__,
+]
@@ -5,16 +5,41 @@ import gym
 class NoopResetEnv(gym.Wrapper):
     """An environment wrapper to preform null operations on reset."""
 
-    def __init__(self, env, noop_max=30):
+    def __init__(self, env, noop_max=30, cache_states=False):
         """
         Sample initial states by taking random number of no-ops on reset.
         No-op is assumed to be action 0.
+
+        Notes:
+            with `cache_states`, the emulator state (and observation) after
+            each number of no-ops is cloned the first time it's reached and
+            later resets with the same number of no-ops restore it instead of
+            emulating the no-ops again. the number of no-ops is sampled as
+            before, so the distribution of initial states is the same as long
+            as the emulator is deterministic (e.g., Atari v4 environments
+            without sticky actions). resets that end the episode during the
+            no-ops are never cached
+
+        Args:
+            env: the environment to wrap
+            noop_max: the max number of no-ops to take on reset
+            cache_states: whether to cache the initial states. the unwrapped
+                environment must implement `clone_state` and `restore_state`
+                (like the ALE environments of gym)
+
         """
         gym.Wrapper.__init__(self, env)
         self.noop_max = noop_max
         self.override_num_noops = None
         self.noop_action = 0
         assert env.unwrapped.get_action_meanings()[0] == 'NOOP'
+        unwrapped = env.unwrapped
+        if cache_states and not hasattr(unwrapped, 'clone_state'):
+            msg = 'cache_states requires clone_state and restore_state on {}'
+            raise ValueError(msg.format(type(unwrapped).__name__))
+        self.cache_states = cache_states
+        # a mapping of the number of no-ops to the state and observation
+        self._states = {}
 
     def step(self, ac):
         return self.env.step(ac)
@@ -27,11 +52,20 @@ class NoopResetEnv(gym.Wrapper):
         else:
             noops = self.unwrapped.np_random.randint(1, self.noop_max + 1) #pylint: disable=E1101
         assert noops > 0
+        # restore the state after the no-ops if it's in the cache
+        if noops in self._states:
+            state, obs = self._states[noops]
+            self.unwrapped.restore_state(state)
+            return obs.copy()
         obs = None
+        reset = False
         for _ in range(noops):
             obs, _, done, _ = self.env.step(self.noop_action)
             if done:
                 obs = self.env.reset()
+                reset = True
+        if self.cache_states and not reset:
+            self._states[noops] = self.unwrapped.clone_state(), obs.copy()
         return obs
 
 
@@ -0,0 +1,151 @@
+"""An environment wrapper that fuses the preprocessing of frames."""
+import gym
+import cv2
+import numpy as np
+
+
+class PreprocessEnv(gym.Wrapper):
+    """An environment wrapper that fuses the preprocessing of frames."""
+
+    def __init__(self,
+        env: gym.Env,
+        skip: int=4,
+        image_size: tuple=(84, 84),
+        death_penalty: int=-1,
+        clip_rewards: bool=True,
+        agent_history_length: int=4,
+        fire_reset: bool=False,
+    ) -> None:
+        """
+        Initialize a new preprocessing wrapper around an environment.
+
+        Notes:
+            each step holds the action for `skip` frames, max-pools the last
+            two frames, converts the result to grayscale, resizes it,
+            penalizes deaths, clips the reward, and stacks the frame onto the
+            history. this is equivalent to the chain of `MaxFrameskipEnv`,
+            `FireResetEnv`, `DownsampleEnv`, `PenalizeDeathEnv`,
+            `ClipRewardEnv`, and `FrameStackEnv` (and produces the same
+            observations) without the overhead of a wrapper per operation.
+            the intermediate frames are written to preallocated buffers
+
+        Args:
+            env: the environment to wrap around
+            skip: the number of frames to hold each action for
+            image_size: the size to down-sample frames to
+            death_penalty: the reward for losing a life. if None, deaths
+                aren't penalized
+            clip_rewards: whether to clip rewards in {-1, 0, +1}
+            agent_history_length: the number of frames to stack
+            fire_reset: whether to press fire on reset for games that are
+                fixed until firing
+
+        Returns:
+            None
+
+        """
+        gym.Wrapper.__init__(self, env)
+        self.skip = skip
+        self.image_size = image_size
+        self.death_penalty = death_penalty
+        self.clip_rewards = clip_rewards
+        self.agent_history_length = agent_history_length
+        self.fire_reset = fire_reset
+        self.lives = 0
+        self.observation_space = gym.spaces.Box(
+            low=0,
+            high=255,
+            shape=(image_size[1], image_size[0], agent_history_length),
+            dtype=np.uint8
+        )
+        # the buffers for the last two raw frames (for max pooling across
+        # time steps), their max, and its grayscale and resized versions
+        shape = env.observation_space.shape
+        self._obs_buffer = np.zeros((2, *shape), dtype=np.uint8)
+        self._max_frame = np.zeros(shape, dtype=np.uint8)
+        self._gray_frame = np.zeros(shape[:2], dtype=np.uint8)
+        self._frame = np.zeros((image_size[1], image_size[0]), dtype=np.uint8)
+        # the stack of the most recent frames
+        self._stack = np.zeros(self.observation_space.shape, dtype=np.uint8)
+
+    def _skip_step(self, action: int) -> tuple:
+        """
+        Hold an action for `skip` frames and max-pool the last two frames.
+
+        Args:
+            action: the action to hold
+
+        Returns:
+            a tuple of the total reward, the done flag, and the last info
+
+        """
+        total_reward = 0.0
+        done = None
+        for i in range(self.skip):
+            obs, reward, done, info = self.env.step(action)
+            total_reward += reward
+            # assign the buffer with the last two frames
+            if i == self.skip - 2:
+                self._obs_buffer[0] = obs
+            if i == self.skip - 1:
+                self._obs_buffer[1] = obs
+            # break the loop if the game terminated
+            if done:
+                break
+        np.maximum(self._obs_buffer[0], self._obs_buffer[1], out=self._max_frame)
+
+        return total_reward, done, info
+
+    def _downsample(self) -> None:
+        """Convert the max-pooled frame to a small grayscale frame."""
+        cv2.cvtColor(self._max_frame, cv2.COLOR_RGB2GRAY, dst=self._gray_frame)
+        cv2.resize(self._gray_frame, self.image_size, dst=self._frame)
+
+    def step(self, action):
+        reward, done, info = self._skip_step(action)
+        self._downsample()
+        # set the reward to the penalty if a life was lost
+        if self.death_penalty is not None:
+            lives = self.env.unwrapped.ale.lives()
+            reward = self.death_penalty if lives < self.lives else reward
+            self.lives = lives
+        if self.clip_rewards:
+            reward = np.sign(reward)
+        # shift the stack back by a frame into a new observation so previous
+        # observations held by the caller don't change. with the history last,
+        # shifting the flat stack by one byte moves every frame back (with
+        # the oldest frame of each pixel landing in the slot of the newest
+        # frame of the previous pixel), which is a contiguous copy unlike a
+        # copy of the strided frames
+        obs = np.empty_like(self._stack)
+        obs.reshape(-1)[:-1] = self._stack.reshape(-1)[1:]
+        obs[..., -1] = self._frame
+        self._stack = obs
+
+        return obs, reward, done, info
+
+    def reset(self):
+        if self.fire_reset:
+            self.env.reset()
+            _, done, _ = self._skip_step(1)
+            if done:
+                self.env.reset()
+            _, done, _ = self._skip_step(2)
+            if done:
+                self.env.reset()
+        else:
+            # the initial frame isn't pooled (or buffered for pooling)
+            self._max_frame[:] = self.env.reset()
+        self._downsample()
+        if self.death_penalty is not None:
+            self.lives = self.env.unwrapped.ale.lives()
+        # fill the stack with the initial frame
+        obs = np.empty_like(self._stack)
+        obs[:] = self._frame[..., np.newaxis]
+        self._stack = obs
+
+        return obs
+
+
+# explicitly define the outward facing API of this module
+__all__ = [PreprocessEnv.__name__]
@@ -1,10 +1,16 @@
 """Deep learning models for value function estimation in deep RL."""
 from .deep_q_model import build_deep_q_model
 from .dueling_deep_q_model import build_dueling_deep_q_model
+from .q_function import QFunction
+from .train_model import build_train_model
+from .train_step import TrainStep
 
 
 # explicitly define the outward facing API for this package
 __all__ = [
     build_deep_q_model.__name__,
     build_dueling_deep_q_model.__name__,
+    QFunction.__name__,
+    build_train_model.__name__,
+    TrainStep.__name__,
 ]
@@ -6,26 +6,24 @@ from keras.layers import Lambda
 from keras.layers import Dense
 from keras.layers import Flatten
 from keras.layers import Activation
-from keras.layers import Multiply
 from keras.layers import Add
 from keras.layers import Subtract
 from keras.layers.convolutional import Conv2D
-from keras.optimizers import RMSprop
-from .losses import huber_loss
 
 
 def build_dueling_deep_q_model(
     image_size: tuple=(84, 84),
     num_frames: int=4,
     num_actions: int=6,
-    loss=huber_loss,
-    optimizer=RMSprop(lr=0.00025, rho=0.95, epsilon=0.01)
 ) -> Model:
     """
     Build and return the Deep Mind model for the given domain parameters.
 
     Notes:
         Color Space: this CNN expects single channel images (B&W)
+        Training: the model outputs the Q value of every action for
+                  inference, build a model to train it on the Q values of
+                  selected actions with `build_train_model`
 
     Args:
         image_size: the shape of the image states for the model
@@ -35,8 +33,6 @@ def build_dueling_deep_q_model(
                     DeepMind uses 4 frames in their original implementation
         num_actions: the output shape for the model, this represents the
                      number of discrete actions available to a game
-        loss: the loss metric to use at the end of the network
-        optimizer: the optimizer for reducing error from batches
 
     Returns:
         a blank DeepMind CNN for image classification in a reinforcement agent
@@ -68,15 +64,9 @@ def build_dueling_deep_q_model(
     Q = Subtract()([advantage, avg_advantage])
     Q = Add()([Q, value])
 
-    # build the mask using the functional API
-    mask_input = Input((num_actions,), name='mask')
-    # put the two pieces of the graph together
-    output = Multiply()([Q, mask_input])
-
-    # build the model
-    model = Model(inputs=[cnn_input, mask_input], outputs=output)
-    # compile the model with the default loss and optimization technique
-    model.compile(loss=loss, optimizer=optimizer)
+    # build the model. the weighted layers are in the same order as the
+    # models that had a mask input, so their weights still load
+    model = Model(inputs=cnn_input, outputs=Q)
 
     return model
 
@@ -0,0 +1,33 @@
+"""Unit tests for the QFunction class."""
+import numpy as np
+from unittest import TestCase
+from ..deep_q_model import build_deep_q_model
+from ..dueling_deep_q_model import build_dueling_deep_q_model
+from ..q_function import QFunction
+
+
+class QFunction_should_match_predict(TestCase):
+    def _test(self, model):
+        q_function = QFunction(model)
+        frames = np.random.randint(0, 256, (5, 84, 84, 4), dtype=np.uint8)
+        expected = model.predict(frames)
+        self.assertTrue(np.allclose(expected, q_function(frames), atol=1e-5))
+        for index in range(5):
+            values = q_function.single(frames[index])
+            self.assertEqual((6, ), values.shape)
+            self.assertTrue(np.allclose(expected[index], values, atol=1e-5))
+
+    def test_deep_q_model(self):
+        self._test(build_deep_q_model())
+
+    def test_dueling_deep_q_model(self):
+        self._test(build_dueling_deep_q_model())
+
+    def test_set_weights(self):
+        model = build_deep_q_model()
+        q_function = QFunction(model)
+        frames = np.random.randint(0, 256, (84, 84, 4), dtype=np.uint8)
+        before = q_function.single(frames).copy()
+        model.set_weights([np.zeros_like(w) for w in model.get_weights()])
+        self.assertFalse(np.allclose(before, q_function.single(frames)))
+        self.assertTrue(np.array_equal(np.zeros(6), q_function.single(frames)))
@@ -0,0 +1,62 @@
+"""Unit tests for the train model builder method."""
+import os
+import tempfile
+import numpy as np
+from unittest import TestCase
+from keras.models import Model
+from keras.layers import Input
+from keras.layers import Multiply
+from ..deep_q_model import build_deep_q_model
+from ..dueling_deep_q_model import build_dueling_deep_q_model
+from ..train_model import build_train_model
+
+
+class ShouldBuildModel(TestCase):
+    def test(self):
+        model = build_deep_q_model()
+        train_model = build_train_model(model)
+        self.assertIsInstance(train_model, Model)
+        self.assertEqual(1, len(model.inputs))
+
+
+class ShouldSelectActions(TestCase):
+    def _test(self, model):
+        train_model = build_train_model(model)
+        s = np.random.randint(0, 256, (5, 84, 84, 4), dtype=np.uint8)
+        a = np.array([[0], [5], [2], [2], [3]])
+        Q = model.predict(s)
+        selected = train_model.predict([s, a])
+        self.assertEqual((5, 1), selected.shape)
+        self.assertTrue(np.allclose(Q[range(5), a[:, 0]], selected[:, 0], atol=1e-5))
+        # training on the selected actions updates the shared weights
+        train_model.train_on_batch([s, a], Q[range(5), a[:, 0]][:, np.newaxis] + 1)
+        self.assertFalse(np.allclose(Q, model.predict(s)))
+
+    def test_deep_q_model(self):
+        self._test(build_deep_q_model())
+
+    def test_dueling_deep_q_model(self):
+        self._test(build_dueling_deep_q_model())
+
+
+class ShouldLoadMaskedWeights(TestCase):
+    def _test(self, build_model):
+        # build a model with the mask input of the old builders
+        model = build_model()
+        mask_input = Input((6, ), name='mask')
+        output = Multiply()([model.outputs[0], mask_input])
+        masked = Model(inputs=[model.inputs[0], mask_input], outputs=output)
+        s = np.random.randint(0, 256, (2, 84, 84, 4), dtype=np.uint8)
+        expected = masked.predict([s, np.ones((2, 6))])
+        with tempfile.TemporaryDirectory() as directory:
+            weights_file = os.path.join(directory, 'weights.h5')
+            masked.save_weights(weights_file)
+            model = build_model()
+            model.load_weights(weights_file)
+        self.assertTrue(np.allclose(expected, model.predict(s), atol=1e-5))
+
+    def test_deep_q_model(self):
+        self._test(build_deep_q_model)
+
+    def test_dueling_deep_q_model(self):
+        self._test(build_dueling_deep_q_model)
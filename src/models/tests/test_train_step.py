@@ -0,0 +1,62 @@
+"""Unit tests for the TrainStep class."""
+import numpy as np
+from unittest import TestCase
+from ..deep_q_model import build_deep_q_model
+from ..train_step import TrainStep
+
+
+def batch(size: int=8) -> tuple:
+    """Return a random batch of experiences."""
+    s = np.random.randint(0, 256, (size, 84, 84, 4), dtype=np.uint8)
+    a = np.random.randint(6, size=size)
+    r = np.random.randint(-15, 16, size=size).astype(np.float32)
+    d = np.arange(size) % 4 == 0
+    s2 = np.random.randint(0, 256, (size, 84, 84, 4), dtype=np.uint8)
+    return s, a, r, d, s2
+
+
+class TrainStep_td_error(TestCase):
+    def test(self):
+        model, target_model = build_deep_q_model(), build_deep_q_model()
+        step = TrainStep(model, target_model, discount_factor=0.9)
+        s, a, r, d, s2 = batch()
+        Q_t = np.max(target_model.predict(s2), axis=1)
+        Q_t[d] = 0
+        expected = r + 0.9 * Q_t - model.predict(s)[range(8), a]
+        self.assertTrue(np.allclose(expected, step.td_error(s, a, r, d, s2), atol=1e-4))
+
+    def test_double_q(self):
+        model, target_model = build_deep_q_model(), build_deep_q_model()
+        step = TrainStep(model, target_model, discount_factor=0.9, double_q=True)
+        s, a, r, d, s2 = batch()
+        best = np.argmax(model.predict(s2), axis=1)
+        Q_t = target_model.predict(s2)[range(8), best]
+        Q_t[d] = 0
+        expected = r + 0.9 * Q_t - model.predict(s)[range(8), a]
+        self.assertTrue(np.allclose(expected, step.td_error(s, a, r, d, s2), atol=1e-4))
+
+
+class TrainStep__call__(TestCase):
+    def test(self):
+        model, target_model = build_deep_q_model(), build_deep_q_model()
+        step = TrainStep(model, target_model)
+        experiences = batch()
+        expected = step.td_error(*experiences)
+        target_weights = target_model.get_weights()
+        loss, td_error = step(*experiences)
+        self.assertTrue(np.isfinite(loss))
+        # the TD-errors are of the Q values before the update
+        self.assertTrue(np.allclose(expected, td_error, atol=1e-4))
+        # the step updates the model but not the target model
+        self.assertFalse(np.allclose(expected, step.td_error(*experiences)))
+        for before, after in zip(target_weights, target_model.get_weights()):
+            self.assertTrue(np.array_equal(before, after))
+
+    def test_loss_decreases(self):
+        model, target_model = build_deep_q_model(), build_deep_q_model()
+        step = TrainStep(model, target_model)
+        experiences = batch()
+        first, _ = step(*experiences)
+        for _ in range(20):
+            loss, _ = step(*experiences)
+        self.assertLess(loss, first)
@@ -0,0 +1,54 @@
+"""A model that trains a Q model on the values of selected actions."""
+from keras import backend as K
+from keras.models import Model
+from keras.layers import Input
+from keras.layers import Lambda
+from keras.optimizers import RMSprop
+from .losses import huber_loss
+
+
+def _select(inputs: list):
+    """Return the Q value of the selected action of each sample of a batch."""
+    Q, action = inputs
+    # gather the values from the flat Q values at the offset of each row
+    # plus the action
+    rows = K.arange(0, K.shape(Q)[0]) * K.shape(Q)[1]
+    indexes = rows + K.flatten(action)
+    return K.expand_dims(K.gather(K.flatten(Q), indexes))
+
+
+def build_train_model(
+    model: Model,
+    loss=huber_loss,
+    optimizer=RMSprop(lr=0.00025, rho=0.95, epsilon=0.01)
+) -> Model:
+    """
+    Build and return a model to train a Q model on selected actions.
+
+    Notes:
+        the model takes a batch of states and a batch of integer actions,
+        and gathers the Q value of the selected action of each sample inside
+        the graph. the targets are a single value per sample, so the loss
+        is only ever on the selected actions (without a mask or dense
+        targets for all the actions). the model shares the layers (and
+        weights) of the Q model
+
+    Args:
+        model: the Q model from states to the values of each action
+        loss: the loss metric to use at the end of the network
+        optimizer: the optimizer for reducing error from batches
+
+    Returns:
+        a compiled model from states and actions to the selected Q values
+
+    """
+    action_input = Input((1, ), dtype='int32', name='action')
+    output = Lambda(_select, name='selected_q')([model.outputs[0], action_input])
+    train_model = Model(inputs=[model.inputs[0], action_input], outputs=output)
+    train_model.compile(loss=loss, optimizer=optimizer)
+
+    return train_model
+
+
+# explicitly define the outward facing API of this module
+__all__ = [build_train_model.__name__]
@@ -0,0 +1,150 @@
+"""A fused training step of a Q model on a batch of experiences."""
+from keras import backend as K
+from keras.models import Model
+from keras.optimizers import RMSprop
+import numpy as np
+from .losses import huber_loss
+from .train_model import _select
+
+
+class TrainStep(object):
+    """A fused training step of a Q model on a batch of experiences."""
+
+    def __init__(self,
+        model: Model,
+        target_model: Model,
+        discount_factor: float=0.99,
+        loss=huber_loss,
+        optimizer=RMSprop(lr=0.00025, rho=0.95, epsilon=0.01),
+        double_q: bool=False,
+    ) -> None:
+        """
+        Initialize a new training step.
+
+        Notes:
+            the step is a single backend function of a batch of experiences
+            (s, a, r, d, s2) and importance-sampling weights that evaluates
+            the target network on s2, forms the targets
+            r + γ·max Q'(s2)·(1 - d) in the graph, and applies the gradient
+            update of the weighted loss on the Q values of the selected
+            actions, so an update is one call into the backend (instead of
+            predicting the targets, building them in NumPy, and training).
+            with `double_q`, the online network selects the actions of the
+            next states that the target network evaluates (Double DQN)
+
+        Args:
+            model: the Q model to train
+            target_model: the target Q model to evaluate next states with
+            discount_factor: discount factor, γ, for discounting future reward
+            loss: the elementwise loss between the targets and the Q values
+            optimizer: the optimizer for reducing error from batches
+            double_q: whether to select the actions of the next states with
+                the online model (Double DQN)
+
+        Returns:
+            None
+
+        """
+        self.model = model
+        self.target_model = target_model
+        self.discount_factor = discount_factor
+        self.loss = loss
+        self.optimizer = optimizer
+        self.double_q = double_q
+        # the inputs of the experiences (the states are the inputs of the
+        # models)
+        s = model.input
+        s2 = target_model.input
+        a = K.placeholder((None, ), dtype='int32', name='action')
+        r = K.placeholder((None, ), name='reward')
+        d = K.placeholder((None, ), name='done')
+        w = K.placeholder((None, ), name='weight')
+        # the Q values of the selected actions
+        Q = K.flatten(_select([model.output, K.expand_dims(a)]))
+        # the targets from the Q values of the next states
+        Q_t = target_model.output
+        if double_q:
+            # evaluate the actions the online model selects in the next state
+            best = K.cast(K.argmax(model(s2), axis=-1), 'int32')
+            Q_next = K.flatten(_select([Q_t, K.expand_dims(best)]))
+        else:
+            Q_next = K.max(Q_t, axis=-1)
+        y = K.stop_gradient(r + discount_factor * Q_next * (1 - d))
+        td_error = y - Q
+        # the mean of the loss of each sample weighted by its weight
+        total = K.mean(w * loss(y, Q))
+        updates = optimizer.get_updates(loss=total, params=model.trainable_weights)
+        self._step = K.function([s, a, r, d, s2, w], [total, td_error],
+            updates=updates
+        )
+        self._td_error = K.function([s, a, r, d, s2], [td_error])
+
+    def __repr__(self) -> str:
+        """Return a debugging string of this step."""
+        return '{}(model={}, target_model={}, discount_factor={}, ' \
+            'loss={}, optimizer={}, double_q={})'.format(
+                self.__class__.__name__,
+                self.model.name,
+                self.target_model.name,
+                self.discount_factor,
+                self.loss.__name__,
+                self.optimizer,
+                self.double_q,
+            )
+
+    def __call__(self,
+        s: np.ndarray,
+        a: np.ndarray,
+        r: np.ndarray,
+        d: np.ndarray,
+        s2: np.ndarray,
+        w: np.ndarray=None,
+    ) -> tuple:
+        """
+        Train the model on a batch of experiences.
+
+        Args:
+            s: a batch of current states
+            a: a batch of actions from each state in s
+            r: a batch of reward from each action in a
+            d: a batch of terminal flags after each action in a
+            s2: a batch of next states from each state-action pair in s, a
+            w: an optional batch of importance-sampling weights for the loss
+               of each sample. if None, the samples are weighted equally
+
+        Returns:
+            a tuple of the loss and the TD-error of each sample (from the Q
+            values before the update)
+
+        """
+        if w is None:
+            w = np.ones(len(s), dtype=np.float32)
+        loss, td_error = self._step([s, a, r, d, s2, w])
+        return loss, td_error
+
+    def td_error(self,
+        s: np.ndarray,
+        a: np.ndarray,
+        r: np.ndarray,
+        d: np.ndarray,
+        s2: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Return the TD-errors of a batch of experiences without training.
+
+        Args:
+            s: a batch of current states
+            a: a batch of actions from each state in s
+            r: a batch of reward from each action in a
+            d: a batch of terminal flags after each action in a
+            s2: a batch of next states from each state-action pair in s, a
+
+        Returns:
+            a vector of the TD-error of each experience
+
+        """
+        return self._td_error([s, a, r, d, s2])[0]
+
+
+# explicitly define the outward facing API of this module
+__all__ = [TrainStep.__name__]
@@ -1,36 +1,65 @@
 """A method to setup an environment based on its string ID."""
+from functools import partial
 import gym
-from nes_py.wrappers import BinarySpaceToDiscreteSpaceEnv, wrap as nes_py_wrap
-from gym_super_mario_bros.actions import SIMPLE_MOVEMENT
 from src.environment.atari import build_atari_environment
+from src.environment.synthetic import build_synthetic_environment
+from src.environment.wrappers import AsyncVideoRecorderEnv
+from src.environment.vec_env import SubprocVecEnv
 
 
-def setup_env(env_id: str, monitor_dir: str=None) -> gym.Env:
+def setup_env(env_id: str,
+    monitor_dir: str=None,
+    num_envs: int=None,
+    cache_resets: bool=False,
+) -> gym.Env:
     """
     Make and environment and set it up with wrappers.
 
     Args:
         env_id: the id for the environment to load
         output_dir: the output directory to route monitor output to
+        num_envs: an optional number of environments to run in parallel
+            worker processes. if None, a single environment is returned
+        cache_resets: whether Atari environments restore cached emulator
+            states after the no-ops on reset instead of emulating the no-ops
+            again
 
     Returns:
-        a loaded and wrapped Open AI Gym environment
+        a loaded and wrapped Open AI Gym environment, or a SubprocVecEnv of
+        them if `num_envs` is not None
 
     """
+    if num_envs is not None:
+        # only monitor the first environment of the vector
+        return SubprocVecEnv([
+            partial(setup_env, env_id, monitor_dir if index == 0 else None,
+                cache_resets=cache_resets,
+            )
+            for index in range(num_envs)
+        ])
+
     if 'Tetris' in env_id:
         import gym_tetris
         env = gym_tetris.make(env_id)
         env = gym_tetris.wrap(env, clip_rewards=False)
     elif 'SuperMarioBros' in env_id:
         import gym_super_mario_bros
+        from gym_super_mario_bros.actions import SIMPLE_MOVEMENT
+        from nes_py.wrappers import BinarySpaceToDiscreteSpaceEnv
+        from nes_py.wrappers import wrap as nes_py_wrap
         env = gym_super_mario_bros.make(env_id)
         env = BinarySpaceToDiscreteSpaceEnv(env, SIMPLE_MOVEMENT)
         env = nes_py_wrap(env)
+    elif 'SyntheticNES' in env_id:
+        env = build_synthetic_environment(env_id)
     else:
-        env = build_atari_environment(env_id)
+        env = build_atari_environment(env_id, cache_resets=cache_resets)
 
     if monitor_dir is not None:
-        env = gym.wrappers.Monitor(env, monitor_dir, force=True)
+        # record the statistics with the monitor and the videos in the
+        # background so encoding doesn't slow down the agent
+        env = gym.wrappers.Monitor(env, monitor_dir, force=True, video_callable=False)
+        env = AsyncVideoRecorderEnv(env, monitor_dir)
 
     return env
 
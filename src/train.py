@@ -7,7 +7,20 @@ from matplotlib import pyplot as plt
 from .setup_env import setup_env
 
 
-def train(env_id: str, output_dir: str, monitor: bool=False) -> None:
+def train(env_id: str,
+    output_dir: str,
+    monitor: bool=False,
+    replay_on_disk: bool=False,
+    snapshot_replay: bool=False,
+    resume_replay: str=None,
+    num_envs: int=None,
+    env_groups: int=1,
+    trace: bool=False,
+    num_actors: int=None,
+    inference_server: bool=False,
+    prefetch_depth: int=0,
+    prefetch_staleness: int=None,
+) -> None:
     """
     Train an agent to actuate a certain environment.
 
@@ -15,11 +28,40 @@ def train(env_id: str, output_dir: str, monitor: bool=False) -> None:
         env_id: the ID of the environment to play
         output_dir: the base directory to store results into
         monitor: whether to monitor the operation
+        replay_on_disk: whether to store the replay memory in memory-mapped
+            files in the output directory instead of RAM
+        snapshot_replay: whether to write a snapshot of the replay memory to
+            the output directory after training (even if interrupted)
+        resume_replay: an optional directory of a replay memory snapshot to
+            restore in place of observing random frames to fill the memory
+        num_envs: an optional number of environments to play in parallel
+            worker processes
+        env_groups: the number of groups of the environments to step while
+            the agent predicts the actions of the others (needs `num_envs`)
+        trace: whether to write a Chrome trace of the timed phases of
+            training to the output directory
+        num_actors: an optional number of actor processes to act in while
+            the agent learns in this process (Ape-X)
+        inference_server: whether the actors request batched inferences from
+            the network of the learner instead of each building their own
+            copy of the network (needs `num_actors`)
+        prefetch_depth: the number of minibatches to sample ahead of the
+            learner in a background thread. if 0, minibatches are sampled
+            when the learner needs them
+        prefetch_staleness: the max number of frames pushed since a
+            prefetched minibatch was sampled for it to still be used. if
+            None, prefetched minibatches are never discarded
 
     Returns:
         None
 
     """
+    if replay_on_disk and num_envs is not None:
+        raise ValueError('replay on disk needs a single environment')
+    if num_actors is not None and (num_envs is not None or replay_on_disk):
+        raise ValueError('actors build their own environment and replay')
+    if num_actors is not None and resume_replay is not None:
+        raise ValueError('actors can\'t resume a replay memory snapshot')
     # setup the output directory based on the environment ID and current time
     now = datetime.datetime.today().strftime('%Y-%m-%d_%H-%M')
     output_dir = '{}/{}/DeepQAgent/{}'.format(output_dir, env_id, now)
@@ -30,24 +72,64 @@ def train(env_id: str, output_dir: str, monitor: bool=False) -> None:
 
     # these are long to import and train is only ever called once during
     # an execution lifecycle. import here to save early execution time
+    from src.agents import ApexAgent
     from src.agents import DeepQAgent
+    from src.base import MemmapReplayQueue
+    from src.base import PhaseTimer
+    from src.base import SharedReplayQueue
+    from src.base import load_snapshot
+    from src.base import save_snapshot
     from src.util import BaseCallback
 
     # build the environment
     monitor_dir = '{}/monitor_train'.format(output_dir) if monitor else None
-    env = setup_env(env_id, monitor_dir)
+    env = setup_env(env_id, monitor_dir,
+        num_envs=num_envs,
+        cache_resets=True,
+    )
     # build the agent
-    agent = DeepQAgent(env, replay_memory_size=int(7.5e5))
+    replay_memory_size = int(7.5e5)
+    replay_queue = None
+    if replay_on_disk:
+        replay_queue = MemmapReplayQueue(replay_memory_size,
+            directory='{}/replay'.format(output_dir),
+            frame_shape=env.observation_space.shape[:2],
+            history_length=env.observation_space.shape[-1],
+            streams=num_envs or 1,
+        )
+    if num_actors is not None:
+        agent = ApexAgent(env, env_id,
+            num_actors=num_actors,
+            inference_server=inference_server,
+            replay_memory_size=replay_memory_size,
+            prefetch_depth=prefetch_depth,
+            prefetch_staleness=prefetch_staleness,
+        )
+    else:
+        agent = DeepQAgent(env,
+            replay_memory_size=replay_memory_size,
+            replay_queue=replay_queue,
+            prefetch_depth=prefetch_depth,
+            prefetch_staleness=prefetch_staleness,
+            env_groups=env_groups,
+        )
+    # keep the events of the timed phases to write a trace of
+    if trace:
+        agent.timer = PhaseTimer(trace=True)
     # write some info about the agent's hyperparameters to disk
     with open('{}/agent.py'.format(output_dir), 'w') as agent_file:
         agent_file.write(repr(agent))
 
-    # observe frames to fill the replay memory
-    try:
-        agent.observe()
-    except KeyboardInterrupt:
-        env.close()
-        sys.exit(0)
+    # restore the replay memory from a snapshot or observe frames to fill it
+    if resume_replay is not None:
+        rate = load_snapshot(agent.queue, resume_replay)
+        print('restored replay memory at {:.1f} MB/s'.format(rate))
+    else:
+        try:
+            agent.observe()
+        except KeyboardInterrupt:
+            env.close()
+            sys.exit(0)
 
     # train the agent
     try:
@@ -59,6 +141,19 @@ def train(env_id: str, output_dir: str, monitor: bool=False) -> None:
     # save the weights to disk
     agent.model.save_weights(weights_file, overwrite=True)
 
+    # save the trace of the timed phases of training
+    if trace:
+        agent.timer.write_trace('{}/trace.json'.format(output_dir))
+
+    # save the replay memory to disk to resume training from
+    if snapshot_replay:
+        snapshot_dir = '{}/replay_snapshot'.format(output_dir)
+        rate = save_snapshot(agent.queue, snapshot_dir)
+        print('wrote replay memory to {} at {:.1f} MB/s'.format(
+            repr(snapshot_dir),
+            rate
+        ))
+
     # save the training results
     rewards = pd.Series(callback.scores)
     losses = pd.Series(callback.losses)
@@ -71,6 +166,11 @@ def train(env_id: str, output_dir: str, monitor: bool=False) -> None:
 
     # close the environment to perform necessary cleanup
     env.close()
+    # free the replay memory of vectors of environments (or actors) in
+    # shared memory
+    if isinstance(agent.queue, SharedReplayQueue):
+        agent.queue.close()
+        agent.queue.unlink()
 
 
 # explicitly define the outward facing API of this module
@@ -22,6 +22,7 @@ class BaseCallback(object):
         self._episodes = 0
         self.scores = []
         self.losses = []
+        self.timings = []
 
     def __repr__(self) -> str:
         """Return an executable string representation of this object."""
@@ -31,7 +32,12 @@ class BaseCallback(object):
             self.update_every,
         )
 
-    def __call__(self, agent, score: float, loss: float) -> None:
+    def __call__(self,
+        agent,
+        score: float,
+        loss: float,
+        timings: dict=None,
+    ) -> None:
         """
         Update the callback with the new score (from a finished episode).
 
@@ -39,6 +45,8 @@ class BaseCallback(object):
             agent: the agent producing the score and loss
             score: the score to log
             loss: the loss from training the network to log
+            timings: an optional dictionary of the statistics of the timed
+                phases of training (from `PhaseTimer.stats`)
 
         Returns:
             None
@@ -49,6 +57,7 @@ class BaseCallback(object):
         # append the score to the list
         self.scores.append(score)
         self.losses.append(loss)
+        self.timings.append(timings)
         # save the weights
         if self._episodes % self.update_every == 0:
             agent.model.save_weights(self.weights_file_name)
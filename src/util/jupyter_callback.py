@@ -22,6 +22,7 @@ class JupyterCallback(object):
         # setup caches for metrics
         self.scores = []
         self.losses = []
+        self.timings = []
         # create a list of tuples for plotting data
         self.metrics = [
             (self.scores, 'Reward'),
@@ -30,7 +31,12 @@ class JupyterCallback(object):
         # set the figsize of this callback
         self.figsize = width, height_per_plot * len(self.metrics)
 
-    def __call__(self, agent, score: float, loss: float) -> None:
+    def __call__(self,
+        agent,
+        score: float,
+        loss: float,
+        timings: dict=None,
+    ) -> None:
         """
         Update the callback with the new score (from a finished episode).
 
@@ -38,6 +44,8 @@ class JupyterCallback(object):
             agent: the agent producing the score and loss
             score: the score at the end of any episode to log
             loss: the loss from training the network
+            timings: an optional dictionary of the statistics of the timed
+                phases of training (from `PhaseTimer.stats`)
 
         Returns:
             None
@@ -46,6 +54,7 @@ class JupyterCallback(object):
         # append the score to the list
         self.scores.append(score)
         self.losses.append(loss)
+        self.timings.append(timings)
         # create a figure
         plt.figure(figsize=self.figsize)
         for index, (metric, ylabel) in enumerate(self.metrics):